@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Production build for the LazyGym PWA
+
+Reads index.html, concatenates the local <script> files in document order
+(models.js, dataManager.js, progressionCalculator.js, ui.js, app.js) and the
+local stylesheets into one bundle each, minifies them, and writes them to
+dist/assets/ with a content hash in the file name. index.html and sw.js are
+rewritten to load and precache the bundles, the service worker cache name
+follows the build hash so old caches are dropped, and every text file gets
+.gz (and .br, if the brotli package is installed) siblings for servers that
+serve precompressed files.
+
+Third-party files are served from the build too, so a first install needs no
+other origin: Chart.js is pinned and copied to assets/, and the Google Fonts
+stylesheet is replaced by a self-hosted WOFF2 of the variable font from a
+pinned release, cut down to the weights the styles select and the characters
+that appear in the page, stylesheets and scripts (other characters fall back
+to the system fonts). Downloads are kept in .build-cache/ under the last part
+of their URL, which names the pinned version, so an offline build can be
+seeded by copying the files there. Subsetting needs the
+fontTools and brotli packages; without them, or without the downloads, the
+page keeps loading that file from its CDN.
+
+Usage: python3 build_web.py [--source .] [--output dist] [--cache .build-cache]
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import unicodedata
+from urllib.parse import unquote, unquote_plus, urlsplit
+import urllib.request
+import zipfile
+
+TEXT_SUFFIXES = (".html", ".js", ".css", ".json", ".svg", ".txt", ".webmanifest")
+
+SCRIPT_TAG = re.compile(r'[ \t]*<script\s+src="(?!https?:|//)([^"]+)"\s*>\s*</script>[ \t]*\n?')
+STYLESHEET_TAG = re.compile(r'[ \t]*<link\s+rel="stylesheet"\s+href="(?!https?:|//)([^"]+)"\s*/?>[ \t]*\n?')
+LOCAL_REFERENCE = re.compile(r'\b(?:href|src)="(?!https?:|//|#|data:|mailto:)([^"]+)"')
+REMOTE_SCRIPT_TAG = re.compile(r'[ \t]*<script\s+src="(https?://[^"]+)"\s*>\s*</script>[ \t]*\n?')
+GOOGLE_FONTS_TAG = re.compile(r'[ \t]*<link\b[^>]*\bhref="https://fonts\.(?:googleapis|gstatic)\.com[^"]*"[^>]*>[ \t]*\n?')
+GOOGLE_FONTS_FAMILY = re.compile(r'https://fonts\.googleapis\.com/css2\?family=([^:&"]+)')
+REMOTE_HOST = re.compile(r'\b(?:href|src)="https?://([^/"]+)')
+
+# Remote scripts served from the build: page URL -> (asset name, pinned download)
+VENDORED_SCRIPTS = {
+    "https://cdn.jsdelivr.net/npm/chart.js": ("chart", "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.js"),
+}
+# Google Fonts families served from the build: family -> (pinned release archive, variable font in it)
+FONT_SOURCES = {
+    "Inter": ("https://github.com/rsms/inter/releases/download/v4.0/Inter-4.0.zip", "InterVariable.ttf"),
+}
+
+
+# Minifiers
+
+
+# Characters after which a "/" starts a regular expression rather than a division
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+                   "yield", "await", "instanceof"}
+# A space next to one of these can be dropped (with the exceptions in _join)
+_PUNCTUATION = set("{}()[];,:=<>*%&|!?^~+-")
+# A newline after one of these, or before "}", never ends a statement by itself
+_OPENERS = set("{;,")
+
+
+def _is_word(char):
+    return char.isalnum() or char in "_$" or ord(char) > 127
+
+
+class _JsMinifier:
+    """Drops comments and redundant whitespace from JavaScript
+
+    Strings, template literals (including nested ${...} code) and regular
+    expression literals are copied verbatim. Newlines are kept wherever
+    automatic semicolon insertion could depend on them.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.position = 0
+        self.out = []
+        self.pending = ""   # whitespace seen since the last token: "", " " or "\n"
+        self.last = ""      # last emitted non-whitespace character
+        self.last_word = ""
+
+    def minify(self):
+        self._code(in_template=False)
+        return "".join(self.out).strip() + "\n"
+
+    def _emit(self, text):
+        if self.pending and self.last:
+            separator = self._join(self.pending, self.last, text[0])
+            if separator:
+                self.out.append(separator)
+        self.pending = ""
+        self.out.append(text)
+        self.last = text[-1]
+
+    def _join(self, whitespace, before, after):
+        if whitespace == "\n":
+            if before in _OPENERS or after == "}":
+                return ""
+            return "\n"
+        if "/" in (before, after) or "." in (before, after):
+            return " "
+        if before in "+-" and after in "+-":
+            return " "
+        if before in _PUNCTUATION or after in _PUNCTUATION:
+            return ""
+        return " "
+
+    def _space(self, newline):
+        if newline or self.pending == "\n":
+            self.pending = "\n"
+        else:
+            self.pending = " "
+
+    def _code(self, in_template):
+        source, length = self.source, len(self.source)
+        depth = 0
+        while self.position < length:
+            char = source[self.position]
+            # Whitespace and comments are not tokens, so they keep last_word for
+            # the regex check after keywords like return and typeof
+            if char in " \t\r\f\v\ufeff":
+                self._space(False)
+                self.position += 1
+                continue
+            elif char == "\n":
+                self._space(True)
+                self.position += 1
+                continue
+            elif char in "'\"":
+                self._string(char)
+            elif char == "`":
+                self._template()
+            elif char == "/" and source.startswith("//", self.position):
+                end = source.find("\n", self.position)
+                self.position = length if end < 0 else end
+                continue
+            elif char == "/" and source.startswith("/*", self.position):
+                end = source.find("*/", self.position + 2)
+                end = length if end < 0 else end + 2
+                self._space("\n" in source[self.position:end])
+                self.position = end
+                continue
+            elif char == "/" and (not self.last or self.last in _REGEX_AFTER or self.last_word in _REGEX_KEYWORDS):
+                self._regex()
+            elif _is_word(char):
+                start = self.position
+                while self.position < length and _is_word(source[self.position]):
+                    self.position += 1
+                word = source[start:self.position]
+                self._emit(word)
+                self.last_word = word
+                continue
+            else:
+                if in_template:
+                    if char == "{":
+                        depth += 1
+                    elif char == "}":
+                        if depth == 0:
+                            return
+                        depth -= 1
+                self._emit(char)
+                self.position += 1
+            self.last_word = ""
+
+    def _string(self, quote):
+        source, start = self.source, self.position
+        self.position += 1
+        while self.position < len(source):
+            char = source[self.position]
+            if char == "\\":
+                self.position += 2
+                continue
+            self.position += 1
+            if char == quote or char == "\n":
+                break
+        self._emit(source[start:self.position])
+
+    def _template(self):
+        source = self.source
+        start = self.position
+        self.position += 1
+        while self.position < len(source):
+            char = source[self.position]
+            if char == "\\":
+                self.position += 2
+            elif char == "`":
+                self.position += 1
+                break
+            elif source.startswith("${", self.position):
+                self.position += 2
+                self._emit(source[start:self.position])
+                self._code(in_template=True)
+                start = self.position   # the closing "}" is copied with the literal text
+                self.pending = ""
+                self.position += 1
+            else:
+                self.position += 1
+        self._emit(source[start:self.position])
+
+    def _regex(self):
+        source, start = self.source, self.position
+        self.position += 1
+        in_class = False
+        while self.position < len(source):
+            char = source[self.position]
+            self.position += 1
+            if char == "\\":
+                self.position += 1
+            elif char == "[":
+                in_class = True
+            elif char == "]":
+                in_class = False
+            elif char == "/" and not in_class:
+                break
+            elif char == "\n":
+                break
+        while self.position < len(source) and _is_word(source[self.position]):
+            self.position += 1
+        self._emit(source[start:self.position])
+
+
+def minify_js(source):
+    return _JsMinifier(source).minify()
+
+
+# Strings and comments in one pass, so a quote in a comment (or "/*" in a string) is harmless
+_CSS_STRING_OR_COMMENT = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.S)
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(source):
+    """Drops comments, collapses whitespace and trims it around punctuation"""
+    # Strings are set aside first so nothing below can change them
+    strings = []
+
+    def keep(match):
+        if match.group(0).startswith("/*"):
+            return " "
+        strings.append(match.group(0))
+        return f"\0{len(strings) - 1}\0"
+
+    css = _CSS_STRING_OR_COMMENT.sub(keep, source)
+    css = re.sub(r"\s+", " ", css)
+    css = _CSS_PUNCTUATION.sub(r"\1", css)
+    css = re.sub(r":\s+", ":", css).replace(";}", "}")
+    css = re.sub("\0(\\d+)\0", lambda match: strings[int(match.group(1))], css)
+    return css.strip() + "\n"
+
+
+def minify_html(source):
+    """Drops comments, indentation and blank lines (the page has no <pre> or <textarea>)"""
+    source = re.sub(r"<!--(?!\[if).*?-->", "", source, flags=re.S)
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+# Build steps
+
+
+def fingerprint(content, length=10):
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()[:length]
+
+
+def write_text(path, content):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as handle:
+        handle.write(content)
+
+
+def read_text(path):
+    with open(path, encoding="utf-8") as handle:
+        return handle.read()
+
+
+def bundle(source_dir, paths, minify, separator):
+    parts = [minify(read_text(os.path.join(source_dir, path))) for path in paths]
+    return separator.join(parts)
+
+
+def rewrite_service_worker(source, precache, cache_name):
+    urls = ",\n".join(f"    {json.dumps(url)}" for url in precache)
+    source, replaced = re.subn(r"const urlsToCache = \[.*?\];", f"const urlsToCache = [\n{urls}\n];", source,
+                               count=1, flags=re.S)
+    if not replaced:
+        raise ValueError("sw.js has no urlsToCache list to rewrite")
+    return re.sub(r"const CACHE_NAME = '[^']*';", f"const CACHE_NAME = '{cache_name}';", source, count=1)
+
+
+def precompress(directory):
+    """Write .gz (and .br when available) next to every text file; returns the count"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("ℹ️ brotli is not installed (pip install brotli); writing .gz files only")
+
+    count = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith(TEXT_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as handle:
+                data = handle.read()
+            with open(path + ".gz", "wb") as handle:
+                handle.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(path + ".br", "wb") as handle:
+                    handle.write(brotli.compress(data, quality=11))
+            count += 1
+    return count
+
+
+# Third-party assets
+
+
+def fetch(url, cache_dir):
+    """Contents of a remote file, downloaded once into cache_dir"""
+    path = os.path.join(cache_dir, os.path.basename(unquote(urlsplit(url).path)))
+    if not os.path.isfile(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        with urllib.request.urlopen(url, timeout=60) as response:
+            data = response.read()
+        with open(path + ".tmp", "wb") as handle:
+            handle.write(data)
+        os.replace(path + ".tmp", path)
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+def _fetch_or_warn(url, cache_dir, what):
+    try:
+        return fetch(url, cache_dir)
+    except OSError as error:
+        print(f"⚠️ Could not download {what} ({error}); the page keeps loading it from its CDN")
+        return None
+
+
+def used_characters(texts):
+    """Printable ASCII plus every other visible character in the given sources"""
+    characters = set(map(chr, range(0x20, 0x7F)))
+    for text in texts:
+        characters.update(text, text.upper(), text.lower())
+    return "".join(sorted(char for char in characters if unicodedata.category(char)[0] != "C"))
+
+
+_FONT_WEIGHT = re.compile(r"font-weight\s*:\s*([^;}\"'`\n]+)")
+_WEIGHT_VARIABLE = re.compile(r"(--[\w-]+)\s*:\s*(\d{3}|normal|bold)\s*[;}]")
+_WEIGHT_NAMES = {"normal": 400, "bold": 700}
+
+
+def used_font_weights(texts):
+    """Weights the styles can select: 400 for body text, 700 for headings, and every font-weight value"""
+    text = "".join(texts)
+    variables = dict(_WEIGHT_VARIABLE.findall(text))
+    weights = {400, 700}
+    for value in _FONT_WEIGHT.findall(text):
+        value = value.strip()
+        variable = re.fullmatch(r"var\((--[\w-]+)\)", value)
+        if variable:
+            value = variables.get(variable.group(1), "")
+        if value.isdigit():
+            weights.add(int(value))
+        elif value in _WEIGHT_NAMES:
+            weights.add(_WEIGHT_NAMES[value])
+    return weights
+
+
+def subset_font(data, characters, weights):
+    """WOFF2 of a font cut down to characters and, for a variable font, to the weight range"""
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+        from fontTools.varLib import instancer
+        import brotli  # noqa: F401 (fontTools compresses WOFF2 with it)
+    except ImportError:
+        raise ImportError("fontTools and brotli are required to subset fonts (pip install fonttools brotli)") from None
+
+    font = TTFont(io.BytesIO(data))
+    if "fvar" in font:
+        # Other axes (Inter's optical size) are pinned to their defaults
+        limits = {axis.axisTag: None for axis in font["fvar"].axes}
+        if "wght" in limits:
+            low, high = min(weights), max(weights)
+            limits["wght"] = low if low == high else (low, high)
+        font = instancer.instantiateVariableFont(font, limits)
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.hinting = False
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=characters)
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font.flavor = "woff2"
+    font.save(output)
+    return output.getvalue()
+
+
+def archive_member(data, name):
+    """Contents of the file called name (at any depth) in a zip archive"""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for entry in archive.namelist():
+            if entry.rsplit("/", 1)[-1] == name:
+                return archive.read(entry)
+    raise KeyError(f"{name} is not in the archive")
+
+
+def self_host_font(family, texts, cache_dir):
+    """(asset name, WOFF2 bytes, weights) of a subset of a FONT_SOURCES family, or None"""
+    url, member = FONT_SOURCES[family]
+    data = _fetch_or_warn(url, cache_dir, family)
+    if data is None:
+        return None
+    try:
+        data = archive_member(data, member)
+    except (zipfile.BadZipFile, KeyError) as error:
+        print(f"⚠️ Unusable {family} download ({error}); the page keeps loading it from Google Fonts")
+        return None
+    weights = used_font_weights(texts)
+    try:
+        data = subset_font(data, used_characters(texts), weights)
+    except ImportError as error:
+        print(f"⚠️ {error}; the page keeps loading {family} from Google Fonts")
+        return None
+    return f"assets/{family.lower().replace(' ', '-')}.{fingerprint(data)}.woff2", data, weights
+
+
+def font_face(family, asset, weights):
+    low, high = min(weights), max(weights)
+    weight = str(low) if low == high else f"{low} {high}"
+    # The rule lives in the stylesheet bundle, which sits next to the font in assets/
+    return (f'@font-face{{font-family:"{family}";font-style:normal;font-weight:{weight};font-display:swap;'
+            f'src:url({os.path.basename(asset)}) format("woff2")}}\n')
+
+
+def _page_requests(html):
+    return 1 + len(re.findall(r'<script\s+src=|rel="(?:stylesheet|preload)"', html))
+
+
+def build(source_dir=".", output_dir="dist", cache_dir=None):
+    html = read_text(os.path.join(source_dir, "index.html"))
+    scripts = SCRIPT_TAG.findall(html)
+    stylesheets = STYLESHEET_TAG.findall(html)
+    if not scripts:
+        raise ValueError("index.html loads no local scripts")
+    cache_dir = cache_dir or os.path.join(source_dir, ".build-cache")
+    original_html = html
+
+    # Asset name -> contents, for third-party files served from the build
+    assets = {}
+    vendored = {}
+    for url in REMOTE_SCRIPT_TAG.findall(html):
+        if url in VENDORED_SCRIPTS and url not in vendored:
+            name, download = VENDORED_SCRIPTS[url]
+            data = _fetch_or_warn(download, cache_dir, url)
+            if data is not None:
+                vendored[url] = f"assets/{name}.{fingerprint(data)}.js"
+                assets[vendored[url]] = data
+
+    font = None
+    family = GOOGLE_FONTS_FAMILY.search(html)
+    family = family and unquote_plus(family.group(1))
+    if family in FONT_SOURCES and stylesheets:
+        texts = [html] + [read_text(os.path.join(source_dir, path)) for path in scripts + stylesheets]
+        font = self_host_font(family, texts, cache_dir)
+        if font is not None:
+            assets[font[0]] = font[1]
+
+    # Separate files with ";" so a file without a trailing semicolon cannot merge into the next
+    script_bundle = bundle(source_dir, scripts, minify_js, ";\n")
+    style_bundle = bundle(source_dir, stylesheets, minify_css, "")
+    if font is not None:
+        style_bundle = font_face(family, font[0], font[2]) + style_bundle
+    script_name = f"assets/app.{fingerprint(script_bundle)}.js"
+    style_name = f"assets/styles.{fingerprint(style_bundle)}.css"
+
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    write_text(os.path.join(output_dir, script_name), script_bundle)
+    if stylesheets:
+        write_text(os.path.join(output_dir, style_name), style_bundle)
+    for name, data in assets.items():
+        with open(os.path.join(output_dir, name), "wb") as handle:
+            handle.write(data)
+
+    # The first tag of each kind becomes the bundle, the rest are removed
+    tags = iter([f'<script src="{script_name}"></script>\n'] + [""] * len(scripts))
+    html = SCRIPT_TAG.sub(lambda match: next(tags), html)
+    preload = f'<link rel="preload" href="{font[0]}" as="font" type="font/woff2" crossorigin>\n' if font else ""
+    tags = iter([f'{preload}<link rel="stylesheet" href="{style_name}">\n'] + [""] * len(stylesheets))
+    html = STYLESHEET_TAG.sub(lambda match: next(tags), html)
+    html = REMOTE_SCRIPT_TAG.sub(
+        lambda match: f'<script src="{vendored[match.group(1)]}"></script>\n' if match.group(1) in vendored
+        else match.group(0), html)
+    if font is not None:
+        html = GOOGLE_FONTS_TAG.sub("", html)
+    write_text(os.path.join(output_dir, "index.html"), minify_html(html))
+
+    # Copy everything else the page and the manifest point at
+    copied = set()
+    references = set(LOCAL_REFERENCE.findall(html))
+    manifest_path = os.path.join(source_dir, "manifest.json")
+    if os.path.isfile(manifest_path):
+        manifest = json.loads(read_text(manifest_path))
+        references.update(entry["src"] for key in ("icons", "screenshots") for entry in manifest.get(key, []))
+    for reference in sorted(references - {script_name, style_name} - set(assets)):
+        path = os.path.join(source_dir, reference.lstrip("/"))
+        if not os.path.isfile(path):
+            print(f"⚠️ Skipping missing file: {reference}")
+            continue
+        target = os.path.join(output_dir, reference.lstrip("/"))
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        if reference.endswith(".json"):
+            write_text(target, json.dumps(json.loads(read_text(path)), separators=(",", ":")))
+        else:
+            shutil.copyfile(path, target)
+        copied.add(reference)
+
+    replaced = {"/" + path for path in scripts + stylesheets} | set(vendored)
+    service_worker = read_text(os.path.join(source_dir, "sw.js"))
+    original = re.search(r"const urlsToCache = \[(.*?)\];", service_worker, re.S)
+    precache = [url for url in re.findall(r"'([^']+)'", original.group(1) if original else "")
+                if url not in replaced and not (font and url.startswith("https://fonts.googleapis.com/"))]
+    precache[1:1] = (["/" + script_name] + (["/" + style_name] if stylesheets else [])
+                     + ["/" + name for name in assets])
+    build_id = fingerprint(script_bundle + style_bundle + "".join(precache), length=8)
+    write_text(os.path.join(output_dir, "sw.js"),
+               minify_js(rewrite_service_worker(service_worker, precache, f"lazygym-{build_id}")))
+
+    compressed = precompress(output_dir)
+
+    before = sum(os.path.getsize(os.path.join(source_dir, path)) for path in scripts + stylesheets + ["index.html"])
+    after = sum(os.path.getsize(os.path.join(output_dir, path)) for path in
+                [script_name, "index.html"] + ([style_name] if stylesheets else []))
+    after_gzip = sum(os.path.getsize(os.path.join(output_dir, path + ".gz")) for path in
+                     [script_name, "index.html"] + ([style_name] if stylesheets else []))
+    print(f"✅ Built {output_dir}/ ({build_id})")
+    print(f"   - {script_name} from {len(scripts)} scripts")
+    if stylesheets:
+        print(f"   - {style_name} from {len(stylesheets)} stylesheet(s)")
+    for url, name in vendored.items():
+        print(f"   - {name} vendored from {url}")
+    if font is not None:
+        print(f"   - {font[0]}: {family} {min(font[2])}-{max(font[2])}, {len(font[1]) / 1024:.1f} KB")
+    print(f"   - Page requests: {_page_requests(original_html)} -> {_page_requests(html)}")
+    print(f"   - Third-party origins: {len(set(REMOTE_HOST.findall(original_html)))} -> "
+          f"{len(set(REMOTE_HOST.findall(html)))}")
+    print(f"   - HTML, JS and CSS: {before / 1024:.1f} KB -> {after / 1024:.1f} KB minified, "
+          f"{after_gzip / 1024:.1f} KB gzipped")
+    print(f"   - Copied {len(copied)} static files, precompressed {compressed} text files")
+    return build_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bundle, minify, fingerprint and precompress the web app")
+    parser.add_argument("--source", default=".", help="directory containing index.html")
+    parser.add_argument("--output", default="dist")
+    parser.add_argument("--cache", help="download cache for vendored files (default: SOURCE/.build-cache)")
+    args = parser.parse_args()
+    build(args.source, args.output, args.cache)
+
+
+if __name__ == "__main__":
+    main()
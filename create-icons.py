@@ -1,55 +1,117 @@
 #!/usr/bin/env python3
 """
 Icon Generator for LazyGym Web App
-Creates all required icon sizes from the existing app icon
+Renders every icon size natively from the app icon's layer spec, and
+optionally the Xcode app icon set with its dark and tinted appearances
 """
 
-from PIL import Image
+import argparse
+import json
 import os
+import time
 
-def create_icons():
-    # Path to your existing app icon (from the Xcode project)
-    source_icon_path = "../lazygym/Assets.xcassets/AppIcon.appiconset/icon-1024.png"
-    
-    if not os.path.exists(source_icon_path):
-        print(f"❌ Source icon not found at: {source_icon_path}")
-        print("Please make sure you're running this from the lazygym-web directory")
-        print("and that the Xcode project is in the parent directory")
-        return
-    
-    # Create icons directory if it doesn't exist
-    os.makedirs("icons", exist_ok=True)
-    
-    # Icon sizes needed for web app
-    icon_sizes = [
-        (16, "icon-16.png"),
-        (32, "icon-32.png"),
-        (152, "icon-152.png"),
-        (167, "icon-167.png"),
-        (180, "icon-180.png"),
-        (192, "icon-192.png"),
-        (512, "icon-512.png")
-    ]
-    
+from icon_engine import render_appearances, render_icons
+
+# The app icon (AppIcon.appiconset/icon-1024.png): blue at the top to purple at the bottom
+APP_ICON = [
+    {"type": "linear_gradient", "start": (59, 130, 246), "end": (147, 51, 234)},
+]
+
+# iOS home screen appearances written to the Xcode icon set
+IOS_APPEARANCES = ("dark", "tinted")
+APPEARANCE_IDIOMS = ("universal", "ios-marketing")
+APPEARANCE_SIZE = 1024
+
+# Icon sizes needed for web app
+ICON_SIZES = [
+    (16, "icon-16.png"),
+    (32, "icon-32.png"),
+    (152, "icon-152.png"),
+    (167, "icon-167.png"),
+    (180, "icon-180.png"),
+    (192, "icon-192.png"),
+    (512, "icon-512.png"),
+]
+
+
+def create_icons(output_dir="."):
     try:
-        # Open the source icon
-        with Image.open(source_icon_path) as source:
-            print(f"✅ Opened source icon: {source.size}")
-            
-            for size, filename in icon_sizes:
-                # Resize the icon
-                resized = source.resize((size, size), Image.Resampling.LANCZOS)
-                
-                # Save the icon
-                output_path = filename
-                resized.save(output_path)
-                print(f"✅ Created {filename} ({size}x{size})")
-            
-            print("\n🎉 All icons created successfully!")
-            print("Your web app is now ready for iOS!")
-            
+        # Each size is drawn at its own resolution instead of downsampling a 1024 px master
+        start = time.perf_counter()
+        icons = render_icons(APP_ICON, [size for size, _ in ICON_SIZES])
+        elapsed = time.perf_counter() - start
+
+        for size, filename in ICON_SIZES:
+            icons[size].save(os.path.join(output_dir, filename))
+            print(f"✅ Created {filename} ({size}x{size})")
+
+        print(f"\n🎉 All icons rendered in {elapsed:.3f}s!")
+        print("Your web app is now ready for iOS!")
+
     except Exception as e:
         print(f"❌ Error creating icons: {e}")
 
+
+def _pixel_size(image):
+    # "83.5x83.5" at "2x" is 167 px
+    return round(float(image["size"].split("x")[0]) * int(image.get("scale", "1x")[:-1]))
+
+
+def create_app_icon_set(appiconset):
+    """Write the dark and tinted app icons of an AppIcon.appiconset and list them in Contents.json
+
+    As in the iOS 18 single-size icon set, only the 1024 px universal (or
+    ios-marketing) slot gets luminosity appearances. Base images are left as
+    they are, and Contents.json keeps its key order.
+    """
+    contents_path = os.path.join(appiconset, "Contents.json")
+    with open(contents_path) as handle:
+        contents = json.load(handle)
+
+    # Appearance entries are rebuilt from the base entries on every run
+    previous = [image for image in contents["images"] if "appearances" in image]
+    images = [image for image in contents["images"] if "appearances" not in image]
+    # Slots Xcode has not filled yet have no filename
+    targets = [image for image in images if image.get("filename") and image.get("idiom") in APPEARANCE_IDIOMS
+               and _pixel_size(image) == APPEARANCE_SIZE]
+    start = time.perf_counter()
+    icons = render_appearances(APP_ICON, [APPEARANCE_SIZE] if targets else [], IOS_APPEARANCES)
+    elapsed = time.perf_counter() - start
+
+    entries = []
+    written = set()
+    for image in images:
+        entries.append(image)
+        if not any(image is target for target in targets):
+            continue
+        name, extension = os.path.splitext(image["filename"])
+        for appearance in IOS_APPEARANCES:
+            filename = f"{name}-{appearance}{extension}"
+            icons[APPEARANCE_SIZE][appearance].save(os.path.join(appiconset, filename))
+            written.add(filename)
+            # Xcode lists "appearances" first
+            entries.append({"appearances": [{"appearance": "luminosity", "value": appearance}],
+                            **dict(image, filename=filename)})
+
+    # Appearance images of slots that no longer get one
+    for image in previous:
+        filename = image.get("filename")
+        if filename and filename not in written and os.path.exists(os.path.join(appiconset, filename)):
+            os.remove(os.path.join(appiconset, filename))
+
+    contents["images"] = entries
+    with open(contents_path, "w") as handle:
+        json.dump(contents, handle, indent=2)
+
+    print(f"✅ Wrote {len(written)} appearance images to {appiconset} in {elapsed:.3f}s")
+
+
 if __name__ == "__main__":
-    create_icons()
+    parser = argparse.ArgumentParser(description="Render the LazyGym icons")
+    parser.add_argument("--output", default=".", help="directory for the web app icons")
+    parser.add_argument("--appiconset", help="also write this Xcode AppIcon.appiconset, "
+                                             "e.g. lazygym/Assets.xcassets/AppIcon.appiconset")
+    args = parser.parse_args()
+    create_icons(args.output)
+    if args.appiconset:
+        create_app_icon_set(args.appiconset)
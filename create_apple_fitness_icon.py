@@ -4,50 +4,26 @@ Create an Apple-style fitness app icon
 """
 
 from PIL import Image, ImageDraw
-import math
+
+from icon_engine import render_icon
 
 def create_apple_fitness_icon():
     # Create a 1024x1024 canvas
     size = 1024
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
     center = size // 2
     
     print(f"🍎💪 Creating Apple-style fitness icon from center {center}")
     
-    # Apple-style fitness gradient: Deep green to light green (like Apple Fitness)
-    for y in range(size):
-        for x in range(size):
-            # Calculate distance from center
-            distance = math.sqrt((x - center)**2 + (y - center)**2)
-            
-            # Normalize distance to 0-1
-            max_distance = center
-            ratio = min(distance / max_distance, 1.0)
-            
-            # Apple Fitness-style gradient: Deep green to light green
-            base_r, base_g, base_b = 0, 150, 136      # Deep teal (Apple Fitness color)
-            target_r, target_g, target_b = 52, 199, 89  # Apple Green
-            
-            r = int(base_r * (1 - ratio) + target_r * ratio)
-            g = int(base_g * (1 - ratio) + target_g * ratio)
-            b = int(base_b * (1 - ratio) + target_b * ratio)
-            
-            # Set pixel with full opacity
-            img.putpixel((x, y), (r, g, b, 255))
-    
-    # Add Apple-style subtle inner glow
-    glow_radius = 100
-    for i in range(glow_radius):
-        ratio = i / glow_radius
-        alpha = int(40 * (1 - ratio))  # Subtle glow
-        r = int(255 * (1 - ratio))
-        g = int(255 * (1 - ratio))
-        b = int(255 * (1 - ratio))
-        
-        draw.ellipse([center - i, center - i, center + i, center + i], 
-                    fill=(r, g, b, alpha))
+    layers = [
+        # Apple-style fitness gradient: Deep green to light green (like Apple Fitness)
+        {"type": "radial_gradient", "inner": (0, 150, 136), "outer": (52, 199, 89)},
+        # Add Apple-style subtle inner glow
+        {"type": "glow", "radius": 100, "alpha": 40},
+    ]
+    
+    img = render_icon(layers, size)
+    
+    draw = ImageDraw.Draw(img)
     
     # Add a simple fitness symbol - a stylized dumbbell
     # Draw the center bar
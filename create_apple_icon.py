@@ -3,68 +3,27 @@
 Create an Apple-style app icon that looks like it came from Apple themselves
 """
 
-from PIL import Image, ImageDraw, ImageFilter
-import math
+from PIL import Image
+
+from icon_engine import render_icon
 
 def create_apple_style_icon():
     # Create a 1024x1024 canvas
     size = 1024
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
     center = size // 2
     
     print(f"🍎 Creating Apple-style icon from center {center}")
     
-    # Apple-style gradient: subtle and elegant
-    # Use Apple's signature colors - deep blue to lighter blue
-    for y in range(size):
-        for x in range(size):
-            # Calculate distance from center
-            distance = math.sqrt((x - center)**2 + (y - center)**2)
-            
-            # Normalize distance to 0-1
-            max_distance = center
-            ratio = min(distance / max_distance, 1.0)
-            
-            # Apple-style gradient: deep blue to lighter blue
-            # Similar to iOS system colors
-            base_r, base_g, base_b = 0, 122, 255      # iOS Blue
-            target_r, target_g, target_b = 90, 200, 250  # Light Blue
-            
-            r = int(base_r * (1 - ratio) + target_r * ratio)
-            g = int(base_g * (1 - ratio) + target_g * ratio)
-            b = int(base_b * (1 - ratio) + target_b * ratio)
-            
-            # Set pixel with full opacity
-            img.putpixel((x, y), (r, g, b, 255))
-    
-    # Add Apple-style subtle inner glow
-    glow_radius = 200
-    for i in range(glow_radius):
-        ratio = i / glow_radius
-        alpha = int(30 * (1 - ratio))  # Subtle glow
-        r = int(255 * (1 - ratio))
-        g = int(255 * (1 - ratio))
-        b = int(255 * (1 - ratio))
-        
-        draw.ellipse([center - i, center - i, center + i, center + i], 
-                    fill=(r, g, b, alpha))
+    layers = [
+        # Apple-style gradient: subtle and elegant
+        {"type": "radial_gradient", "inner": (0, 122, 255), "outer": (90, 200, 250)},
+        # Add Apple-style subtle inner glow
+        {"type": "glow", "radius": 200, "alpha": 30},
+        # Add Apple-style subtle shadow/edge
+        {"type": "vignette", "width": 20, "alpha": 20},
+    ]
     
-    # Add Apple-style subtle shadow/edge
-    shadow_radius = 20
-    for i in range(shadow_radius):
-        ratio = i / shadow_radius
-        alpha = int(20 * (1 - ratio))  # Very subtle shadow
-        r = int(0 * (1 - ratio))
-        g = int(0 * (1 - ratio))
-        b = int(0 * (1 - ratio))
-        
-        # Draw shadow on the edges
-        edge_distance = center - i
-        draw.ellipse([center - edge_distance, center - edge_distance, 
-                     center + edge_distance, center + edge_distance], 
-                    fill=(r, g, b, alpha))
+    img = render_icon(layers, size)
     
     return img
 
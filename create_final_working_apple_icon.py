@@ -3,51 +3,25 @@
 Create a final working Apple-style app icon with solid center
 """
 
-from PIL import Image, ImageDraw
-import math
+from PIL import Image
+
+from icon_engine import render_icon
 
 def create_final_working_apple_icon():
     # Create a 1024x1024 canvas
     size = 1024
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    
     center = size // 2
     
     print(f"🍎 Creating final working Apple-style icon from center {center}")
     
-    # Apple-style gradient: iOS Blue to Light Blue
-    for y in range(size):
-        for x in range(size):
-            # Calculate distance from center
-            distance = math.sqrt((x - center)**2 + (y - center)**2)
-            
-            # Normalize distance to 0-1
-            max_distance = center
-            ratio = min(distance / max_distance, 1.0)
-            
-            # Apple-style gradient: iOS Blue to Light Blue
-            base_r, base_g, base_b = 0, 122, 255      # iOS Blue
-            target_r, target_g, target_b = 90, 200, 250  # Light Blue
-            
-            r = int(base_r * (1 - ratio) + target_r * ratio)
-            g = int(base_g * (1 - ratio) + target_g * ratio)
-            b = int(base_b * (1 - ratio) + target_b * ratio)
-            
-            # Set pixel with full opacity
-            img.putpixel((x, y), (r, g, b, 255))
+    layers = [
+        # Apple-style gradient: iOS Blue to Light Blue
+        {"type": "radial_gradient", "inner": (0, 122, 255), "outer": (90, 200, 250)},
+        # Add Apple-style subtle inner glow
+        {"type": "glow", "radius": 20, "alpha": 100},
+    ]
     
-    # Add Apple-style subtle inner glow
-    draw = ImageDraw.Draw(img)
-    glow_radius = 20
-    for i in range(glow_radius):
-        ratio = i / glow_radius
-        alpha = int(100 * (1 - ratio))  # Subtle glow
-        r = int(255 * (1 - ratio))
-        g = int(255 * (1 - ratio))
-        b = int(255 * (1 - ratio))
-        
-        draw.ellipse([center - i, center - i, center + i, center + i], 
-                    fill=(r, g, b, alpha))
+    img = render_icon(layers, size)
     
     return img
 
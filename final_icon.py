@@ -3,61 +3,25 @@
 Create a final, working gradient icon
 """
 
-from PIL import Image, ImageDraw
-import numpy as np
+from PIL import Image
+
+from icon_engine import render_icon
 
 def create_final_gradient_icon():
     # Create a 1024x1024 canvas
     size = 1024
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    
-    # Create a numpy array for the image
-    arr = np.array(img)
     center = size // 2
     
     print(f"🎨 Creating final gradient from center {center}")
     
-    # Create gradient using numpy for better control
-    y, x = np.ogrid[:size, :size]
-    distance = np.sqrt((x - center)**2 + (y - center)**2)
-    
-    # Normalize distance to 0-1
-    max_distance = center
-    normalized_distance = np.clip(distance / max_distance, 0, 1)
-    
-    # Create gradient colors
-    base_r, base_g, base_b = 255, 94, 77      # Warm coral
-    target_r, target_g, target_b = 0, 119, 190  # Deep ocean blue
-    
-    # Interpolate colors
-    r = (base_r * (1 - normalized_distance) + target_r * normalized_distance).astype(np.uint8)
-    g = (base_g * (1 - normalized_distance) + target_g * normalized_distance).astype(np.uint8)
-    b = (base_b * (1 - normalized_distance) + target_b * normalized_distance).astype(np.uint8)
-    
-    # Create alpha channel (fully opaque)
-    alpha = np.full((size, size), 255, dtype=np.uint8)
-    
-    # Set the colors
-    arr[:, :, 0] = r
-    arr[:, :, 1] = g
-    arr[:, :, 2] = b
-    arr[:, :, 3] = alpha
-    
-    # Convert back to PIL Image
-    img = Image.fromarray(arr, 'RGBA')
+    layers = [
+        # Warm coral to deep ocean blue gradient
+        {"type": "radial_gradient", "inner": (255, 94, 77), "outer": (0, 119, 190)},
+        # Add a subtle center highlight
+        {"type": "glow", "radius": 80, "alpha": 30},
+    ]
     
-    # Add a subtle center highlight
-    draw = ImageDraw.Draw(img)
-    highlight_radius = 80
-    for i in range(highlight_radius):
-        ratio = i / highlight_radius
-        alpha = int(30 * (1 - ratio))  # Subtle highlight
-        r = int(255 * (1 - ratio))
-        g = int(255 * (1 - ratio))
-        b = int(255 * (1 - ratio))
-        
-        draw.ellipse([center - i, center - i, center + i, center + i], 
-                    fill=(r, g, b, alpha))
+    img = render_icon(layers, size)
     
     return img
 
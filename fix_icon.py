@@ -3,51 +3,25 @@
 Create a proper gradient icon that will actually be visible
 """
 
-from PIL import Image, ImageDraw
-import math
+from PIL import Image
+
+from icon_engine import render_icon
 
 def create_proper_gradient_icon():
     # Create a 1024x1024 canvas
     size = 1024
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
     center = size // 2
     
     print(f"🎨 Creating proper gradient from center {center}")
     
-    # Create a proper radial gradient
-    for i in range(center):
-        ratio = i / center
-        
-        # Beautiful sunset to ocean gradient
-        base_r, base_g, base_b = 255, 94, 77      # Warm coral
-        target_r, target_g, target_b = 0, 119, 190  # Deep ocean blue
-        
-        r = int(base_r * (1 - ratio) + target_r * ratio)
-        g = int(base_g * (1 - ratio) + target_g * ratio)
-        b = int(base_b * (1 - ratio) + target_b * ratio)
-        
-        # Make sure alpha is 255 (fully opaque)
-        alpha = 255
-        
-        print(f"   Radius {i}: RGB({r}, {g}, {b}) Alpha({alpha})")
-        
-        # Draw the circle with full opacity
-        draw.ellipse([center - i, center - i, center + i, center + i], 
-                    fill=(r, g, b, alpha))
+    layers = [
+        # Create a proper radial gradient
+        {"type": "radial_gradient", "inner": (255, 94, 77), "outer": (0, 119, 190)},
+        # Add a subtle center highlight
+        {"type": "glow", "radius": 80, "alpha": 40},
+    ]
     
-    # Add a subtle center highlight
-    highlight_radius = 80
-    for i in range(highlight_radius):
-        ratio = i / highlight_radius
-        alpha = int(40 * (1 - ratio))  # Subtle highlight
-        r = int(255 * (1 - ratio))
-        g = int(255 * (1 - ratio))
-        b = int(255 * (1 - ratio))
-        
-        draw.ellipse([center - i, center - i, center + i, center + i], 
-                    fill=(r, g, b, alpha))
+    img = render_icon(layers, size)
     
     return img
 
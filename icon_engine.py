@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Shared render engine for the LazyGym icon scripts
+
+Icons are described as a list of layer dicts in 1024 px design units and
+rendered with NumPy. The per-pixel radius, angle and normalized-ratio fields
+every radial layer needs are computed once per (size, center) and shared
+read-only through a bounded LRU cache.
+
+Every size is rendered natively from the spec rather than downsampled from
+the 1024 px master. Shape edges (the mask and vignette extents) are snapped
+to pixel boundaries around the exact image center, so small icons stay
+crisp, and a layer can change or drop out at small sizes:
+
+    {"type": "glow", "radius": 200, "alpha": 30, "min_size": 48}
+    {"type": "vignette", "width": 20, "alpha": 20, "overrides": [(64, {"width": 48})]}
+
+Dark, tinted and grayscale appearances are derived from each size's base
+render with a 3x3 color matrix and a 256-entry lookup table per channel,
+instead of rendering the layers again.
+"""
+
+from collections import OrderedDict
+import math
+
+import numpy as np
+from PIL import Image
+
+# Layer sizes in a spec are given at this resolution and scaled per render
+DESIGN_SIZE = 1024
+
+
+class FieldCache:
+    """Bounded LRU cache of read-only radius/angle/ratio fields"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def _lookup(self, key, compute):
+        field = self._entries.get(key)
+        if field is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return field
+
+        self.misses += 1
+        field = compute()
+        field.flags.writeable = False
+        self._entries[key] = field
+        self.current_bytes += field.nbytes
+
+        # Evict least recently used fields, but always keep the newest one
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+        return field
+
+    def radius(self, size, center):
+        def compute():
+            y, x = np.ogrid[:size, :size]
+            return np.sqrt((x - center) ** 2 + (y - center) ** 2).astype(np.float32)
+
+        return self._lookup(("radius", size, center), compute)
+
+    def angle(self, size, center):
+        def compute():
+            y, x = np.ogrid[:size, :size]
+            # 0 at 12 o'clock, increasing clockwise, normalized to 0-1
+            theta = np.arctan2(x - center, -(y - center))
+            return (np.mod(theta, 2 * math.pi) / (2 * math.pi)).astype(np.float32)
+
+        return self._lookup(("angle", size, center), compute)
+
+    def linear(self, size):
+        def compute():
+            # 0 on the top row of pixels, 1 on the bottom row
+            ramp = np.arange(size, dtype=np.float32) / max(size - 1, 1)
+            return np.broadcast_to(ramp[:, None], (size, size))
+
+        return self._lookup(("linear", size), compute)
+
+    def ratio(self, size, center, extent):
+        def compute():
+            return np.clip(self.radius(size, center) / extent, 0, 1).astype(np.float32)
+
+        return self._lookup(("ratio", size, center, float(extent)), compute)
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+
+# Shared by every render in a process so all icons in a build reuse fields
+FIELD_CACHE = FieldCache()
+
+
+def _color(value):
+    return np.asarray(value[:3], dtype=np.float32) / 255.0
+
+
+def _lerp_colors(inner, outer, t):
+    inner, outer = _color(inner), _color(outer)
+    return inner * (1 - t[..., None]) + outer * t[..., None]
+
+
+def _over(canvas, rgb, alpha):
+    # canvas is premultiplied RGBA, rgb/alpha describe a straight-alpha layer
+    alpha = np.broadcast_to(alpha, canvas.shape[:2])[..., None]
+    canvas[..., :3] = rgb * alpha + canvas[..., :3] * (1 - alpha)
+    canvas[..., 3:] = alpha + canvas[..., 3:] * (1 - alpha)
+
+
+def _edge(ctx, length):
+    """A distance from the center, moved so the edge lands between two pixels when snapping"""
+    if not ctx["snap"]:
+        return length
+    center = ctx["center"]
+    return round(center + length + 0.5) - 0.5 - center
+
+
+def _linear_gradient(canvas, layer, ctx):
+    t = ctx["cache"].linear(ctx["size"])
+    _over(canvas, _lerp_colors(layer["start"], layer["end"], t), layer.get("opacity", 1.0))
+
+
+def _radial_gradient(canvas, layer, ctx):
+    extent = layer.get("extent", DESIGN_SIZE // 2) * ctx["scale"]
+    ratio = ctx["cache"].ratio(ctx["size"], ctx["center"], extent)
+    _over(canvas, _lerp_colors(layer["inner"], layer["outer"], ratio), layer.get("opacity", 1.0))
+
+
+def _sweep_gradient(canvas, layer, ctx):
+    angle = ctx["cache"].angle(ctx["size"], ctx["center"])
+    # Mirror the sweep so the start and end colors meet without a seam
+    t = 1 - np.abs(2 * angle - 1)
+    _over(canvas, _lerp_colors(layer["start"], layer["end"], t), layer.get("opacity", 1.0))
+
+
+def _glow(canvas, layer, ctx):
+    ratio = ctx["cache"].ratio(ctx["size"], ctx["center"], layer["radius"] * ctx["scale"])
+    alpha = (layer["alpha"] / 255.0) * (1 - ratio)
+    _over(canvas, _color(layer.get("color", (255, 255, 255))), alpha)
+
+
+def _vignette(canvas, layer, ctx):
+    scale = ctx["scale"]
+    extent = _edge(ctx, layer.get("extent", DESIGN_SIZE // 2) * scale)
+    width = layer["width"] * scale
+    if ctx["snap"]:
+        # A falloff narrower than a pixel would just be a hard ring
+        width = max(width, 1.0)
+    radius = ctx["cache"].radius(ctx["size"], ctx["center"])
+    alpha = (layer["alpha"] / 255.0) * np.clip(1 - (extent - radius) / width, 0, 1)
+    _over(canvas, _color(layer.get("color", (0, 0, 0))), alpha)
+
+
+def _mask(canvas, layer, ctx):
+    radius = ctx["cache"].radius(ctx["size"], ctx["center"])
+    edge = _edge(ctx, layer.get("radius", DESIGN_SIZE // 2) * ctx["scale"])
+    # Antialiased circular coverage, half a pixel either side of the edge
+    coverage = np.clip(edge - radius + 0.5, 0, 1)
+    canvas *= coverage[..., None]
+
+
+LAYER_RENDERERS = {
+    "linear_gradient": _linear_gradient,
+    "radial_gradient": _radial_gradient,
+    "sweep_gradient": _sweep_gradient,
+    "glow": _glow,
+    "vignette": _vignette,
+    "mask": _mask,
+}
+
+
+def layers_for_size(layers, size):
+    """The layers drawn at a size, with per-size overrides applied
+
+    A layer is skipped below its "min_size" or above its "max_size". Its
+    "overrides" are (max_size, values) pairs whose values replace the layer's
+    at sizes up to max_size; when several match, the smallest max_size wins.
+    """
+    resolved = []
+    for layer in layers:
+        if size < layer.get("min_size", 0) or size > layer.get("max_size", size):
+            continue
+        values = {}
+        for max_size, changes in sorted(layer.get("overrides", ()), key=lambda override: -override[0]):
+            if size <= max_size:
+                values.update(changes)
+        resolved.append(dict(layer, **values) if values else layer)
+    return resolved
+
+
+def render_icon(layers, size=DESIGN_SIZE, cache=None, snap=True):
+    """Render a layer spec to an RGBA image of the given size
+
+    With snap=False the center is the pixel at size // 2 and edges are not
+    moved, as in renders before pixel snapping.
+    """
+    cache = cache or FIELD_CACHE
+    ctx = {
+        "size": size,
+        "center": (size - 1) / 2 if snap else size // 2,
+        "scale": size / DESIGN_SIZE,
+        "cache": cache,
+        "snap": snap,
+    }
+
+    canvas = np.zeros((size, size, 4), dtype=np.float32)
+    for layer in layers_for_size(layers, size):
+        renderer = LAYER_RENDERERS.get(layer["type"])
+        if renderer is None:
+            raise ValueError(f"Unknown icon layer type: {layer['type']}")
+        renderer(canvas, layer, ctx)
+
+    # Un-premultiply for PIL's straight-alpha RGBA
+    alpha = canvas[..., 3:]
+    rgb = np.divide(canvas[..., :3], alpha, out=np.zeros_like(canvas[..., :3]), where=alpha > 0)
+    pixels = np.concatenate([rgb, alpha], axis=-1)
+    return Image.fromarray(np.round(pixels * 255).astype(np.uint8), "RGBA")
+
+
+def render_icons(layers, sizes, cache=None, snap=True):
+    """Render one spec natively at several sizes, sharing cached fields between them"""
+    cache = cache or FIELD_CACHE
+    return {size: render_icon(layers, size, cache, snap) for size in sizes}
+
+
+# Appearances
+
+
+def _lut(curve):
+    levels = np.arange(256, dtype=np.float32) / 255.0
+    return np.round(np.clip(curve(levels), 0, 1) * 255).astype(np.uint8)
+
+
+def _saturation_matrix(saturation):
+    # Mix each color with its luma; 0 gives grayscale, 1 leaves it unchanged
+    return saturation * np.eye(3, dtype=np.float32) + (1 - saturation) * np.outer(np.ones(3), LUMA)
+
+
+# Rec. 709 luma weights
+LUMA = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+
+# Appearance -> (color matrix or None, per-channel lookup table or None)
+APPEARANCES = {
+    # Deeper, slightly muted colors that sit well on the dark home screen
+    "dark": (_saturation_matrix(0.85), _lut(lambda level: 0.6 * level ** 1.3)),
+    # iOS tints a grayscale icon itself; brightening it keeps the tint visible
+    "tinted": (_saturation_matrix(0.0), _lut(lambda level: level ** 0.75)),
+    "grayscale": (_saturation_matrix(0.0), None),
+}
+
+
+def derive_appearance(image, appearance):
+    """An appearance of a rendered RGBA icon, as a per-pixel transform"""
+    matrix, lut = APPEARANCES[appearance]
+    pixels = np.asarray(image)
+    rgb = pixels[..., :3]
+    if matrix is not None:
+        rgb = np.clip(np.round(rgb.astype(np.float32) @ matrix.T), 0, 255).astype(np.uint8)
+    if lut is not None:
+        rgb = lut[rgb]
+    return Image.fromarray(np.concatenate([rgb, pixels[..., 3:]], axis=-1), "RGBA")
+
+
+def render_appearances(layers, sizes, appearances=tuple(APPEARANCES), cache=None):
+    """{size: {appearance: image}} with the base render under None; each size is rendered once"""
+    icons = {}
+    for size, base in render_icons(layers, sizes, cache).items():
+        icons[size] = {None: base}
+        icons[size].update((appearance, derive_appearance(base, appearance)) for appearance in appearances)
+    return icons
+
+
+if __name__ == "__main__":
+    import time
+
+    print("🎨 Rendering sample icon set...")
+    sample = [
+        {"type": "radial_gradient", "inner": (0, 122, 255), "outer": (90, 200, 250)},
+        {"type": "glow", "radius": 200, "alpha": 30, "min_size": 48},
+        {"type": "vignette", "width": 20, "alpha": 20, "overrides": [(64, {"width": 48})]},
+        {"type": "mask"},
+    ]
+
+    start = time.perf_counter()
+    icons = render_icons(sample, [1024, 512, 180, 32, 16])
+    render_icon(sample, 1024)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Rendered {len(icons) + 1} icons in {elapsed:.3f}s")
+    print(f"🧠 Field cache: {FIELD_CACHE.hits} hits, {FIELD_CACHE.misses} misses, "
+          f"{FIELD_CACHE.current_bytes / 1024 / 1024:.1f} MB")
@@ -3,18 +3,8 @@
  * Replicates the SwiftUI app's data management functionality
  */
 
-const { 
-    Exercise, 
-    WorkoutTemplate, 
-    WorkoutSession, 
-    ProgressionType, 
-    WorkoutFocus,
-    WorkoutStats,
-    WeeklyWorkoutData,
-    ProgressionDataPoint,
-    AnalyticsMetric,
-    Timeframe
-} = window.LazyGymModels;
+// Exercise, WorkoutTemplate, WorkoutSession and the enums are top-level declarations
+// in models.js, shared by every script on the page
 
 class DataManager {
     constructor() {
@@ -3,7 +3,7 @@
  * Replicates the SwiftUI app's progression logic
  */
 
-const { ProgressionType, WorkoutFocus } = window.LazyGymModels;
+// ProgressionType and WorkoutFocus are top-level declarations in models.js, shared by every script
 
 class ProgressionCalculator {
     
@@ -149,7 +149,7 @@ class ProgressionCalculator {
                 
             case ProgressionType.PYRAMID:
                 // Pyramid: Use currentReps if available, otherwise use percentage calculations
-                const weight = instance.effectiveWeight;
+                const pyramidWeight = instance.effectiveWeight;
                 const pyramidSets = [];
                 
                 console.log('🔍 Pyramid Set Generation Debug (Instance):');
@@ -161,16 +161,16 @@ class ProgressionCalculator {
                     console.log('   - Using currentReps:', instance.exercise.currentReps);
                     // Use the actual reps from the last workout
                     instance.exercise.currentReps.forEach(reps => {
-                        pyramidSets.push(new WorkoutSet(reps, weight));
+                        pyramidSets.push(new WorkoutSet(reps, pyramidWeight));
                     });
                 } else {
                     console.log('   - Using percentage calculations');
                     // Fall back to percentage calculations (100%, 70%, 50%, 50% of base reps)
                     const baseReps = instance.effectiveBaseReps;
-                    pyramidSets.push(new WorkoutSet(baseReps, weight)); // 100%
-                    pyramidSets.push(new WorkoutSet(Math.floor(baseReps * 0.7), weight)); // 70%
-                    pyramidSets.push(new WorkoutSet(Math.floor(baseReps * 0.5), weight)); // 50%
-                    pyramidSets.push(new WorkoutSet(Math.floor(baseReps * 0.5), weight)); // 50%
+                    pyramidSets.push(new WorkoutSet(baseReps, pyramidWeight)); // 100%
+                    pyramidSets.push(new WorkoutSet(Math.floor(baseReps * 0.7), pyramidWeight)); // 70%
+                    pyramidSets.push(new WorkoutSet(Math.floor(baseReps * 0.5), pyramidWeight)); // 50%
+                    pyramidSets.push(new WorkoutSet(Math.floor(baseReps * 0.5), pyramidWeight)); // 50%
                 }
                 
                 console.log('   - Generated sets:', pyramidSets.map(set => set.plannedReps));
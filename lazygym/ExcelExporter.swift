@@ -20,7 +20,13 @@ struct ExcelExporter {
         // Get all unique exercises across all sessions
         let allExercises = getAllUniqueExercises(from: sortedSessions)
         
-        // Create CSV content (we'll save as .xlsx but use CSV format for simplicity)
+        // Index each session's exercises by id once, so every cell is a dictionary lookup
+        let sessionExercises = sortedSessions.map { session in
+            Dictionary(session.template.currentExercises.map { ($0.exercise.id, $0) },
+                       uniquingKeysWith: { first, _ in first })
+        }
+        
+        // Create CSV content
         var csvContent = ""
         
         // Header row: Date, Exercise1, Exercise2, etc.
@@ -35,17 +41,17 @@ struct ExcelExporter {
         
         // Data rows: each exercise with its performance across sessions
         for exercise in allExercises {
-            csvContent += exercise.name
+            csvContent += csvField(exercise.name)
             
-            for session in sortedSessions {
-                let performance = getExercisePerformance(exercise: exercise, in: session)
-                csvContent += ",\(performance)"
+            for exercises in sessionExercises {
+                let performance = getExercisePerformance(exercise: exercise, in: exercises[exercise.id])
+                csvContent += ",\(csvField(performance))"
             }
             csvContent += "\n"
         }
         
         // Save to temporary file
-        return saveToFile(content: csvContent, filename: "workout_history.xlsx")
+        return saveToFile(content: csvContent, filename: "workout_history.csv")
     }
     
     // MARK: - Helper Methods
@@ -66,9 +72,14 @@ struct ExcelExporter {
         return uniqueExercises.sorted { $0.name < $1.name }
     }
     
-    private static func getExercisePerformance(exercise: Exercise, in session: WorkoutSession) -> String {
-        // Find the exercise in this session
-        guard let workoutExercise = session.template.currentExercises.first(where: { $0.exercise.id == exercise.id }) else {
+    private static func csvField(_ value: String) -> String {
+        // Cells like "80.0kg, reps=8" contain commas, so quote them
+        guard value.contains(",") || value.contains("\"") || value.contains("\n") else { return value }
+        return "\"\(value.replacingOccurrences(of: "\"", with: "\"\""))\""
+    }
+    
+    private static func getExercisePerformance(exercise: Exercise, in workoutExercise: WorkoutExercise?) -> String {
+        guard let workoutExercise = workoutExercise else {
             return "" // Exercise not performed in this session
         }
         
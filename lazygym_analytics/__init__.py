@@ -0,0 +1,35 @@
+"""
+Offline analytics for LazyGym data exports
+
+Loads lazygym-export-*.json files into columnar NumPy arrays and computes the
+same statistics as the web app's DataManager across many athletes at once.
+"""
+
+from .backup import BackupError, BackupStore, backup_exports
+from .cache import QueryCache, load_sources
+from .cohort import CohortSketch, Histogram, cohort_sketch, sketch_exports
+from .columns import History, HistoryBuilder, concat_histories
+from .database import import_export, import_exports, open_database
+from .downsample import ALL_TIME, SeriesCache, downsample, lttb_indices, minmax_indices
+from .forecast import benchmark, fit_saturating, forecast_progressions
+from .loader import find_exports, load_export, load_export_dir, load_exports, open_export
+from .migrate import compile_schema, migrate_directory, migrate_export, migrate_file, validate_export
+from .merge import ExportMerger, merge_exports, normalize_name
+from .materialized import MaterializedStats
+from .packed import PackedExport, pack_export, unpack_export
+from .progression import DEFAULT_RULES, ProgressionRules, prepare_replay, replay, sample_rules, simulate
+from .report import CardRenderer, render_exports, render_reports, report_cards
+from .rollup import VolumeCube, iso_week, week_label
+from .spreadsheet import export_pivot, pivot_indexes, pivot_rows, write_pivot_csv
+from .stats import (
+    exercise_progression,
+    exercise_series,
+    instance_metric_values,
+    longest_streak,
+    workout_frequency,
+    workout_stats,
+)
+from .store import convert_exports, open_store, write_store
+from .stream import iter_records, iter_sessions, stream_export
+from .synthetic import generate_corpus, generate_export, write_export
+from .sync import SyncLog, SyncServer, serve
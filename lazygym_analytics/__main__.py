@@ -0,0 +1,451 @@
+"""
+Command line entry point: python -m lazygym_analytics <command> ...
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from .backup import BackupStore
+from .cache import QueryCache
+from .cohort import cohort_sketch
+from .columns import HistoryBuilder
+from .database import import_exports
+from .forecast import benchmark, forecast_progressions
+from .loader import find_exports, load_exports
+from .merge import merge_exports
+from .migrate import migrate_directory
+from .models import NULL_TIME, format_timestamp
+from .packed import CODECS, pack_export, unpack_export
+from .progression import DEFAULT_RULES, sample_rules, simulate
+from .report import REPORT_FORMATS, render_reports
+from .rollup import DIMENSIONS, VolumeCube
+from .spreadsheet import export_pivot
+from .stats import workout_frequency, workout_stats
+from .store import convert_exports, open_store
+from .stream import stream_export
+from .sync import serve
+from .synthetic import generate_corpus
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+def _export_paths(inputs):
+    paths = []
+    for path in inputs:
+        paths.extend(find_exports(path) if os.path.isdir(path) else [path])
+    return paths
+
+
+def _load_history(args):
+    if len(args.exports) == 1 and os.path.isfile(os.path.join(args.exports[0], "meta.json")):
+        return open_store(args.exports[0])
+
+    paths = _export_paths(args.exports)
+    if not args.stream:
+        return load_exports(paths, workers=args.workers)
+
+    # Constant-memory path: every file streams into one shared builder
+    builder = HistoryBuilder()
+    for path in paths:
+        stream_export(path, builder=builder)
+    return builder.build()
+
+
+def stats_command(args):
+    started = time.perf_counter()
+    if args.cache:
+        with QueryCache(args.cache) as cache:
+            names = cache.query(args.exports, "athletes")
+            stats = cache.query(args.exports, "workout_stats", utc_offset_minutes=args.utc_offset)
+            frequency = cache.query(args.exports, "workout_frequency", timeframe=args.timeframe)
+            summary = f"{cache.hits} cached, {cache.misses} computed"
+        loaded = started
+    else:
+        history = _load_history(args)
+        loaded = time.perf_counter()
+        names = history.athletes
+        stats = workout_stats(history, utc_offset_minutes=args.utc_offset)
+        frequency = workout_frequency(history, args.timeframe)
+        summary = repr(history)
+    finished = time.perf_counter()
+
+    for athlete, name in enumerate(names):
+        print(f"🏋️ {name}")
+        print(f"   - Total workouts: {stats.total_workouts[athlete]}")
+        print(f"   - Average per week: {stats.average_workouts_per_week[athlete]:.2f}")
+        print(f"   - Heaviest lift: {stats.heaviest_lift[athlete]:.1f}kg")
+        print(f"   - Longest streak: {stats.longest_streak[athlete]}")
+        print(f"   - Weekly frequency: {frequency.counts[athlete].tolist()}")
+
+    print(f"📊 {summary}")
+    print(f"⏱️ Loaded in {loaded - started:.2f}s, analysed in {finished - loaded:.3f}s")
+
+
+def backup_command(args):
+    with BackupStore(args.store, codec=args.codec) as store:
+        started = time.perf_counter()
+        for path in _export_paths(args.exports):
+            snapshot = store.add(path)
+            print(f"💾 {snapshot.name}: {snapshot.size / 1e6:.2f} MB in {len(snapshot.chunks)} chunks, "
+                  f"{snapshot.new_chunks} new ({snapshot.new_bytes / 1e3:.1f} kB stored)")
+        elapsed = time.perf_counter() - started
+        stats = store.stats()
+        if not args.exports:
+            for name in store.snapshots():
+                snapshot = store.snapshot(name)
+                print(f"💾 {name}: {snapshot.size / 1e6:.2f} MB, created {snapshot.created}")
+    print(f"📦 {stats.snapshots} snapshots, {stats.logical_bytes / 1e6:.1f} MB of exports stored in "
+          f"{stats.stored_bytes / 1e6:.2f} MB ({stats.chunks} unique chunks)")
+    if args.exports:
+        print(f"⏱️ Backed up in {elapsed:.2f}s")
+
+
+def restore_command(args):
+    started = time.perf_counter()
+    with BackupStore(args.store) as store:
+        written = store.restore(args.snapshot, args.output)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Restored {args.snapshot} to {args.output} in {elapsed:.2f}s "
+          f"({written / 1e6 / max(elapsed, 1e-9):.0f} MB/s)")
+
+
+def cohort_command(args):
+    started = time.perf_counter()
+    sketch = cohort_sketch(_export_paths(args.exports), workers=args.workers, shard_size=args.shard_size,
+                           weeks=args.weeks, plateau_sessions=args.plateau_sessions)
+    report = sketch.report()
+    elapsed = time.perf_counter() - started
+
+    labels = " / ".join(f"p{percentile}" for percentile in report.percentiles)
+
+    def row(values, unit=""):
+        return " / ".join("-" if value != value else f"{value:.1f}{unit}" for value in values)
+
+    print(f"👥 {report.athletes} athletes, {report.sessions} sessions ({labels})")
+    print(f"   - Sessions per week: {row(report.adherence_percentiles)}")
+    print(f"   - Weeks with 0/1/2/3/4+ sessions: "
+          f"{' / '.join(f'{share:.0%}' for share in report.weekly_session_share[:4])} / "
+          f"{report.weekly_session_share[4:].sum():.0%}")
+    for progression_type, weeks in report.plateau_percentiles.items():
+        print(f"   - {progression_type} weeks to plateau: {row(weeks)} "
+              f"({report.plateaued[progression_type]} plateaued, {report.not_plateaued[progression_type]} still progressing)")
+    for name, curve in report.weight_percentiles.items():
+        print(f"🏋️ {name}")
+        for week in (0, 4, 12, 26, 52, 104):
+            if week < len(curve) and report.weight_samples[name][week]:
+                print(f"   - Week {week}: {row(curve[week], 'kg')}")
+    print(f"⏱️ Aggregated in {elapsed:.2f}s")
+
+
+def convert_command(args):
+    started = time.perf_counter()
+    if args.output.endswith(SQLITE_SUFFIXES):
+        added = import_exports(_export_paths(args.exports), args.output)
+        print(f"✅ Added {added} sessions to {args.output} in {time.perf_counter() - started:.2f}s")
+        return
+    history = convert_exports(_export_paths(args.exports), args.output)
+    print(f"✅ Wrote {history!r} to {args.output} in {time.perf_counter() - started:.2f}s")
+
+
+def export_command(args):
+    history = _load_history(args)
+    started = time.perf_counter()
+    written = export_pivot(history, args.output, utc_offset_minutes=args.utc_offset)
+    print(f"✅ Exported {written} athlete pivot(s) to {args.output} in {time.perf_counter() - started:.2f}s")
+
+
+def forecast_command(args):
+    if args.benchmark:
+        result = benchmark(args.benchmark, seed=args.seed)
+        print(f"📈 Fitted {result.series} synthetic series ({result.rows} sessions) in {result.seconds:.2f}s "
+              f"({result.series_per_second:.0f} series/s), median asymptote error {result.median_asymptote_error:.2%}")
+        return
+    if not args.exports:
+        raise SystemExit("forecast needs exports, or --benchmark N")
+    history = _load_history(args)
+    started = time.perf_counter()
+    forecasts = forecast_progressions(history, horizon_days=args.horizon, min_points=args.min_points,
+                                      increment=args.increment)
+    elapsed = time.perf_counter() - started
+
+    count = len(forecasts.athlete)
+    order = np.argsort(np.where(forecasts.plateau == NULL_TIME, np.iinfo(np.int64).max, forecasts.plateau),
+                       kind="stable")
+    for row in order[:args.top]:
+        plateau = forecasts.plateau[row]
+        print(f"🏋️ {history.athletes[forecasts.athlete[row]]} - {history.exercise_names[forecasts.exercise[row]]}: "
+              f"{forecasts.current[row]:.1f}kg now, {forecasts.forecast[row]:.1f}kg in {args.horizon} days, "
+              f"plateau {format_timestamp(plateau)[:10] if plateau != NULL_TIME else 'not in sight'} "
+              f"near {forecasts.asymptote[row]:.1f}kg")
+    print(f"⏱️ Fitted {count} series in {elapsed:.3f}s ({count / max(elapsed, 1e-9):.0f} series/s)")
+
+
+def generate_command(args):
+    started = time.perf_counter()
+    paths = generate_corpus(args.output, args.athletes, args.years, seed=args.seed, workers=args.workers,
+                            compress=args.gzip)
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"✅ Wrote {len(paths)} exports ({size / 1e6:.1f} MB) to {args.output} in {elapsed:.2f}s "
+          f"({size / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+
+
+def merge_command(args):
+    started = time.perf_counter()
+    export, report = merge_exports(_export_paths(args.exports))
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(export, handle, indent=2, ensure_ascii=False)
+    print(f"✅ Merged {report.exports} exports into {args.output} in {time.perf_counter() - started:.2f}s")
+    print(f"   - Exercises: {report.exercises_seen} -> {report.exercises}")
+    print(f"   - Templates: {report.templates_seen} -> {report.templates}")
+    print(f"   - Sessions: {report.sessions_seen} -> {report.sessions} ({report.sessions_replaced} replaced by newer copies)")
+
+
+def migrate_command(args):
+    started = time.perf_counter()
+    reports = []
+    for source in args.exports:
+        reports.extend(migrate_directory(source, args.output, workers=args.workers))
+    elapsed = time.perf_counter() - started
+
+    failed = [report for report in reports if report.errors]
+    for report in failed:
+        print(f"❌ {report.path}: {len(report.errors)} error(s)")
+        for error in report.errors[:args.max_errors]:
+            print(f"   - {error}")
+    upgraded = sum(1 for report in reports if report.templates_upgraded or report.body_parts or report.focuses_inferred)
+    print(f"✅ Checked {len(reports)} exports ({sum(report.sessions for report in reports)} sessions) "
+          f"in {elapsed:.2f}s: {len(failed)} invalid, {upgraded} needed migration")
+    print(f"   - Templates upgraded: {sum(report.templates_upgraded for report in reports)}")
+    print(f"   - Body parts filled in: {sum(report.body_parts for report in reports)}")
+    print(f"   - Template focuses inferred: {sum(report.focuses_inferred for report in reports)}")
+    if failed:
+        raise SystemExit(1)
+
+
+def pack_command(args):
+    started = time.perf_counter()
+    sessions = pack_export(args.export, args.output, codec=args.codec, max_sessions=args.max_sessions)
+    before, after = os.path.getsize(args.export), os.path.getsize(args.output)
+    print(f"✅ Packed {sessions} sessions into {args.output} in {time.perf_counter() - started:.2f}s "
+          f"({before / 1e6:.2f} MB -> {after / 1e6:.2f} MB)")
+
+
+def unpack_command(args):
+    started = time.perf_counter()
+    export = unpack_export(args.packed, args.output, since=args.since, until=args.until)
+    print(f"✅ Wrote {len(export.get('workoutHistory') or [])} sessions to {args.output} "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+def report_command(args):
+    started = time.perf_counter()
+    written = render_reports(_export_paths(args.exports), args.output, workers=args.workers,
+                             shard_size=args.shard_size, fmt=args.format, timeframe=args.timeframe,
+                             max_exercises=args.exercises)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Rendered {len(written)} report cards to {args.output} in {elapsed:.2f}s "
+          f"({len(written) / max(elapsed, 1e-9):.0f} cards/s)")
+
+
+def rollup_command(args):
+    started = time.perf_counter()
+    if args.cube and os.path.exists(args.cube):
+        cube = VolumeCube.load(args.cube)
+    else:
+        cube = VolumeCube(utc_offset_minutes=args.utc_offset)
+    added = cube.add_history(_load_history(args)) if args.exports else 0
+    if args.cube:
+        cube.save(args.cube)
+    loaded = time.perf_counter()
+
+    where = {dimension: getattr(args, dimension) for dimension in ("athlete", "exercise", "body_part", "progression")
+             if getattr(args, dimension)}
+    result = cube.rollup(by=args.by, since=args.since, until=args.until, **where)
+    finished = time.perf_counter()
+
+    for key, volume, reps, sets in zip(result.keys, result.volume, result.reps, result.sets):
+        print(f"📦 {' / '.join(str(label) for label in key) or 'All'}: {volume:.0f}kg volume, {reps} reps, {sets} sets")
+    print(f"📊 {cube!r}, {added} sessions added")
+    print(f"⏱️ Updated in {loaded - started:.2f}s, queried in {(finished - loaded) * 1000:.1f}ms")
+
+
+def simulate_command(args):
+    history = _load_history(args)
+    variants = [DEFAULT_RULES] + sample_rules(args.variants, seed=args.seed)
+    started = time.perf_counter()
+    results = simulate(history, variants, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    baseline, alternatives = results[0], results[1:]
+    print(f"📈 Recorded rules: {baseline.match_rate:.1%} of sessions match, "
+          f"mean divergence {baseline.mean_abs_divergence:.2f}kg")
+    for result in sorted(alternatives, key=lambda result: result.mean_abs_divergence)[:args.top]:
+        rules = result.rules
+        print(f"   - <{rules.low_reps}/<{rules.high_reps} reps, upper +{rules.upper_small}/+{rules.upper_large}kg, "
+              f"lower +{rules.lower_small}/+{rules.lower_large}kg: divergence {result.mean_abs_divergence:.2f}kg, "
+              f"gain {result.mean_predicted_gain:.1f}kg vs {result.mean_recorded_gain:.1f}kg recorded")
+    print(f"⏱️ Replayed {len(results)} rule sets over {history!r} in {elapsed:.2f}s")
+
+
+def serve_command(args):
+    print(f"🔄 Accepting uploads on http://{args.host}:{args.port}/sync/<athlete>, data in {args.data}")
+    try:
+        asyncio.run(serve(args.data, args.host, args.port))
+    except KeyboardInterrupt:
+        print("👋 Stopped")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="lazygym_analytics", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats = commands.add_parser("stats", help="workout stats for exports or a columnar store")
+    stats.add_argument("exports", nargs="+")
+    stats.add_argument("--timeframe", default="twelveWeeks", choices=["eightWeeks", "twelveWeeks"])
+    stats.add_argument("--utc-offset", type=int, default=0, help="athlete time zone in minutes")
+    stats.add_argument("--workers", type=int, default=None)
+    stats.add_argument("--stream", action="store_true", help="parse exports incrementally")
+    stats.add_argument("--cache", default=None, help="SQLite file of cached results, reused until the data changes")
+    stats.set_defaults(handler=stats_command)
+
+    simulate = commands.add_parser("simulate", help="replay progression rules and what-if variants")
+    simulate.add_argument("exports", nargs="+")
+    simulate.add_argument("--variants", type=int, default=200)
+    simulate.add_argument("--seed", type=int, default=None)
+    simulate.add_argument("--top", type=int, default=10, help="closest variants to print")
+    simulate.add_argument("--workers", type=int, default=None)
+    simulate.add_argument("--stream", action="store_true", help="parse exports incrementally")
+    simulate.set_defaults(handler=simulate_command)
+
+    cohort = commands.add_parser("cohort", help="percentiles across all athletes of a gym")
+    cohort.add_argument("exports", nargs="+")
+    cohort.add_argument("--weeks", type=int, default=104, help="weeks tracked per weight curve")
+    cohort.add_argument("--plateau-sessions", type=int, default=6,
+                        help="sessions without a new best that count as a plateau")
+    cohort.add_argument("--shard-size", type=int, default=64, help="export files per worker task")
+    cohort.add_argument("--workers", type=int, default=None)
+    cohort.set_defaults(handler=cohort_command)
+
+    convert = commands.add_parser("convert", help="convert exports into a columnar store")
+    convert.add_argument("exports", nargs="+")
+    convert.add_argument("-o", "--output", required=True,
+                         help="store directory, or a .sqlite/.db file for the SQLite store")
+    convert.set_defaults(handler=convert_command)
+
+    export = commands.add_parser("export", help="exercise x session pivot as .xlsx or CSV files")
+    export.add_argument("exports", nargs="+")
+    export.add_argument("-o", "--output", required=True, help=".xlsx workbook or CSV directory")
+    export.add_argument("--utc-offset", type=int, default=0, help="athlete time zone in minutes")
+    export.add_argument("--workers", type=int, default=None)
+    export.add_argument("--stream", action="store_true", help="parse exports incrementally")
+    export.set_defaults(handler=export_command)
+
+    forecast = commands.add_parser("forecast", help="fit AMRAP weight curves and predict plateaus")
+    forecast.add_argument("exports", nargs="*")
+    forecast.add_argument("--horizon", type=int, default=30, help="days ahead to forecast")
+    forecast.add_argument("--min-points", type=int, default=6, help="sessions a series needs to be fitted")
+    forecast.add_argument("--increment", type=float, default=DEFAULT_RULES.upper_small,
+                          help="remaining gain (kg) below which a lift counts as plateaued")
+    forecast.add_argument("--top", type=int, default=20, help="soonest plateaus to print")
+    forecast.add_argument("--benchmark", type=int, default=0, metavar="SERIES",
+                          help="time fitting this many synthetic series instead")
+    forecast.add_argument("--seed", type=int, default=0)
+    forecast.add_argument("--workers", type=int, default=None)
+    forecast.add_argument("--stream", action="store_true", help="parse exports incrementally")
+    forecast.set_defaults(handler=forecast_command)
+
+    generate = commands.add_parser("generate", help="write synthetic exports for load testing")
+    generate.add_argument("-o", "--output", required=True, help="directory for the export files")
+    generate.add_argument("--athletes", type=int, default=100)
+    generate.add_argument("--years", type=float, default=5)
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--workers", type=int, default=None)
+    generate.add_argument("--gzip", action="store_true", help="write .json.gz files")
+    generate.set_defaults(handler=generate_command)
+
+    merge = commands.add_parser("merge", help="merge exports of one athlete into a single export")
+    merge.add_argument("exports", nargs="+", help="export files, oldest first (directories sort by name)")
+    merge.add_argument("-o", "--output", required=True, help="merged export .json")
+    merge.set_defaults(handler=merge_command)
+
+    migrate = commands.add_parser("migrate", help="validate exports and upgrade legacy data")
+    migrate.add_argument("exports", nargs="+", help="export files or directories")
+    migrate.add_argument("-o", "--output", default=None,
+                         help="directory for the upgraded exports (omit to only validate)")
+    migrate.add_argument("--workers", type=int, default=None)
+    migrate.add_argument("--max-errors", type=int, default=20, help="errors to print per file")
+    migrate.set_defaults(handler=migrate_command)
+
+    pack = commands.add_parser("pack", help="convert an export to the compact seekable format")
+    pack.add_argument("export")
+    pack.add_argument("-o", "--output", required=True, help="packed export file, e.g. history.lgpack")
+    pack.add_argument("--codec", default="gzip", choices=CODECS)
+    pack.add_argument("--max-sessions", type=int, default=256, help="sessions per compressed frame")
+    pack.set_defaults(handler=pack_command)
+
+    unpack = commands.add_parser("unpack", help="convert a packed export back to export JSON")
+    unpack.add_argument("packed")
+    unpack.add_argument("-o", "--output", required=True, help="export .json")
+    unpack.add_argument("--since", default=None, help="only sessions starting at or after this ISO date")
+    unpack.add_argument("--until", default=None, help="only sessions starting before this ISO date")
+    unpack.set_defaults(handler=unpack_command)
+
+    report = commands.add_parser("report", help="render a progression report card per athlete")
+    report.add_argument("exports", nargs="+")
+    report.add_argument("-o", "--output", required=True, help="directory for the cards")
+    report.add_argument("--format", default="png", choices=REPORT_FORMATS)
+    report.add_argument("--timeframe", default="twelveWeeks", choices=["eightWeeks", "twelveWeeks"])
+    report.add_argument("--exercises", type=int, default=4, help="exercises per card, most trained first")
+    report.add_argument("--shard-size", type=int, default=32, help="export files per worker task")
+    report.add_argument("--workers", type=int, default=None)
+    report.set_defaults(handler=report_command)
+
+    rollup = commands.add_parser("rollup", help="volume by athlete, week, body part, progression type and exercise")
+    rollup.add_argument("exports", nargs="*", help="exports whose new sessions are added to the cube")
+    rollup.add_argument("--cube", default=None, help=".npz file the cube is loaded from and saved to")
+    rollup.add_argument("--by", nargs="*", default=["week"], choices=DIMENSIONS, help="dimensions to group by")
+    rollup.add_argument("--athlete", nargs="+", default=None)
+    rollup.add_argument("--exercise", nargs="+", default=None)
+    rollup.add_argument("--body-part", nargs="+", default=None, choices=["upper", "lower"])
+    rollup.add_argument("--progression", nargs="+", default=None, choices=["amrap", "pyramid", "free"])
+    rollup.add_argument("--since", default=None, help="only ISO weeks overlapping this date or later")
+    rollup.add_argument("--until", default=None, help="only ISO weeks starting before this date")
+    rollup.add_argument("--utc-offset", type=int, default=0, help="athlete time zone in minutes, for new cubes")
+    rollup.add_argument("--workers", type=int, default=None)
+    rollup.add_argument("--stream", action="store_true", help="parse exports incrementally")
+    rollup.set_defaults(handler=rollup_command)
+
+    backup = commands.add_parser("backup", help="add exports to a deduplicating backup store, or list it")
+    backup.add_argument("store", help="backup store directory")
+    backup.add_argument("exports", nargs="*", help="export files or directories; omit to list snapshots")
+    backup.add_argument("--codec", default="gzip", choices=CODECS, help="compression for new chunks")
+    backup.set_defaults(handler=backup_command)
+
+    restore = commands.add_parser("restore", help="write a backed up export back out, byte for byte")
+    restore.add_argument("store", help="backup store directory")
+    restore.add_argument("snapshot", help="snapshot name, e.g. lazygym-export-2025-10-01")
+    restore.add_argument("-o", "--output", required=True, help="export .json")
+    restore.set_defaults(handler=restore_command)
+
+    serve_parser = commands.add_parser("serve", help="run the local multi-device ingest server")
+    serve_parser.add_argument("--data", default="sync-data", help="directory for the per-athlete logs")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.set_defaults(handler=serve_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Deduplicating backup store for export files
+
+Every backup from the app is a full lazygym-export-YYYY-MM-DD.json, nearly
+identical to the one before. BackupStore splits each file into
+content-defined chunks and keeps every distinct chunk once, so a new backup
+only costs the chunks around what changed (the new sessions, exportDate):
+
+    chunks.pack           compressed chunks, appended back to back
+    chunks.idx            fixed-size records: digest, offset, stored and raw size
+    snapshots/<name>.json manifest: file size and digest, chunk digests in order
+
+Chunk boundaries come from a 64-bit gear hash over a 64-byte window (as in
+FastCDC), computed for a whole block at once with NumPy in six shift-and-add
+passes: a position ends a chunk when the hash's top bits are zero, at least
+min_size and at most max_size bytes after the previous boundary. Boundaries therefore
+depend only on nearby content, and an insertion shifts the bytes after it
+without changing their chunks.
+
+Writes are append-only: chunk data is flushed before its index records, and
+a manifest is renamed into place last, so an interrupted backup leaves no
+snapshot and at most some unreferenced chunks. Restores stream the chunks in
+order and check the file digest, giving back the original bytes.
+"""
+
+from collections import namedtuple
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+import re
+import struct
+
+import numpy as np
+
+from .packed import CODECS, _compress, _decompress, _zstandard
+
+Snapshot = namedtuple("Snapshot", ["name", "created", "size", "digest", "chunks", "new_chunks", "new_bytes"])
+
+StoreStats = namedtuple("StoreStats", ["snapshots", "chunks", "logical_bytes", "raw_bytes", "stored_bytes"])
+
+MIN_CHUNK = 2 << 10
+AVERAGE_BITS = 13  # 8 KiB average chunks
+MAX_CHUNK = 64 << 10
+READ_SIZE = 4 << 20
+
+_RECORD = struct.Struct("<16sQII")
+_NAME = re.compile(r"^(?!\.{1,2}$)[\w.@-]{1,128}$")
+
+# Fixed pseudo-random value per byte; changing it changes every boundary
+_GEAR = np.random.default_rng(0x4C475942).integers(0, 1 << 64, 256, dtype=np.uint64)
+
+
+class BackupError(ValueError):
+    """A snapshot is missing, invalid or does not restore to its recorded digest"""
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def gear_hashes(data):
+    """Gear hash of the 64 bytes ending at every position of data (uint64)
+
+    h[i] = sum(GEAR[data[i - j]] << j for j in 0..63), wrapping at 64 bits;
+    positions before the start of data contribute nothing.
+    """
+    hashes = _GEAR[np.frombuffer(data, dtype=np.uint8)]
+    shifted = np.empty_like(hashes)
+    width = 1
+    while width < 64:
+        # h[i] += h[i - width] << width doubles the window each pass
+        np.left_shift(hashes[:-width], np.uint64(width), out=shifted[width:])
+        hashes[width:] += shifted[width:]
+        width *= 2
+    return hashes
+
+
+def chunk_boundaries(data, final, min_size=MIN_CHUNK, average_bits=AVERAGE_BITS, max_size=MAX_CHUNK):
+    """End offsets of the chunks of data, which starts at a chunk boundary
+
+    Unless final, bytes after the last boundary are left for the next call,
+    because more data could still move the boundary.
+    """
+    hashes = gear_hashes(data)
+    ends = np.flatnonzero((hashes >> np.uint64(64 - average_bits)) == 0) + 1
+    boundaries = []
+    position = 0
+    while True:
+        index = np.searchsorted(ends, position + min_size)
+        if index < len(ends) and ends[index] <= position + max_size:
+            position = int(ends[index])
+        elif position + max_size <= len(data):
+            position += max_size
+        else:
+            break
+        boundaries.append(position)
+    if final and position < len(data):
+        boundaries.append(len(data))
+    return boundaries
+
+
+def iter_chunks(handle, read_size=READ_SIZE, **options):
+    """Content-defined chunks (bytes) of a binary file object"""
+    pending = b""
+    while True:
+        block = handle.read(read_size)
+        final = not block
+        data = pending + block
+        start = 0
+        for end in chunk_boundaries(data, final, **options):
+            yield data[start:end]
+            start = end
+        pending = data[start:]
+        if final:
+            return
+
+
+class BackupStore:
+    """Chunk store plus snapshot manifests in one directory; one writer at a time"""
+
+    def __init__(self, root, codec="gzip", level=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        if codec == "zstd":
+            _zstandard()
+        self.root = root
+        self.codec = codec
+        self.level = level if level is not None else (6 if codec == "gzip" else 10)
+        os.makedirs(os.path.join(root, "snapshots"), exist_ok=True)
+        self._pack_path = os.path.join(root, "chunks.pack")
+        self._index_path = os.path.join(root, "chunks.idx")
+        # digest -> (offset, stored size, raw size, codec)
+        self._index = self._load_index()
+        self._reader = None
+
+    def _load_index(self):
+        index = {}
+        pack_size = os.path.getsize(self._pack_path) if os.path.exists(self._pack_path) else 0
+        if not os.path.exists(self._index_path):
+            return index
+        with open(self._index_path, "rb") as handle:
+            records = handle.read()
+        # A torn last record, or one whose data never reached the pack, is ignored
+        for start in range(0, len(records) - _RECORD.size + 1, _RECORD.size):
+            digest, offset, stored, raw = _RECORD.unpack_from(records, start)
+            codec = CODECS[stored >> 31]
+            stored &= 0x7FFFFFFF
+            if offset + stored <= pack_size:
+                index[digest] = (offset, stored, raw, codec)
+        return index
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _manifest_path(self, name):
+        if not _NAME.match(name):
+            raise BackupError(f"Invalid snapshot name: {name!r}")
+        return os.path.join(self.root, "snapshots", name + ".json")
+
+    # Backups
+
+    def add(self, path, name=None):
+        """Back up a file as snapshot `name` (default: its file name without .json)
+
+        Adding the same content under an existing name is a no-op; different
+        content under an existing name is an error.
+        """
+        if name is None:
+            name = os.path.basename(path)
+            name = name[:-5] if name.endswith(".json") else name
+        manifest_path = self._manifest_path(name)
+
+        chunks = []
+        new_chunks = new_bytes = size = 0
+        whole = hashlib.blake2b(digest_size=16)
+        records = []
+        with open(path, "rb") as source, open(self._pack_path, "ab") as pack:
+            offset = pack.seek(0, os.SEEK_END)
+            for chunk in iter_chunks(source):
+                digest = _digest(chunk)
+                whole.update(chunk)
+                size += len(chunk)
+                chunks.append(digest.hex())
+                if digest in self._index:
+                    continue
+                stored = _compress(chunk, self.codec, self.level)
+                pack.write(stored)
+                self._index[digest] = (offset, len(stored), len(chunk), self.codec)
+                records.append(_RECORD.pack(digest, offset, len(stored) | (CODECS.index(self.codec) << 31),
+                                            len(chunk)))
+                offset += len(stored)
+                new_chunks += 1
+                new_bytes += len(stored)
+            pack.flush()
+            os.fsync(pack.fileno())
+        if records:
+            with open(self._index_path, "ab") as index:
+                index.write(b"".join(records))
+                index.flush()
+                os.fsync(index.fileno())
+
+        snapshot = Snapshot(name, datetime.now(timezone.utc).isoformat(timespec="seconds"), size,
+                            whole.hexdigest(), chunks, new_chunks, new_bytes)
+        if os.path.exists(manifest_path):
+            existing = self.snapshot(name)
+            if existing.digest != snapshot.digest:
+                raise BackupError(f"Snapshot {name} already exists with different content")
+            return existing._replace(new_chunks=new_chunks, new_bytes=new_bytes)
+
+        temporary = manifest_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump({"name": name, "created": snapshot.created, "size": size, "digest": snapshot.digest,
+                       "chunks": chunks}, handle, separators=(",", ":"))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, manifest_path)
+        return snapshot
+
+    # Snapshots
+
+    def snapshots(self):
+        """Snapshot names, oldest first"""
+        directory = os.path.join(self.root, "snapshots")
+        names = [entry[:-5] for entry in os.listdir(directory) if entry.endswith(".json")]
+        return sorted(names, key=lambda name: (os.path.getmtime(os.path.join(directory, name + ".json")), name))
+
+    def snapshot(self, name):
+        try:
+            with open(self._manifest_path(name), encoding="utf-8") as handle:
+                manifest = json.load(handle)
+        except FileNotFoundError:
+            raise BackupError(f"No snapshot named {name}") from None
+        return Snapshot(manifest["name"], manifest["created"], manifest["size"], manifest["digest"],
+                        manifest["chunks"], 0, 0)
+
+    def _chunk(self, digest):
+        try:
+            offset, stored, raw, codec = self._index[bytes.fromhex(digest)]
+        except KeyError:
+            raise BackupError(f"Missing chunk {digest}") from None
+        if self._reader is None:
+            self._reader = open(self._pack_path, "rb")
+        self._reader.seek(offset)
+        data = _decompress(self._reader.read(stored), codec)
+        if len(data) != raw:
+            raise BackupError(f"Corrupt chunk {digest}")
+        return data
+
+    def iter_snapshot(self, name):
+        """The snapshot's bytes, chunk by chunk; the digest is checked after the last one"""
+        snapshot = self.snapshot(name)
+        whole = hashlib.blake2b(digest_size=16)
+        for digest in snapshot.chunks:
+            data = self._chunk(digest)
+            whole.update(data)
+            yield data
+        if whole.hexdigest() != snapshot.digest:
+            raise BackupError(f"Snapshot {name} does not match its digest")
+
+    def restore(self, name, output):
+        """Write a snapshot to output; returns the number of bytes written"""
+        temporary = output + ".tmp"
+        written = 0
+        try:
+            with open(temporary, "wb") as handle:
+                for data in self.iter_snapshot(name):
+                    handle.write(data)
+                    written += len(data)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        os.replace(temporary, output)
+        return written
+
+    def stats(self):
+        names = self.snapshots()
+        logical = sum(self.snapshot(name).size for name in names)
+        raw = sum(entry[2] for entry in self._index.values())
+        stored = sum(entry[1] for entry in self._index.values())
+        return StoreStats(len(names), len(self._index), logical, raw, stored)
+
+
+def backup_exports(paths, root, codec="gzip"):
+    """Back up export files, in order; returns their Snapshots"""
+    with BackupStore(root, codec=codec) as store:
+        return [store.add(path) for path in paths]
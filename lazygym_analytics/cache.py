@@ -0,0 +1,234 @@
+"""
+Persistent cache of analytics query results
+
+calculateWorkoutStats, calculateWorkoutFrequency and
+calculateExerciseProgression recompute from the raw history on every call.
+QueryCache stores their results in a SQLite file keyed by
+
+    (data fingerprint, query kind, canonical JSON of the parameters)
+
+The fingerprint of export files combines their content digests, which are
+memoized by (size, mtime) so unchanged files are only stat()ed; a columnar
+store is fingerprinted by its meta.json. A hit therefore never loads the
+history. When a set of sources is queried with a new fingerprint (sessions
+were ingested), entries for its previous fingerprint are deleted, and the
+total size of stored results is kept under max_bytes by evicting the least
+recently used entries.
+
+Queries without an explicit `now` use the start of the current UTC day, so
+results stay reusable for the whole day (as SeriesCache does).
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+
+from .loader import athlete_name, find_exports, load_exports
+from .models import MS_PER_DAY, current_time_ms
+from .stats import exercise_progression, exercise_series, workout_frequency, workout_stats
+from .store import open_store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS results (
+    fingerprint TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (fingerprint, kind, params)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+# Query kind -> function of (history, **params)
+QUERIES = {
+    "workout_stats": workout_stats,
+    "workout_frequency": workout_frequency,
+    "exercise_progression": exercise_progression,
+    "exercise_series": exercise_series,
+    "athletes": lambda history: list(history.athletes),
+}
+
+# Queries whose `now` parameter defaults to the current time
+_TIMED_QUERIES = ("workout_stats", "workout_frequency", "exercise_progression")
+
+
+def _is_store(path):
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_sources(paths):
+    """History for a columnar store directory or any mix of export files and directories"""
+    paths = list(paths)
+    if len(paths) == 1 and _is_store(paths[0]):
+        return open_store(paths[0])
+    return load_exports(_expand(paths))
+
+
+def _expand(paths):
+    files = []
+    for path in paths:
+        files.extend(find_exports(path) if os.path.isdir(path) and not _is_store(path) else [path])
+    return files
+
+
+class QueryCache:
+    """Size-bounded, fingerprint-keyed store of query results"""
+
+    def __init__(self, path, max_bytes=256 << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.hits = self.misses = 0
+        # (fingerprint, History) loaded by the last miss, shared by later misses
+        self._loaded = None
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Fingerprints
+
+    def _digest(self, path):
+        """Content digest of a file, recomputed only when its size or mtime changed"""
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        row = self.connection.execute("SELECT size, mtime_ns, digest FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+            return row[2]
+        digest = _file_digest(path)
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                                    (path, stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def fingerprint(self, paths):
+        """Fingerprint of a store directory or of export files and directories
+
+        Export files keep their order, because it decides athlete indexes.
+        """
+        paths = list(paths)
+        fingerprint = hashlib.blake2b(digest_size=16)
+        if len(paths) == 1 and _is_store(paths[0]):
+            meta = os.path.join(paths[0], "meta.json")
+            fingerprint.update(f"store\0{os.stat(meta).st_mtime_ns}\0{self._digest(meta)}".encode())
+        else:
+            for path in _expand(paths):
+                fingerprint.update(f"{athlete_name(path)}\0{self._digest(path)}\0".encode())
+        return fingerprint.hexdigest()
+
+    def _track(self, paths, fingerprint):
+        """Remember a source's fingerprint and drop results for its previous one"""
+        source = "\n".join(os.path.abspath(path) for path in paths)
+        row = self.connection.execute("SELECT fingerprint FROM sources WHERE source = ?", (source,)).fetchone()
+        if row is not None and row[0] == fingerprint:
+            return
+        with self.connection:
+            if row is not None:
+                self.connection.execute("DELETE FROM results WHERE fingerprint = ?", (row[0],))
+            self.connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (source, fingerprint))
+
+    # Results
+
+    def get(self, fingerprint, kind, params):
+        """Cached result, or None"""
+        key = (fingerprint, kind, _canonical(params))
+        row = self.connection.execute(
+            "SELECT value FROM results WHERE fingerprint = ? AND kind = ? AND params = ?", key).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute(
+                "UPDATE results SET last_used = ? WHERE fingerprint = ? AND kind = ? AND params = ?",
+                (time.time_ns(),) + key)
+        return pickle.loads(row[0])
+
+    def put(self, fingerprint, kind, params, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (fingerprint, kind, _canonical(params), blob, len(blob), time.time_ns()))
+            self._evict()
+
+    def _evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for fingerprint, kind, params, size in self.connection.execute(
+                "SELECT fingerprint, kind, params, size FROM results ORDER BY last_used").fetchall():
+            self.connection.execute(
+                "DELETE FROM results WHERE fingerprint = ? AND kind = ? AND params = ?", (fingerprint, kind, params))
+            total -= size
+            if total <= self.max_bytes:
+                return
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
+
+    def size(self):
+        """(entries, bytes) currently stored"""
+        return self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+
+    def query(self, paths, kind, history=None, **params):
+        """Run a QUERIES kind over the sources at paths, through the cache
+
+        history may be passed if it is already loaded; otherwise it is only
+        loaded on a miss.
+        """
+        if kind not in QUERIES:
+            raise ValueError(f"Unknown query: {kind}")
+        paths = list(paths)
+        if kind in _TIMED_QUERIES and params.get("now") is None:
+            params["now"] = current_time_ms() // MS_PER_DAY * MS_PER_DAY
+
+        fingerprint = self.fingerprint(paths)
+        self._track(paths, fingerprint)
+        result = self.get(fingerprint, kind, params)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        if history is None:
+            if self._loaded is None or self._loaded[0] != fingerprint:
+                self._loaded = (fingerprint, load_sources(paths))
+            history = self._loaded[1]
+        result = QUERIES[kind](history, **params)
+        self.put(fingerprint, kind, params, result)
+        return result
+
+
+def _canonical(params):
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
@@ -0,0 +1,302 @@
+"""
+Cross-athlete cohort analytics over directories of exports
+
+DataManager only ever sees one athlete. Here a directory of exports is split
+into shards; each worker loads its shard into a History and reduces it to a
+CohortSketch whose size does not depend on the number of athletes, and the
+parent adds the sketches together. Every aggregate is a fixed-width histogram,
+so merging is exact and percentiles are accurate to half a bin:
+
+    weight curves   per exercise and week since the athlete first trained it,
+                    the athlete's heaviest first-instance weight that week;
+                    only occupied (exercise, week, bin) cells are stored, so
+                    a sketch grows with the data, not with the number of
+                    exercise names
+    adherence       sessions per week over each athlete's active span, and
+                    the distribution of per-week session counts (0, 1, 2...)
+    plateaus        per progression type, weeks from an athlete's first session
+                    of an exercise to its last new best before `plateau_sessions`
+                    sessions without improving (weight for AMRAP and Free,
+                    reps for Pyramid, as calculateMetricValue)
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial, reduce
+
+import numpy as np
+
+from .loader import load_exports
+from .models import MS_PER_WEEK, NULL_TIME, PROGRESSION_TYPES, PYRAMID, UNKNOWN
+from .stats import exercise_series
+
+CohortReport = namedtuple(
+    "CohortReport",
+    ["athletes", "sessions", "percentiles", "weight_percentiles", "weight_samples", "adherence_percentiles",
+     "weekly_session_share", "plateau_percentiles", "plateaued", "not_plateaued"],
+)
+
+# Per-week session counts at or above this share the last bucket
+MAX_WEEKLY_SESSIONS = 14
+
+
+class Histogram:
+    """Fixed-width bins over [0, upper); larger values land in the last bin
+
+    counts may have leading dimensions (one histogram per row), and two
+    histograms with the same bins merge by adding their counts.
+    """
+
+    def __init__(self, width, upper, shape=()):
+        self.width = width
+        self.bins = max(1, int(np.ceil(upper / width)))
+        self.counts = np.zeros(tuple(shape) + (self.bins,), dtype=np.int64)
+
+    def bin_of(self, values):
+        return np.clip((np.asarray(values, dtype=np.float64) / self.width).astype(np.int64), 0, self.bins - 1)
+
+    def add(self, values, rows=None):
+        """Count values, into the given flat row of counts for each value"""
+        index = self.bin_of(values)
+        if rows is not None:
+            index = np.asarray(rows, dtype=np.int64) * self.bins + index
+        self.counts += np.bincount(index, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def quantiles(self, fractions):
+        """Interpolated quantiles along the last axis; NaN where a row is empty"""
+        fractions = np.asarray(fractions, dtype=np.float64)
+        cumulative = self.counts.cumsum(axis=-1)
+        total = cumulative[..., -1:]
+        target = total * fractions
+        # First bin whose cumulative count reaches each target
+        index = (cumulative[..., None, :] < target[..., None]).sum(axis=-1)
+        index = np.minimum(index, self.bins - 1)
+        before = np.where(index > 0, np.take_along_axis(cumulative, np.maximum(index - 1, 0), axis=-1), 0)
+        inside = np.take_along_axis(self.counts, index, axis=-1)
+        fraction = np.divide(target - before, inside, out=np.zeros(target.shape), where=inside > 0)
+        values = (index + np.clip(fraction, 0.0, 1.0)) * self.width
+        return np.where(total > 0, values, np.nan)
+
+
+def _group_starts(*keys):
+    """Boolean mask of the first row of each run of equal keys (rows are sorted)"""
+    same = np.ones(len(keys[0]), dtype=bool)
+    same[:1] = False
+    for key in keys:
+        same[1:] &= key[1:] == key[:-1]
+    return ~same
+
+
+def _series_types(history, series):
+    """instance.exercise.progressionType of each exercise_series row's instance"""
+    instances = history.instances
+    key = instances["session"].astype(np.int64) * max(1, len(history.exercise_names)) + instances["exercise"]
+    order = np.argsort(key, kind="stable")
+    wanted = series.session.astype(np.int64) * max(1, len(history.exercise_names)) + series.exercise
+    found = order[np.searchsorted(key[order], wanted)]
+    return instances["exercise_progression"][found]
+
+
+class CohortSketch:
+    """Mergeable partial aggregates for a set of athletes"""
+
+    def __init__(self, weeks=104, weight_bin=0.5, max_weight=500.0, plateau_sessions=6):
+        self.weeks = weeks
+        self.weight_bin = weight_bin
+        self.max_weight = max_weight
+        self.plateau_sessions = plateau_sessions
+        self.athletes = 0
+        self.sessions = 0
+        # Exercise name -> code in the sparse weight-curve cells
+        self.curve_names = {}
+        # Sorted (code, week, weight bin) cell keys and their athlete-week counts
+        self._curve_keys = np.zeros(0, dtype=np.int64)
+        self._curve_counts = np.zeros(0, dtype=np.int64)
+        self.adherence = Histogram(0.25, MAX_WEEKLY_SESSIONS)
+        self.weekly_sessions = np.zeros(MAX_WEEKLY_SESSIONS + 1, dtype=np.int64)
+        self.plateaus = Histogram(1.0, weeks, shape=(len(PROGRESSION_TYPES),))
+        self.not_plateaued = np.zeros(len(PROGRESSION_TYPES), dtype=np.int64)
+
+    def _options(self):
+        return (self.weeks, self.weight_bin, self.max_weight, self.plateau_sessions)
+
+    def merge(self, other):
+        """Add another sketch built with the same options; returns self"""
+        if other._options() != self._options():
+            raise ValueError("Cohort sketches with different options cannot be merged")
+        self.athletes += other.athletes
+        self.sessions += other.sessions
+        self._add_curve_cells(other._curve_keys, other._curve_counts, list(other.curve_names))
+        self.adherence.merge(other.adherence)
+        self.weekly_sessions += other.weekly_sessions
+        self.plateaus.merge(other.plateaus)
+        self.not_plateaued += other.not_plateaued
+        return self
+
+    def add_history(self, history):
+        """Fold every athlete of a History into the sketch; returns self"""
+        sessions = history.sessions
+        active = np.bincount(sessions["athlete"], minlength=history.athlete_count) > 0
+        self.athletes += int(active.sum())
+        self.sessions += history.session_count
+        if history.session_count:
+            self._add_adherence(history)
+            self._add_weight_curves(history)
+            self._add_plateaus(history)
+        return self
+
+    def _add_adherence(self, history):
+        dated = history.sessions["start"] != NULL_TIME
+        athlete = history.sessions["athlete"][dated].astype(np.int64)
+        start = history.sessions["start"][dated]
+        if not len(start):
+            return
+        count = np.bincount(athlete, minlength=history.athlete_count)
+        first = np.full(history.athlete_count, np.iinfo(np.int64).max)
+        last = np.full(history.athlete_count, np.iinfo(np.int64).min)
+        np.minimum.at(first, athlete, start)
+        np.maximum.at(last, athlete, start)
+        active = count > 0
+        spans = (last[active] - first[active]) // MS_PER_WEEK + 1
+        self.adherence.add(count[active] / spans)
+
+        week = (start - first[athlete]) // MS_PER_WEEK
+        _, per_week = np.unique(athlete * (int(spans.max()) + 1) + week, return_counts=True)
+        self.weekly_sessions += np.bincount(np.minimum(per_week, MAX_WEEKLY_SESSIONS),
+                                            minlength=MAX_WEEKLY_SESSIONS + 1)
+        self.weekly_sessions[0] += int(spans.sum()) - len(per_week)
+
+    def _add_weight_curves(self, history):
+        series = exercise_series(history, "weight")
+        if not len(series.value):
+            return
+        group_start = _group_starts(series.athlete, series.exercise)
+        group = np.cumsum(group_start) - 1
+        week = (series.start - series.start[group_start][group]) // MS_PER_WEEK
+        keep = week < self.weeks
+        exercise, week, value = series.exercise[keep], week[keep], series.value[keep]
+        athlete = series.athlete[keep]
+        if not len(value):
+            return
+
+        # Heaviest weight per athlete, exercise and week (rows are already grouped)
+        first = np.flatnonzero(_group_starts(athlete, exercise, week))
+        heaviest = np.maximum.reduceat(value, first)
+        exercise, week = exercise[first].astype(np.int64), week[first]
+        curve = self._curve_histogram()
+        cell = (exercise * self.weeks + week) * curve.bins + curve.bin_of(heaviest)
+        keys, counts = np.unique(cell, return_counts=True)
+        self._add_curve_cells(keys, counts, history.exercise_names)
+
+    def _curve_histogram(self, rows=0):
+        return Histogram(self.weight_bin, self.max_weight, shape=(rows,))
+
+    def _add_curve_cells(self, keys, counts, names):
+        """Add cells whose keys use codes into names, re-coding them to this sketch's names"""
+        if not len(keys):
+            return
+        per_name = self.weeks * self._curve_histogram().bins
+        codes, rest = np.divmod(keys, per_name)
+        # Only names with cells get a code, so the report lists no empty curves
+        remap = np.zeros(len(names), dtype=np.int64)
+        for code in np.unique(codes).tolist():
+            remap[code] = self.curve_names.setdefault(names[code], len(self.curve_names))
+        keys = np.concatenate([self._curve_keys, remap[codes] * per_name + rest])
+        counts = np.concatenate([self._curve_counts, counts])
+        self._curve_keys, inverse = np.unique(keys, return_inverse=True)
+        self._curve_counts = np.bincount(inverse, weights=counts, minlength=len(self._curve_keys)).astype(np.int64)
+
+    def weight_curve(self, name):
+        """Histogram of the heaviest weight per week for one exercise (bins x weeks, built on demand)"""
+        curve = self._curve_histogram(self.weeks)
+        code = self.curve_names.get(name)
+        if code is not None:
+            per_name = curve.counts.size
+            low, high = np.searchsorted(self._curve_keys, [code * per_name, (code + 1) * per_name])
+            curve.counts.reshape(-1)[self._curve_keys[low:high] - code * per_name] = self._curve_counts[low:high]
+        return curve
+
+    def _add_plateaus(self, history):
+        for metric in ("weight", "reps"):
+            series = exercise_series(history, metric)
+            if not len(series.value):
+                continue
+            types = _series_types(history, series)
+            # Pyramid progresses in reps, the others in weight
+            keep = (types == PYRAMID) if metric == "reps" else ((types != PYRAMID) & (types != UNKNOWN))
+            self._plateau_series(series.athlete[keep], series.exercise[keep], series.start[keep],
+                                 series.value[keep], types[keep])
+
+    def _plateau_series(self, athlete, exercise, start, value, types):
+        if not len(value):
+            return
+        group_start = _group_starts(athlete, exercise)
+        group = np.cumsum(group_start) - 1
+        rows = np.arange(len(value))
+
+        # Running best within each group: offset every group above the previous one
+        offset = group * (float(value.max()) + 1.0)
+        best = np.maximum.accumulate(value + offset) - offset
+        improved = group_start.copy()
+        improved[1:] |= value[1:] > best[:-1]
+        last_improvement = np.maximum.accumulate(np.where(improved, rows, 0))
+
+        stalled = rows - last_improvement >= self.plateau_sessions
+        groups = group_start.sum()
+        plateau_group, plateau_row = np.unique(group[stalled], return_index=True)
+        plateau_row = np.flatnonzero(stalled)[plateau_row]
+
+        first_row = np.flatnonzero(group_start)
+        weeks = (start[last_improvement[plateau_row]] - start[first_row[plateau_group]]) / MS_PER_WEEK
+        group_type = types[first_row].astype(np.int64)
+        self.plateaus.add(weeks, rows=group_type[plateau_group])
+        reached = np.zeros(groups, dtype=bool)
+        reached[plateau_group] = True
+        self.not_plateaued += np.bincount(group_type[~reached], minlength=len(PROGRESSION_TYPES))
+
+    def report(self, percentiles=(10, 25, 50, 75, 90)):
+        """CohortReport with percentile arrays (NaN where there is no data)"""
+        fractions = np.asarray(percentiles, dtype=np.float64) / 100
+        curves = {name: self.weight_curve(name) for name in sorted(self.curve_names)}
+        weekly_total = self.weekly_sessions.sum()
+        plateaued = self.plateaus.counts.sum(axis=-1)
+        plateau_percentiles = self.plateaus.quantiles(fractions)
+        return CohortReport(
+            self.athletes,
+            self.sessions,
+            tuple(percentiles),
+            {name: curve.quantiles(fractions) for name, curve in curves.items()},
+            {name: curve.counts.sum(axis=-1) for name, curve in curves.items()},
+            self.adherence.quantiles(fractions),
+            self.weekly_sessions / weekly_total if weekly_total else self.weekly_sessions.astype(np.float64),
+            {name: plateau_percentiles[code] for code, name in enumerate(PROGRESSION_TYPES)},
+            {name: int(plateaued[code]) for code, name in enumerate(PROGRESSION_TYPES)},
+            {name: int(self.not_plateaued[code]) for code, name in enumerate(PROGRESSION_TYPES)},
+        )
+
+
+def sketch_exports(paths, **options):
+    """CohortSketch of a shard of export files, loaded in this process"""
+    paths = list(paths)
+    sketch = CohortSketch(**options)
+    if paths:
+        sketch.add_history(load_exports(paths, workers=1))
+    return sketch
+
+
+def cohort_sketch(paths, workers=None, shard_size=64, **options):
+    """Map shards of export files to sketches in a process pool and merge them"""
+    paths = list(paths)
+    shards = [paths[index:index + shard_size] for index in range(0, len(paths), shard_size)]
+    if workers == 1 or len(shards) < 2:
+        return reduce(CohortSketch.merge, map(partial(sketch_exports, **options), shards), CohortSketch(**options))
+    merged = CohortSketch(**options)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Sketches are merged in completion order and then dropped
+        for future in as_completed([pool.submit(sketch_exports, shard, **options) for shard in shards]):
+            merged.merge(future.result())
+    return merged
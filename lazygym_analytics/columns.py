@@ -0,0 +1,238 @@
+"""
+Columnar in-memory representation of LazyGym workout history
+
+An export nests workoutHistory[].template.exerciseInstances[].sets[]. Here each
+level becomes a table of NumPy columns linked by parent row indices, with
+exercise names dictionary-encoded and timestamps as int64 epoch milliseconds.
+"""
+
+from array import array
+
+import numpy as np
+
+from .models import NULL_REPS, focus_code, parse_timestamp, progression_code
+
+# Column name -> dtype for each table; rows of a child table are stored in
+# parent order, so "session" and "instance" columns are non-decreasing
+TABLE_SCHEMA = {
+    "sessions": {
+        "athlete": np.int32,
+        "start": np.int64,
+        "end": np.int64,
+        "focus": np.int8,
+        "completed": np.bool_,
+    },
+    "instances": {
+        "session": np.int32,
+        "exercise": np.int32,
+        # instance.progressionType (drives progression updates)
+        "progression": np.int8,
+        # instance.exercise.progressionType (drives calculateMetricValue)
+        "exercise_progression": np.int8,
+        "body_part": np.int8,
+        "upper": np.bool_,
+    },
+    "sets": {
+        "instance": np.int32,
+        "weight": np.float64,
+        "planned_reps": np.int32,
+        "actual_reps": np.int32,
+        "completed": np.bool_,
+        "completed_at": np.int64,
+    },
+}
+
+# array.array typecodes used while accumulating rows
+_TYPECODES = {
+    np.int8: "b",
+    np.int32: "i",
+    np.int64: "q",
+    np.float64: "d",
+    np.bool_: "b",
+}
+
+
+class History:
+    """Sessions, exercise instances and sets of one or more athletes as columns"""
+
+    def __init__(self, tables, exercise_names, athletes, session_ids):
+        self.sessions = tables["sessions"]
+        self.instances = tables["instances"]
+        self.sets = tables["sets"]
+        self.exercise_names = list(exercise_names)
+        self.athletes = list(athletes)
+        # Any sequence of str; the on-disk store passes a lazy decoding view
+        self.session_ids = session_ids
+        self._exercise_codes = None
+
+    @property
+    def tables(self):
+        return {"sessions": self.sessions, "instances": self.instances, "sets": self.sets}
+
+    @property
+    def session_count(self):
+        return len(self.sessions["start"])
+
+    @property
+    def athlete_count(self):
+        return len(self.athletes)
+
+    def exercise_code(self, name):
+        """Dictionary code for an exercise name, or -1 if it never appears"""
+        if self._exercise_codes is None:
+            self._exercise_codes = {name: code for code, name in enumerate(self.exercise_names)}
+        return self._exercise_codes.get(name, -1)
+
+    def instance_offsets(self):
+        """CSR offsets of each session's instances (length sessions + 1)"""
+        return np.searchsorted(self.instances["session"], np.arange(self.session_count + 1))
+
+    def set_offsets(self):
+        """CSR offsets of each instance's sets (length instances + 1)"""
+        instance_count = len(self.instances["session"])
+        return np.searchsorted(self.sets["instance"], np.arange(instance_count + 1))
+
+    def instance_athlete(self):
+        return self.sessions["athlete"][self.instances["session"]]
+
+    def set_session(self):
+        return self.instances["session"][self.sets["instance"]]
+
+    def __repr__(self):
+        return (f"History({self.athlete_count} athletes, {self.session_count} sessions, "
+                f"{len(self.instances['session'])} instances, {len(self.sets['instance'])} sets)")
+
+
+class HistoryBuilder:
+    """Appends export sessions row by row into compact typed buffers"""
+
+    def __init__(self):
+        self.athletes = []
+        self.exercise_names = []
+        self.session_ids = []
+        self._exercise_codes = {}
+        self._columns = {
+            table: {name: array(_TYPECODES[dtype]) for name, dtype in columns.items()}
+            for table, columns in TABLE_SCHEMA.items()
+        }
+
+    def add_athlete(self, name):
+        self.athletes.append(name)
+        return len(self.athletes) - 1
+
+    def exercise_code(self, name):
+        code = self._exercise_codes.get(name)
+        if code is None:
+            code = len(self.exercise_names)
+            self._exercise_codes[name] = code
+            self.exercise_names.append(name)
+        return code
+
+    def add_session(self, session, athlete=0):
+        """Append one workoutHistory entry (a parsed WorkoutSession JSON dict)"""
+        sessions = self._columns["sessions"]
+        template = session.get("template") or {}
+        session_index = len(self.session_ids)
+
+        self.session_ids.append(session.get("id"))
+        sessions["athlete"].append(athlete)
+        sessions["start"].append(parse_timestamp(session.get("startTime")))
+        sessions["end"].append(parse_timestamp(session.get("endTime")))
+        sessions["focus"].append(focus_code(template.get("focus")))
+        sessions["completed"].append(bool(session.get("isCompleted")))
+
+        for instance in template.get("exerciseInstances") or []:
+            self.add_instance(instance, session_index)
+        return session_index
+
+    def add_instance(self, instance, session_index):
+        instances = self._columns["instances"]
+        exercise = instance.get("exercise") or {}
+        instance_index = len(instances["session"])
+
+        instances["session"].append(session_index)
+        instances["exercise"].append(self.exercise_code(exercise.get("name")))
+        instances["progression"].append(
+            progression_code(instance.get("progressionType") or exercise.get("progressionType")))
+        instances["exercise_progression"].append(progression_code(exercise.get("progressionType")))
+        instances["body_part"].append(focus_code(exercise.get("bodyPart")))
+        instances["upper"].append(bool(exercise.get("isUpperBody")))
+
+        for workout_set in instance.get("sets") or []:
+            self.add_set(workout_set, instance_index)
+        return instance_index
+
+    def add_set(self, workout_set, instance_index):
+        sets = self._columns["sets"]
+        actual_reps = workout_set.get("actualReps")
+
+        sets["instance"].append(instance_index)
+        sets["weight"].append(float(workout_set.get("weight") or 0.0))
+        sets["planned_reps"].append(int(workout_set.get("plannedReps") or 0))
+        sets["actual_reps"].append(NULL_REPS if actual_reps is None else int(actual_reps))
+        sets["completed"].append(bool(workout_set.get("isCompleted")))
+        sets["completed_at"].append(parse_timestamp(workout_set.get("completedAt")))
+
+    def add_export(self, export, athlete_name):
+        """Append every session of a parsed export dict as a new athlete"""
+        athlete = self.add_athlete(athlete_name)
+        for session in export.get("workoutHistory") or []:
+            self.add_session(session, athlete)
+        return athlete
+
+    def build(self):
+        tables = {
+            table: {
+                name: np.frombuffer(buffer, dtype=buffer.typecode).astype(TABLE_SCHEMA[table][name])
+                if len(buffer) else np.empty(0, dtype=TABLE_SCHEMA[table][name])
+                for name, buffer in columns.items()
+            }
+            for table, columns in self._columns.items()
+        }
+        return History(tables, self.exercise_names, self.athletes, self.session_ids)
+
+
+def concat_histories(parts):
+    """Concatenate Histories, re-basing row links and merging exercise dictionaries"""
+    exercise_names = []
+    exercise_codes = {}
+    athletes = []
+    session_ids = []
+    chunks = {table: {name: [] for name in columns} for table, columns in TABLE_SCHEMA.items()}
+    session_base = instance_base = 0
+
+    for part in parts:
+        remap = np.empty(len(part.exercise_names), dtype=np.int32)
+        for code, name in enumerate(part.exercise_names):
+            if name not in exercise_codes:
+                exercise_codes[name] = len(exercise_names)
+                exercise_names.append(name)
+            remap[code] = exercise_codes[name]
+
+        for table, columns in part.tables.items():
+            for name, values in columns.items():
+                if table == "sessions" and name == "athlete":
+                    values = values + len(athletes)
+                elif table == "instances" and name == "session":
+                    values = values + session_base
+                elif table == "instances" and name == "exercise":
+                    values = remap[values] if len(values) else values
+                elif table == "sets" and name == "instance":
+                    values = values + instance_base
+                chunks[table][name].append(values)
+
+        athletes.extend(part.athletes)
+        session_ids.extend(part.session_ids)
+        session_base += part.session_count
+        instance_base += len(part.instances["session"])
+
+    tables = {
+        table: {
+            name: np.concatenate(values).astype(TABLE_SCHEMA[table][name], copy=False)
+            if values else np.empty(0, dtype=TABLE_SCHEMA[table][name])
+            for name, values in columns.items()
+        }
+        for table, columns in chunks.items()
+    }
+    return History(tables, exercise_names, athletes, session_ids)
+
@@ -0,0 +1,248 @@
+"""
+SQLite history store with indexed versions of the in-app analytics queries
+
+DataManager.calculateExerciseProgression filters the whole workoutHistory by
+date and then searches each session's exerciseInstances by name. Here every
+instance row carries its session's athlete and start time plus the three
+calculateMetricValue results, computed once at import. The first instance of
+each exercise per session is covered by a partial index on
+(athlete, exercise_name, start_time) that also holds the metric values, so a
+progression chart is a single index-only range scan. Weekly counts use the (athlete, start_time) session index.
+"""
+
+from collections import namedtuple
+import sqlite3
+
+from .loader import athlete_name
+from .models import (
+    MS_PER_DAY,
+    MS_PER_WEEK,
+    NULL_TIME,
+    current_time_ms,
+    parse_timestamp,
+    timeframe_weeks,
+)
+from .stream import iter_sessions
+
+ProgressionDataPoint = namedtuple("ProgressionDataPoint", ["date", "value"])
+WeeklyWorkoutData = namedtuple("WeeklyWorkoutData", ["week_start", "workout_count"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS athletes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    athlete INTEGER NOT NULL REFERENCES athletes (id),
+    session_id TEXT,
+    start_time INTEGER,
+    end_time INTEGER,
+    focus TEXT,
+    is_completed INTEGER NOT NULL,
+    UNIQUE (athlete, session_id)
+);
+CREATE TABLE IF NOT EXISTS instances (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL REFERENCES sessions (id),
+    position INTEGER NOT NULL,
+    athlete INTEGER NOT NULL,
+    start_time INTEGER,
+    exercise_name TEXT,
+    progression_type TEXT,
+    exercise_progression_type TEXT,
+    body_part TEXT,
+    is_upper_body INTEGER NOT NULL,
+    first_in_session INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    reps REAL NOT NULL,
+    volume REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sets (
+    instance INTEGER NOT NULL REFERENCES instances (id),
+    position INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    planned_reps INTEGER NOT NULL,
+    actual_reps INTEGER,
+    is_completed INTEGER NOT NULL,
+    completed_at INTEGER,
+    PRIMARY KEY (instance, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS instances_exercise_start
+    ON instances (athlete, exercise_name, start_time, weight, reps, volume, first_in_session)
+    WHERE first_in_session;
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions (athlete, start_time);
+"""
+
+# Metric -> materialized column; also the whitelist for query interpolation
+METRIC_COLUMNS = {"weight": "weight", "reps": "reps", "volume": "volume"}
+
+
+def open_database(path):
+    """Open (creating if needed) a history database in WAL mode"""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def metric_values(instance):
+    """calculateMetricValue for the weight, reps and volume metrics of one instance"""
+    sets = instance.get("sets") or []
+    logged = [workout_set for workout_set in sets if workout_set.get("actualReps") is not None]
+
+    weight = (sets[0].get("weight") or 0.0) if sets else 0.0
+    progression_type = (instance.get("exercise") or {}).get("progressionType")
+    if progression_type in ("amrap", "free"):
+        reps = (sets[-1].get("actualReps") or 0) if sets else 0
+    elif progression_type == "pyramid":
+        reps = sum(workout_set["actualReps"] for workout_set in logged)
+    else:
+        reps = 0
+    volume = sum((workout_set.get("weight") or 0.0) * workout_set["actualReps"] for workout_set in logged)
+    return float(weight), float(reps), float(volume)
+
+
+def _nullable_time(value):
+    parsed = parse_timestamp(value)
+    return None if parsed == NULL_TIME else parsed
+
+
+def athlete_id(connection, name):
+    """Id of an athlete, registering the name on first use"""
+    connection.execute("INSERT OR IGNORE INTO athletes (name) VALUES (?)", (name,))
+    return connection.execute("SELECT id FROM athletes WHERE name = ?", (name,)).fetchone()[0]
+
+
+def insert_sessions(connection, sessions, athlete, batch_size=1000):
+    """Bulk insert workoutHistory entries for one athlete; returns the number added
+
+    Sessions whose id is already stored for the athlete are skipped, so
+    importing overlapping exports is idempotent. Row ids are assigned here so
+    that each batch is three executemany calls.
+    """
+    with connection:
+        athlete = athlete_id(connection, athlete)
+        known = {row[0] for row in connection.execute(
+            "SELECT session_id FROM sessions WHERE athlete = ? AND session_id IS NOT NULL", (athlete,))}
+        next_session = (connection.execute("SELECT MAX(id) FROM sessions").fetchone()[0] or 0) + 1
+        next_instance = (connection.execute("SELECT MAX(id) FROM instances").fetchone()[0] or 0) + 1
+
+        session_rows, instance_rows, set_rows = [], [], []
+        added = 0
+        for session in sessions:
+            session_id = session.get("id")
+            if session_id is not None:
+                if session_id in known:
+                    continue
+                known.add(session_id)
+            template = session.get("template") or {}
+            start_time = _nullable_time(session.get("startTime"))
+            session_rows.append((
+                next_session, athlete, session_id, start_time, _nullable_time(session.get("endTime")),
+                template.get("focus"), bool(session.get("isCompleted")),
+            ))
+
+            seen_names = set()
+            for position, instance in enumerate(template.get("exerciseInstances") or []):
+                exercise = instance.get("exercise") or {}
+                name = exercise.get("name")
+                instance_rows.append((
+                    next_instance, next_session, position, athlete, start_time, name,
+                    instance.get("progressionType") or exercise.get("progressionType"),
+                    exercise.get("progressionType"), exercise.get("bodyPart"),
+                    bool(exercise.get("isUpperBody")), name not in seen_names,
+                ) + metric_values(instance))
+                seen_names.add(name)
+
+                for set_position, workout_set in enumerate(instance.get("sets") or []):
+                    actual_reps = workout_set.get("actualReps")
+                    set_rows.append((
+                        next_instance, set_position, float(workout_set.get("weight") or 0.0),
+                        int(workout_set.get("plannedReps") or 0),
+                        None if actual_reps is None else int(actual_reps),
+                        bool(workout_set.get("isCompleted")),
+                        _nullable_time(workout_set.get("completedAt")),
+                    ))
+                next_instance += 1
+            next_session += 1
+            added += 1
+
+            if len(session_rows) >= batch_size:
+                _flush(connection, session_rows, instance_rows, set_rows)
+        _flush(connection, session_rows, instance_rows, set_rows)
+    return added
+
+
+def _flush(connection, session_rows, instance_rows, set_rows):
+    connection.executemany("INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)", session_rows)
+    connection.executemany(
+        "INSERT INTO instances VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", instance_rows)
+    connection.executemany("INSERT INTO sets VALUES (?, ?, ?, ?, ?, ?, ?)", set_rows)
+    for rows in (session_rows, instance_rows, set_rows):
+        rows.clear()
+
+
+def import_export(connection, path, athlete=None, batch_size=1000):
+    """Stream one export file into the database; returns the number of sessions added"""
+    return insert_sessions(connection, iter_sessions(path), athlete or athlete_name(path), batch_size)
+
+
+def import_exports(paths, database_path):
+    """Import export files (one athlete each) into a database file"""
+    connection = open_database(database_path)
+    try:
+        return sum(import_export(connection, path) for path in paths)
+    finally:
+        connection.close()
+
+
+def exercise_progression(connection, athlete, exercise_name, metric, timeframe, now=None):
+    """calculateExerciseProgression as an index range scan
+
+    Returns ProgressionDataPoint(date in epoch ms, value) rows for the first
+    instance of the exercise in each session of the timeframe, oldest first,
+    keeping only positive values like the app.
+    """
+    column = METRIC_COLUMNS.get(metric)
+    if column is None:
+        raise ValueError(f"Unknown analytics metric: {metric}")
+    now = current_time_ms() if now is None else now
+    start_date = now - timeframe_weeks(timeframe) * MS_PER_WEEK
+
+    rows = connection.execute(
+        f"""
+        SELECT instances.start_time, instances.{column}
+        FROM instances JOIN athletes ON athletes.id = instances.athlete
+        WHERE athletes.name = ? AND instances.exercise_name = ? AND instances.first_in_session
+          AND instances.start_time >= ? AND instances.{column} > 0
+        ORDER BY instances.start_time
+        """,
+        (athlete, exercise_name, start_date),
+    )
+    return [ProgressionDataPoint(*row) for row in rows]
+
+
+def workout_frequency(connection, athlete, timeframe, now=None):
+    """calculateWorkoutFrequency from one range scan of the session index
+
+    Each week covers its first day through six days later, as in the JS.
+    """
+    now = current_time_ms() if now is None else now
+    weeks = timeframe_weeks(timeframe)
+    start_date = now - weeks * MS_PER_WEEK
+
+    counts = dict(connection.execute(
+        """
+        SELECT (sessions.start_time - :start) / :week, COUNT(*)
+        FROM sessions JOIN athletes ON athletes.id = sessions.athlete
+        WHERE athletes.name = :athlete
+          AND sessions.start_time >= :start AND sessions.start_time < :end
+          AND (sessions.start_time - :start) % :week <= :six_days
+        GROUP BY 1
+        """,
+        {"athlete": athlete, "start": start_date, "end": start_date + weeks * MS_PER_WEEK,
+         "week": MS_PER_WEEK, "six_days": 6 * MS_PER_DAY},
+    ))
+    return [WeeklyWorkoutData(start_date + week * MS_PER_WEEK, counts.get(week, 0)) for week in range(weeks)]
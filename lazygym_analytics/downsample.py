@@ -0,0 +1,172 @@
+"""
+Chart-ready progression series with a bounded number of points
+
+UIManager.renderProgressionChart plots every ProgressionDataPoint. For long
+histories this module reduces a series to a point budget first, with either
+Largest-Triangle-Three-Buckets (keeps the visual shape of a line) or min/max
+bucketing (keeps every bucket's extremes, so no PR disappears).
+
+SeriesCache memoizes results per (athlete, exercise, metric, timeframe,
+budget, method). Full-history series are computed once per metric for all
+exercises with exercise_series(); when sessions land, only the cached
+entries of the exercises those sessions touched are dropped.
+"""
+
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from .models import ANALYTICS_METRICS, MS_PER_DAY, MS_PER_WEEK, current_time_ms, timeframe_weeks
+from .stats import exercise_series
+
+ChartSeries = namedtuple("ChartSeries", ["date", "value"])
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+# Timeframe value meaning the whole history
+ALL_TIME = "allTime"
+
+
+def lttb_indices(x, y, budget):
+    """Indices kept by Largest-Triangle-Three-Buckets, first and last included"""
+    count = len(x)
+    if budget >= count:
+        return np.arange(count)
+    if budget < 3:
+        return np.linspace(0, count - 1, max(budget, 0)).astype(np.int64)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges over the interior points; the endpoints are always kept
+    every = (count - 2) / (budget - 2)
+    edges = (np.arange(budget - 1) * every).astype(np.int64) + 1
+    kept = np.empty(budget, dtype=np.int64)
+    kept[0], kept[-1] = 0, count - 1
+
+    previous = 0
+    for bucket in range(budget - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        following_start, following_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else count
+        average_x = x[following_start:following_end].mean()
+        average_y = y[following_start:following_end].mean()
+
+        area = np.abs((x[previous] - average_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (average_y - y[previous]))
+        previous = start + int(area.argmax())
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax_indices(x, y, budget):
+    """Indices of the minimum and maximum of budget // 2 equal-count buckets"""
+    count = len(x)
+    if budget >= count:
+        return np.arange(count)
+    if budget < 2:
+        # No room for a min/max pair; same fallback as lttb_indices
+        return np.linspace(0, count - 1, max(budget, 0)).astype(np.int64)
+    buckets = budget // 2
+    bucket = np.arange(count) * buckets // count
+    order = np.lexsort((np.asarray(y), bucket))
+    bounds = np.searchsorted(bucket[order], np.arange(buckets + 1))
+    kept = np.concatenate([order[bounds[:-1]], order[bounds[1:] - 1]])
+    return np.unique(kept)
+
+
+def downsample(x, y, budget, method="lttb"):
+    """Reduce a series to at most budget points; returns (x, y)"""
+    if method == "lttb":
+        kept = lttb_indices(x, y, budget)
+    elif method == "minmax":
+        kept = minmax_indices(x, y, budget)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return np.asarray(x)[kept], np.asarray(y)[kept]
+
+
+class SeriesCache:
+    """Downsampled calculateExerciseProgression results for a History"""
+
+    def __init__(self, history, max_entries=4096):
+        self.history = history
+        self.max_entries = max_entries
+        self._series = {}
+        self._entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def _full_series(self, metric):
+        series = self._series.get(metric)
+        if series is None:
+            series = self._series[metric] = exercise_series(self.history, metric)
+        return series
+
+    def _window(self, athlete, exercise_name, metric, since):
+        series = self._full_series(metric)
+        code = self.history.exercise_code(exercise_name)
+        # Rows are sorted by athlete, exercise and start, so each lookup is a bisect
+        low = np.searchsorted(series.athlete, athlete, side="left")
+        high = np.searchsorted(series.athlete, athlete, side="right")
+        exercises = series.exercise[low:high]
+        low, high = (low + np.searchsorted(exercises, code, side="left"),
+                     low + np.searchsorted(exercises, code, side="right"))
+        if since is not None:
+            low += np.searchsorted(series.start[low:high], since, side="left")
+        return series.start[low:high], series.value[low:high]
+
+    def series(self, exercise_name, metric, timeframe, budget, athlete=0, method="lttb", now=None):
+        """ChartSeries of at most budget points for one athlete and exercise
+
+        timeframe is a Timeframe value or ALL_TIME. Windows are aligned to
+        the start of the current UTC day so cached entries stay valid all day.
+        """
+        if metric not in ANALYTICS_METRICS:
+            raise ValueError(f"Unknown analytics metric: {metric}")
+        now = current_time_ms() if now is None else now
+        since = None
+        if timeframe != ALL_TIME:
+            since = now // MS_PER_DAY * MS_PER_DAY - timeframe_weeks(timeframe) * MS_PER_WEEK
+
+        key = (athlete, exercise_name, metric, timeframe, since, budget, method)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        result = ChartSeries(*downsample(*self._window(athlete, exercise_name, metric, since), budget, method))
+        self._entries[key] = result
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+
+    def warm(self, budget, timeframes=("eightWeeks", "twelveWeeks", ALL_TIME), metrics=ANALYTICS_METRICS,
+             method="lttb", now=None):
+        """Precompute every (athlete, exercise) series for the given timeframes and metrics"""
+        for metric in metrics:
+            series = self._full_series(metric)
+            pairs = np.unique(np.stack([series.athlete, series.exercise], axis=1), axis=0)
+            for athlete, exercise in pairs.tolist():
+                for timeframe in timeframes:
+                    self.series(self.history.exercise_names[exercise], metric, timeframe, budget,
+                                athlete=athlete, method=method, now=now)
+
+    def sessions_added(self, history):
+        """Switch to a history with sessions appended and drop the entries they affect
+
+        history must extend the current one row for row, as a HistoryBuilder
+        fed more sessions or concat_histories([old, new]) does.
+        """
+        first_new = self.history.session_count
+        instances = history.instances
+        touched = np.asarray(instances["session"]) >= first_new
+        athletes = np.asarray(history.sessions["athlete"])[np.asarray(instances["session"])[touched]]
+        exercises = np.asarray(instances["exercise"])[touched]
+        stale = {(athlete, history.exercise_names[exercise])
+                 for athlete, exercise in zip(athletes.tolist(), exercises.tolist())}
+
+        self.history = history
+        self._series.clear()
+        for key in [key for key in self._entries if key[:2] in stale]:
+            del self._entries[key]
+        return len(stale)
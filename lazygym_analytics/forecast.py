@@ -0,0 +1,197 @@
+"""
+Plateau forecasts for AMRAP lifts
+
+calculateExerciseProgression shows where an exercise's weight has been; this
+module fits every (athlete, exercise) weight series with a saturating curve
+
+    weight(t) = asymptote - gain * exp(-rate * t)        t in weeks
+
+and reads off the weight a month from now and the date the curve flattens:
+the plateau is when the gain still to come drops below the smallest increment
+the AMRAP rules add (DEFAULT_RULES.upper_small, 1 kg).
+
+For a fixed rate the curve is linear in asymptote and gain, so every series
+is fitted at once: for each rate on a log-spaced grid the 2x2 normal equations
+of all series come from segmented sums (np.add.reduceat) over the flat rows,
+each series keeps the rate with the least squared error, a parabola through
+its grid neighbours refines that rate, and one more batched solve gives the
+final coefficients. Series that do not grow (negative gain) are fitted as a
+constant, i.e. they have already plateaued.
+"""
+
+from collections import namedtuple
+import time
+
+import numpy as np
+
+from .cohort import _group_starts, _series_types
+from .models import MS_PER_DAY, MS_PER_WEEK, NULL_TIME, current_time_ms, progression_code
+from .progression import DEFAULT_RULES
+from .stats import exercise_series
+
+CurveFit = namedtuple("CurveFit", ["asymptote", "gain", "rate", "sse", "points"])
+
+Forecast = namedtuple(
+    "Forecast",
+    ["athlete", "exercise", "points", "first", "last", "current", "asymptote", "gain", "rate", "rmse",
+     "forecast", "plateau"],
+)
+
+BenchmarkResult = namedtuple("BenchmarkResult", ["series", "rows", "seconds", "series_per_second",
+                                                 "median_asymptote_error"])
+
+# Rates per week from "a tenth of the way there after a year" to "there in a week or two"
+RATES = np.geomspace(0.002, 2.0, 64)
+
+# Plateaus further out than this are reported as NULL_TIME (still progressing)
+MAX_PLATEAU_WEEKS = 520
+
+
+def _solve(starts, points, x, y, sums_y):
+    """Per-series least squares of y ~ asymptote + slope * x: (asymptote, slope, sse)"""
+    sum_y, sum_yy = sums_y
+    sum_x = np.add.reduceat(x, starts)
+    sum_xx = np.add.reduceat(x * x, starts)
+    sum_xy = np.add.reduceat(x * y, starts)
+    det = points * sum_xx - sum_x * sum_x
+    # x is constant within the series (every session at t = 0, or a rate too slow to bend the curve)
+    singular = det <= 1e-9 * points * np.maximum(sum_xx, 1e-300)
+    det = np.where(singular, 1.0, det)
+    slope = np.where(singular, 0.0, (points * sum_xy - sum_x * sum_y) / det)
+    asymptote = np.where(singular, sum_y / points, (sum_y * sum_xx - sum_x * sum_xy) / det)
+    sse = np.maximum(sum_yy - asymptote * sum_y - slope * np.where(singular, 0.0, sum_xy), 0.0)
+    return asymptote, slope, sse
+
+
+def fit_saturating(starts, t, y, rates=RATES):
+    """Least-squares fits of y = asymptote - gain * exp(-rate * t) for many series at once
+
+    t and y are flat float arrays in which each series is a contiguous run of
+    rows; starts holds the index of each run's first row. Returns a CurveFit
+    of per-series arrays.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if not len(starts):
+        empty = np.zeros(0)
+        return CurveFit(empty, empty, empty, empty, np.zeros(0, dtype=np.int64))
+    points = np.diff(np.append(starts, len(y)))
+    sums_y = (np.add.reduceat(y, starts), np.add.reduceat(y * y, starts))
+
+    # One batched solve per grid rate; memory stays O(rows)
+    sse = np.empty((len(rates), len(starts)))
+    for index, rate in enumerate(rates):
+        sse[index] = _solve(starts, points, np.exp(-rate * t), y, sums_y)[2]
+
+    # Parabolic refinement in log(rate), where the grid is evenly spaced
+    log_rates = np.log(rates)
+    step = log_rates[1] - log_rates[0] if len(rates) > 1 else 0.0
+    best = np.argmin(sse, axis=0)
+    inner = np.clip(best, 1, max(len(rates) - 2, 0))
+    columns = np.arange(len(starts))
+    if len(rates) > 2:
+        below, at, above = sse[inner - 1, columns], sse[inner, columns], sse[inner + 1, columns]
+        curvature = below - 2 * at + above
+        offset = np.divide(below - above, 2 * curvature, out=np.zeros(len(starts)), where=curvature > 0)
+        offset = np.where(inner == best, np.clip(offset, -1.0, 1.0), 0.0)
+    else:
+        offset = np.zeros(len(starts))
+    rate = np.exp(log_rates[best] + offset * step)
+
+    series = np.repeat(columns, points)
+    asymptote, slope, residual = _solve(starts, points, np.exp(-rate[series] * t), y, sums_y)
+    gain = -slope
+
+    # A falling curve is no progress at all: fit the mean instead
+    flat = gain < 0
+    mean = sums_y[0] / points
+    asymptote = np.where(flat, mean, asymptote)
+    gain = np.where(flat, 0.0, gain)
+    residual = np.where(flat, np.maximum(sums_y[1] - mean * sums_y[0], 0.0), residual)
+    return CurveFit(asymptote, gain, rate, residual, points)
+
+
+def plateau_weeks(fit, increment=DEFAULT_RULES.upper_small):
+    """Weeks after the first session at which less than `increment` of gain is left"""
+    remaining = np.maximum(fit.gain, increment) / increment
+    return np.log(remaining) / fit.rate
+
+
+def forecast_progressions(history, now=None, horizon_days=30, min_points=6,
+                          increment=DEFAULT_RULES.upper_small, progression_types=("amrap",)):
+    """Saturating-curve forecast of every (athlete, exercise) working-weight series
+
+    Only sessions of the given progression types count, and series need at
+    least min_points sessions. forecast is the fitted weight horizon_days
+    after now; plateau is the epoch ms at which less than `increment` of gain
+    is left (in the past for lifts that have already plateaued), or NULL_TIME
+    when that is more than MAX_PLATEAU_WEEKS away.
+    """
+    now = current_time_ms() if now is None else now
+    series = exercise_series(history, "weight")
+    codes = [progression_code(name) for name in progression_types]
+    keep = np.isin(_series_types(history, series), codes)
+    athlete, exercise = series.athlete[keep], series.exercise[keep]
+    start, value = series.start[keep], series.value[keep]
+
+    group = np.cumsum(_group_starts(athlete, exercise)) - 1
+    points = np.bincount(group, minlength=group[-1] + 1 if len(group) else 0)
+    rows = (points >= min_points)[group] if len(group) else np.zeros(0, dtype=bool)
+    athlete, exercise, start, value = athlete[rows], exercise[rows], start[rows], value[rows]
+
+    starts = np.flatnonzero(_group_starts(athlete, exercise)) if len(athlete) else np.zeros(0, dtype=np.int64)
+    ends = np.append(starts[1:], len(athlete)) - 1
+    first = start[starts]
+    weeks = (start - np.repeat(first, np.diff(np.append(starts, len(start))))) / MS_PER_WEEK
+    fit = fit_saturating(starts, weeks, value)
+
+    ahead = (now + horizon_days * MS_PER_DAY - first) / MS_PER_WEEK
+    forecast = fit.asymptote - fit.gain * np.exp(-fit.rate * ahead)
+    plateau = plateau_weeks(fit, increment)
+    plateau = np.where(plateau <= MAX_PLATEAU_WEEKS,
+                       first + np.round(np.minimum(plateau, MAX_PLATEAU_WEEKS) * MS_PER_WEEK).astype(np.int64),
+                       NULL_TIME)
+    return Forecast(
+        athlete[starts],
+        exercise[starts],
+        fit.points,
+        first,
+        start[ends],
+        value[ends],
+        fit.asymptote,
+        fit.gain,
+        fit.rate,
+        np.sqrt(fit.sse / np.maximum(fit.points, 1)),
+        forecast,
+        plateau,
+    )
+
+
+def synthetic_series(count, points=40, noise=1.0, seed=0):
+    """Flat (starts, weeks, weights, asymptotes) of random saturating AMRAP series
+
+    Sessions are 2-5 days apart and weights are rounded to 0.5 kg, as
+    recorded in the app.
+    """
+    rng = np.random.default_rng(seed)
+    asymptote = rng.uniform(40.0, 160.0, count)
+    gain = asymptote * rng.uniform(0.2, 0.6, count)
+    rate = np.exp(rng.uniform(np.log(0.03), np.log(0.5), count))
+    gaps = rng.integers(2, 6, (count, points)) / 7.0
+    gaps[:, 0] = 0.0
+    weeks = np.cumsum(gaps, axis=1)
+    weights = asymptote[:, None] - gain[:, None] * np.exp(-rate[:, None] * weeks)
+    weights = np.round((weights + rng.normal(0.0, noise, weights.shape)) * 2) / 2
+    starts = np.arange(count, dtype=np.int64) * points
+    return starts, weeks.ravel(), weights.ravel(), asymptote
+
+
+def benchmark(count=100_000, points=40, seed=0):
+    """Fit `count` synthetic series and report throughput and accuracy"""
+    starts, weeks, weights, asymptote = synthetic_series(count, points, seed=seed)
+    started = time.perf_counter()
+    fit = fit_saturating(starts, weeks, weights)
+    seconds = time.perf_counter() - started
+    error = np.median(np.abs(fit.asymptote - asymptote) / asymptote)
+    return BenchmarkResult(count, len(weights), seconds, count / max(seconds, 1e-9), float(error))
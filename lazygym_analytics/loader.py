@@ -0,0 +1,63 @@
+"""
+Load lazygym-export-YYYY-MM-DD.json files into a columnar History
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import json
+import os
+
+from .columns import HistoryBuilder, concat_histories
+
+
+EXPORT_SUFFIXES = (".json", ".json.gz")
+
+
+def athlete_name(path):
+    """Athlete label for an export file: its name without the .json suffix"""
+    name = os.path.basename(path)
+    for suffix in EXPORT_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def find_exports(directory):
+    """Sorted paths of every .json or .json.gz export directly inside a directory"""
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(EXPORT_SUFFIXES)
+    )
+
+
+def open_export(path):
+    """Open an export as text, transparently decompressing .gz files"""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def load_export(path, athlete=None):
+    """Load a single export file as a one-athlete History"""
+    with open_export(path) as handle:
+        export = json.load(handle)
+
+    builder = HistoryBuilder()
+    builder.add_export(export, athlete or athlete_name(path))
+    return builder.build()
+
+
+def load_exports(paths, workers=None):
+    """Load many exports, one athlete per file, parsing files in parallel"""
+    paths = list(paths)
+    if workers == 1 or len(paths) < 2:
+        parts = [load_export(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(load_export, paths, chunksize=max(1, len(paths) // 64)))
+    return concat_histories(parts)
+
+
+def load_export_dir(directory, workers=None):
+    return load_exports(find_exports(directory), workers=workers)
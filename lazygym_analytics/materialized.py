@@ -0,0 +1,215 @@
+"""
+Materialized workout statistics with incremental updates
+
+DataManager.calculateWorkoutStats rescans the whole history on every call.
+MaterializedStats keeps the four aggregates up to date as sessions arrive:
+
+    total workouts      a counter
+    12-week average     start times in a sorted list, read with one bisect
+    heaviest lift       a multiset of set weights, so retractions can lower it
+    longest streak      runs of consecutive training days with their session
+                        counts, merged or split around the day that changed
+
+Appending a session costs O(sets in the session) plus a bisect; a snapshot
+is O(log sessions). Retracting a session that splits a streak walks the days
+of the shorter half. verify() rebuilds everything from the per-session
+contributions and repairs any aggregate that disagrees, and runs by itself
+every check_every updates.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+
+from .models import MS_PER_DAY, MS_PER_WEEK, NULL_TIME, current_time_ms, parse_timestamp
+from .stats import WorkoutStats
+
+
+class MaterializedStats:
+    """calculateWorkoutStats for one athlete, maintained incrementally"""
+
+    def __init__(self, utc_offset_minutes=0, check_every=10_000):
+        self.utc_offset_minutes = utc_offset_minutes
+        self.check_every = check_every
+        self._clear()
+        # session id -> (start ms, day, set weights)
+        self._contributions = {}
+
+    def _clear(self):
+        self._starts = []
+        self._weights = Counter()
+        self._heaviest = 0.0
+        self._day_counts = {}
+        # Streak runs: first day -> [last day, sessions], plus a sorted list of first days
+        self._runs = {}
+        self._run_firsts = []
+        self._run_lasts = {}
+        self._run_totals = Counter()
+        self._longest = 0
+        self._updates = 0
+
+    @classmethod
+    def from_sessions(cls, sessions, **options):
+        stats = cls(**options)
+        for session in sessions:
+            stats.append(session)
+        return stats
+
+    def __len__(self):
+        return len(self._contributions)
+
+    def __contains__(self, session_id):
+        return session_id in self._contributions
+
+    def _day(self, start):
+        return (start + self.utc_offset_minutes * 60_000) // MS_PER_DAY
+
+    def append(self, session):
+        """Add one workoutHistory entry; returns False if its id is already counted"""
+        session_id = session.get("id")
+        if session_id is None:
+            raise ValueError("Sessions need an id to be materialized")
+        if session_id in self._contributions:
+            return False
+
+        start = parse_timestamp(session.get("startTime"))
+        weights = tuple(
+            float(workout_set.get("weight") or 0.0)
+            for instance in (session.get("template") or {}).get("exerciseInstances") or []
+            for workout_set in instance.get("sets") or []
+        )
+        day = None if start == NULL_TIME else self._day(start)
+        self._contributions[session_id] = (start, day, weights)
+        self._apply(start, day, weights)
+        self._updated()
+        return True
+
+    def retract(self, session_id):
+        """Remove a previously appended session; returns False if it is unknown"""
+        contribution = self._contributions.pop(session_id, None)
+        if contribution is None:
+            return False
+        start, day, weights = contribution
+
+        del self._starts[bisect_left(self._starts, start)]
+        for weight in weights:
+            self._weights[weight] -= 1
+            if not self._weights[weight]:
+                del self._weights[weight]
+        if weights and self._heaviest not in self._weights:
+            self._heaviest = max(self._weights, default=0.0)
+        if day is not None:
+            self._remove_day(day)
+        self._updated()
+        return True
+
+    def _apply(self, start, day, weights):
+        insort(self._starts, start)
+        self._weights.update(weights)
+        self._heaviest = max(self._heaviest, max(weights, default=0.0))
+        if day is not None:
+            self._add_day(day)
+
+    def _updated(self):
+        self._updates += 1
+        if self.check_every and self._updates % self.check_every == 0:
+            self.verify()
+
+    # Streak runs
+
+    def _set_total(self, first, total):
+        run = self._runs[first]
+        self._run_totals[run[1]] -= 1
+        if not self._run_totals[run[1]]:
+            del self._run_totals[run[1]]
+        run[1] = total
+        self._run_totals[total] += 1
+
+    def _add_run(self, first, last, total):
+        self._runs[first] = [last, total]
+        self._run_lasts[last] = first
+        insort(self._run_firsts, first)
+        self._run_totals[total] += 1
+        self._longest = max(self._longest, total)
+
+    def _drop_run(self, first):
+        last, total = self._runs.pop(first)
+        del self._run_lasts[last]
+        del self._run_firsts[bisect_left(self._run_firsts, first)]
+        self._run_totals[total] -= 1
+        if not self._run_totals[total]:
+            del self._run_totals[total]
+        return last, total
+
+    def _run_containing(self, day):
+        return self._run_firsts[bisect_right(self._run_firsts, day) - 1]
+
+    def _add_day(self, day):
+        if day in self._day_counts:
+            self._day_counts[day] += 1
+            first = self._run_containing(day)
+            self._set_total(first, self._runs[first][1] + 1)
+            self._longest = max(self._longest, self._runs[first][1])
+            return
+
+        self._day_counts[day] = 1
+        first, last, total = day, day, 1
+        if day - 1 in self._run_lasts:
+            first = self._run_lasts[day - 1]
+            total += self._drop_run(first)[1]
+        if day + 1 in self._runs:
+            following_last, following_total = self._drop_run(day + 1)
+            last = following_last
+            total += following_total
+        self._add_run(first, last, total)
+
+    def _remove_day(self, day):
+        first = self._run_containing(day)
+        longest_changed = self._runs[first][1] == self._longest
+        self._day_counts[day] -= 1
+
+        if self._day_counts[day]:
+            self._set_total(first, self._runs[first][1] - 1)
+        else:
+            del self._day_counts[day]
+            last, total = self._drop_run(first)
+            # Count sessions on the shorter side of the gap; the rest are on the other
+            if day - first <= last - day:
+                before = sum(self._day_counts[other] for other in range(first, day))
+                after = total - 1 - before
+            else:
+                after = sum(self._day_counts[other] for other in range(day + 1, last + 1))
+                before = total - 1 - after
+            if before:
+                self._add_run(first, day - 1, before)
+            if after:
+                self._add_run(day + 1, last, after)
+
+        if longest_changed and self._longest not in self._run_totals:
+            self._longest = max(self._run_totals, default=0)
+
+    # Reads and checks
+
+    def snapshot(self, now=None):
+        """Current WorkoutStats with scalar fields"""
+        now = current_time_ms() if now is None else now
+        twelve_weeks_ago = now - 12 * MS_PER_WEEK
+        recent = len(self._starts) - bisect_left(self._starts, twelve_weeks_ago)
+        weeks = max(1, -(-(now - twelve_weeks_ago) // MS_PER_WEEK))
+        return WorkoutStats(len(self._contributions), recent / weeks, self._heaviest, self._longest)
+
+    def verify(self):
+        """Recompute every aggregate from scratch and repair any drift
+
+        Returns the names of the aggregates that disagreed (empty when the
+        materialized state was correct).
+        """
+        materialized = (list(self._starts), self._heaviest, self._longest)
+        updates = self._updates
+        self._clear()
+        for start, day, weights in self._contributions.values():
+            self._apply(start, day, weights)
+        self._updates = updates
+
+        recomputed = (self._starts, self._heaviest, self._longest)
+        return [name for name, old, new in zip(("average_workouts_per_week", "heaviest_lift", "longest_streak"),
+                                               materialized, recomputed) if old != new]
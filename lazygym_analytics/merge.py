@@ -0,0 +1,202 @@
+"""
+Merge several exports of the same athlete into one consolidated export
+
+The app matches exercises by exact name because ids change when exercises are
+copied (applyProgressionUpdates), and removeDuplicateExercises keeps the first
+exercise of each name. ExportMerger instead resolves identities through hash
+indexes, so every record is placed in O(1):
+
+    exercises   id, then (normalized name, progressionType), then normalized
+                name when the incoming record has no progressionType
+    templates   id, then normalized name
+    sessions    id; the copy with the latest endTime wins
+
+Aliased ids are rewritten to the surviving exercise's id in templates and in
+every session's exercise snapshots, so the merged export imports cleanly.
+Ties go to the export added last.
+"""
+
+from collections import namedtuple
+import unicodedata
+
+from .loader import open_export
+from .models import NULL_TIME, current_time_ms, format_timestamp, parse_timestamp
+from .stream import iter_export_items
+
+MergeReport = namedtuple(
+    "MergeReport",
+    ["exports", "exercises_seen", "exercises", "templates_seen", "templates", "sessions_seen", "sessions",
+     "sessions_replaced"],
+)
+
+
+def normalize_name(name):
+    """Case-, width- and whitespace-insensitive form of an exercise or template name"""
+    return " ".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+
+
+def _time(value):
+    return parse_timestamp(value) if value is not None else NULL_TIME
+
+
+class ExportMerger:
+    """Accumulates exports and resolves exercise, template and session identities"""
+
+    def __init__(self):
+        self.exports = 0
+        self.exercises = []
+        self._exercise_ids = {}
+        self._exercise_keys = {}
+        self._exercise_names = {}
+        self.templates = []
+        self._template_ids = {}
+        self._template_names = {}
+        self.sessions = {}
+        self._seen = {"exercise": 0, "template": 0, "session": 0}
+        self.sessions_replaced = 0
+
+    # Exercises
+
+    def _find_exercise(self, exercise):
+        index = self._exercise_ids.get(exercise.get("id"))
+        if index is not None:
+            return index
+        name = normalize_name(exercise.get("name"))
+        progression_type = exercise.get("progressionType")
+        if progression_type is not None:
+            return self._exercise_keys.get((name, progression_type))
+        candidates = self._exercise_names.get(name, ())
+        return candidates[0] if len(candidates) == 1 else None
+
+    def add_exercise(self, exercise):
+        """Resolve one library exercise; the most recently trained copy wins"""
+        self._seen["exercise"] += 1
+        index = self._find_exercise(exercise)
+        name = normalize_name(exercise.get("name"))
+        if index is None:
+            index = len(self.exercises)
+            self.exercises.append(exercise)
+            self._exercise_names.setdefault(name, []).append(index)
+        else:
+            current = self.exercises[index]
+            if _time(exercise.get("lastWorkoutDate")) >= _time(current.get("lastWorkoutDate")):
+                self.exercises[index] = dict(exercise, id=current.get("id"))
+            # A renamed copy should also be found under its new name
+            aliases = self._exercise_names.setdefault(name, [])
+            if index not in aliases:
+                aliases.append(index)
+
+        if exercise.get("id") is not None:
+            self._exercise_ids[exercise["id"]] = index
+        self._exercise_keys.setdefault((name, exercise.get("progressionType")), index)
+        return index
+
+    def _canonical_exercise(self, exercise):
+        """Rewrite an embedded exercise snapshot to the library id it resolves to"""
+        if not isinstance(exercise, dict):
+            return
+        index = self._find_exercise(exercise)
+        if index is not None:
+            exercise["id"] = self.exercises[index].get("id")
+
+    # Templates
+
+    def add_template(self, template):
+        """Resolve one workout template; later exports replace earlier copies"""
+        self._seen["template"] += 1
+        name = normalize_name(template.get("name"))
+        index = self._template_ids.get(template.get("id"))
+        if index is None:
+            index = self._template_names.get(name)
+
+        if index is None:
+            index = len(self.templates)
+            self.templates.append(template)
+        else:
+            self.templates[index] = dict(template, id=self.templates[index].get("id"))
+
+        if template.get("id") is not None:
+            self._template_ids[template["id"]] = index
+        self._template_names.setdefault(name, index)
+        return index
+
+    # Sessions
+
+    def add_session(self, session):
+        """Keep the copy of a session with the latest endTime"""
+        self._seen["session"] += 1
+        key = session.get("id")
+        if key is None:
+            key = (session.get("startTime"), normalize_name((session.get("template") or {}).get("name")))
+        current = self.sessions.get(key)
+        if current is None:
+            self.sessions[key] = session
+            return
+        end_time, current_end_time = _time(session.get("endTime")), _time(current.get("endTime"))
+        if end_time >= current_end_time:
+            self.sessions[key] = session
+            self.sessions_replaced += end_time > current_end_time
+
+    # Whole exports
+
+    def add_export(self, export):
+        """Merge a parsed export dict"""
+        self.exports += 1
+        for exercise in export.get("exercises") or []:
+            self.add_exercise(exercise)
+        for template in export.get("workoutTemplates") or []:
+            self.add_template(template)
+        for session in export.get("workoutHistory") or []:
+            self.add_session(session)
+
+    def add_file(self, path):
+        """Merge an export file, streaming its history one session at a time"""
+        self.exports += 1
+        with open_export(path) as handle:
+            for key, value in iter_export_items(handle):
+                if key == "session":
+                    self.add_session(value)
+                elif key == "exercises":
+                    for exercise in value or []:
+                        self.add_exercise(exercise)
+                elif key == "workoutTemplates":
+                    for template in value or []:
+                        self.add_template(template)
+
+    def _rewrite_template(self, template):
+        for instance in template.get("exerciseInstances") or []:
+            self._canonical_exercise(instance.get("exercise"))
+        for workout_exercise in template.get("exercises") or []:
+            self._canonical_exercise(workout_exercise.get("exercise"))
+
+    def result(self):
+        """The consolidated export dict, with history in chronological order"""
+        for template in self.templates:
+            self._rewrite_template(template)
+        history = sorted(self.sessions.values(), key=lambda session: _time(session.get("startTime")))
+        for session in history:
+            self._rewrite_template(session.get("template") or {})
+        return {
+            "exercises": self.exercises,
+            "workoutTemplates": self.templates,
+            "workoutHistory": history,
+            "exportDate": format_timestamp(current_time_ms()),
+            "version": "1.0",
+        }
+
+    def report(self):
+        return MergeReport(
+            self.exports,
+            self._seen["exercise"], len(self.exercises),
+            self._seen["template"], len(self.templates),
+            self._seen["session"], len(self.sessions),
+            self.sessions_replaced,
+        )
+
+
+def merge_exports(paths):
+    """Merge export files in the given order; returns (export dict, MergeReport)"""
+    merger = ExportMerger()
+    for path in paths:
+        merger.add_file(path)
+    return merger.result(), merger.report()
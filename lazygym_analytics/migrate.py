@@ -0,0 +1,381 @@
+"""
+Bulk validation and migration of export files
+
+The apps check very little on load (LazyGymApp.validateExerciseData and
+validateWorkoutData only test for a few keys) and upgrade old data lazily:
+WorkoutTemplate.migrateToNewFormat() converts legacy `exercises` to
+`exerciseInstances` each time a template is started or shown, and
+DataManager.migrateData() (Swift) fills in bodyPart and template focus on
+every launch. This module does both once per file, ahead of time:
+
+    exercise    bodyPart from isUpperBody, as Exercise.fromJSON and migrateData
+    template    exerciseInstances from exercises, as migrateToNewFormat and
+                WorkoutExercise.toInstance(); session snapshots keep their
+                logged sets and completion so no history is lost
+    library     a "full" template whose exercises are all upper or all lower
+                body gets that focus, as migrateData
+
+The schema is written as short type specs per record kind and compiled once
+into tuples of (field, required, checker), so checking a record is a loop over
+prebuilt closures with no per-field parsing or branching on spec strings.
+Upgraded exports are validated against the current schema before they are
+written; files with errors are reported and left untouched.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import json
+import os
+import random
+import re
+import string
+
+from .loader import find_exports, open_export
+from .models import PROGRESSION_TYPES, WORKOUT_FOCUSES, current_time_ms, parse_timestamp
+
+MigrationReport = namedtuple(
+    "MigrationReport",
+    ["path", "output", "errors", "sessions", "body_parts", "templates_upgraded", "focuses_inferred"],
+)
+
+# Field specs per record kind: a scalar type, another record kind, or
+# "[type]" for a list. A leading "!" marks a field the apps cannot load
+# without; any other field may be missing or null.
+SCHEMA = {
+    "export": {
+        "exercises": "![exercise]",
+        "workoutTemplates": "![template]",
+        "workoutHistory": "![session]",
+        "exportDate": "date",
+        "version": "str",
+    },
+    "exercise": {
+        "id": "!str",
+        "name": "!str",
+        "progressionType": "!progression",
+        "isUpperBody": "bool",
+        "bodyPart": "!focus",
+        "currentWeight": "!number",
+        "baseReps": "int",
+        "currentReps": "[int]",
+        "lastWorkoutDate": "date",
+    },
+    "set": {
+        "id": "!str",
+        "plannedReps": "!int",
+        "actualReps": "int",
+        "weight": "!number",
+        "isCompleted": "!bool",
+        "completedAt": "date",
+    },
+    "workoutExercise": {
+        "id": "!str",
+        "exercise": "!exercise",
+        "sets": "![set]",
+        "isCompleted": "bool",
+    },
+    "instance": {
+        "id": "!str",
+        "exercise": "!exercise",
+        "progressionType": "progression",
+        "amrapWeight": "number",
+        "pyramidBaseReps": "int",
+        "notes": "str",
+        "sets": "![set]",
+        "isCompleted": "bool",
+    },
+    "template": {
+        "id": "!str",
+        "name": "!str",
+        "exercises": "![workoutExercise]",
+        "exerciseInstances": "![instance]",
+        "focus": "!focus",
+        "createdDate": "date",
+    },
+    "session": {
+        "id": "!str",
+        "template": "!template",
+        "startTime": "!date",
+        "endTime": "date",
+        "isCompleted": "bool",
+        "currentExerciseIndex": "int",
+        "currentSetIndex": "int",
+    },
+}
+
+
+def _type_name(value):
+    return "null" if value is None else type(value).__name__
+
+
+def _is_number(value):
+    return type(value) is int or type(value) is float
+
+
+def _is_int(value):
+    return type(value) is int or (type(value) is float and value.is_integer())
+
+
+# Date.toISOString() output, which is nearly every date in an export
+_ISO_DATE = re.compile(r"\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])T([01]\d|2[0-3]):[0-5]\d:[0-5]\d\.\d{3}Z")
+
+
+def _is_date(value):
+    if type(value) is str:
+        if _ISO_DATE.fullmatch(value):
+            return True
+        try:
+            parse_timestamp(value)
+        except ValueError:
+            return False
+        return True
+    return _is_number(value)
+
+
+# Scalar type -> (predicate, description for error messages)
+SCALAR_TYPES = {
+    "str": (lambda value: type(value) is str, "a string"),
+    "bool": (lambda value: type(value) is bool, "a boolean"),
+    "number": (_is_number, "a number"),
+    "int": (_is_int, "a whole number"),
+    "date": (_is_date, "an ISO date or epoch milliseconds"),
+    "progression": (PROGRESSION_TYPES.__contains__, f"one of {', '.join(PROGRESSION_TYPES)}"),
+    "focus": (WORKOUT_FOCUSES.__contains__, f"one of {', '.join(WORKOUT_FOCUSES)}"),
+}
+
+
+def _format_path(path):
+    # Paths are built as nested (parent, part) pairs and only joined for errors
+    parts = []
+    while isinstance(path, tuple):
+        path, part = path
+        parts.append(part)
+    parts.append(path)
+    return "".join(reversed(parts))
+
+
+def _expected(path, expected, value):
+    return f"{_format_path(path)}: expected {expected}, got {_type_name(value)}"
+
+
+def _list_of(accepts, expected, nested):
+    def check_list(value, path, errors):
+        if type(value) is not list:
+            errors.append(_expected(path, "a list", value))
+        elif nested is not None:
+            for index, item in enumerate(value):
+                nested(item, (path, f"[{index}]"), errors)
+        elif not all(map(accepts, value)):
+            errors.extend(_expected((path, f"[{index}]"), expected, item)
+                          for index, item in enumerate(value) if not accepts(item))
+    return check_list
+
+
+def compile_schema(schema=SCHEMA):
+    """Turn field specs into one validator per record kind
+
+    Each validator is called as validator(value, path, errors) and appends
+    "path: message" strings to errors. Scalar fields are checked inline
+    with a precomputed predicate; records and lists dispatch to their own
+    compiled validator.
+    """
+    validators = {}
+    fields = {}
+
+    def record(kind):
+        def check_record(value, path, errors):
+            if type(value) is not dict:
+                errors.append(_expected(path, "an object", value))
+                return
+            get = value.get
+            for name, required, accepts, expected, nested in fields[kind]:
+                field = get(name)
+                if field is None:
+                    if required:
+                        errors.append(f"{_format_path(path)}.{name}: missing")
+                elif nested is not None:
+                    nested(field, (path, "." + name), errors)
+                elif not accepts(field):
+                    errors.append(_expected((path, "." + name), expected, field))
+        return check_record
+
+    def resolve(spec):
+        """(predicate, description, nested validator) for a field spec"""
+        if spec.startswith("["):
+            return (None, "a list", _list_of(*resolve(spec[1:-1])))
+        if spec in SCALAR_TYPES:
+            return SCALAR_TYPES[spec] + (None,)
+        if spec in schema:
+            return (None, "an object", validators[spec])
+        raise ValueError(f"Unknown schema type: {spec}")
+
+    for kind in schema:
+        validators[kind] = record(kind)
+    for kind, specs in schema.items():
+        fields[kind] = tuple(
+            (name, spec.startswith("!")) + resolve(spec.lstrip("!"))
+            for name, spec in specs.items()
+        )
+    return validators
+
+
+VALIDATORS = compile_schema()
+
+
+def validate_export(export):
+    """Schema errors of a parsed export, as "path: message" strings"""
+    errors = []
+    VALIDATORS["export"](export, "$", errors)
+    return errors
+
+
+# Migrations
+
+
+def _make_id(kind, rng):
+    # generateId(): kind, Date.now() and nine base-36 characters
+    suffix = "".join(rng.choices(string.ascii_lowercase + string.digits, k=9))
+    return f"{kind}_{current_time_ms()}_{suffix}"
+
+
+class _Migration:
+    """Counts and state for upgrading one export"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.body_parts = 0
+        self.templates_upgraded = 0
+        self.focuses_inferred = 0
+
+    def exercise(self, exercise):
+        if not isinstance(exercise, dict):
+            return
+        if exercise.get("isUpperBody") is None:
+            exercise["isUpperBody"] = True
+        if exercise.get("bodyPart") is None:
+            exercise["bodyPart"] = "upper" if exercise["isUpperBody"] else "lower"
+            self.body_parts += 1
+
+    def template(self, template, keep_sets):
+        if not isinstance(template, dict):
+            return
+        if template.get("focus") is None:
+            template["focus"] = "full"
+        legacy = template.setdefault("exercises", [])
+        instances = template.setdefault("exerciseInstances", [])
+        if not isinstance(legacy, list) or not isinstance(instances, list):
+            return
+        for item in legacy + instances:
+            if isinstance(item, dict):
+                self.exercise(item.get("exercise"))
+        if instances or not legacy:
+            return
+
+        template["exerciseInstances"] = [self.instance(item, keep_sets) for item in legacy if isinstance(item, dict)]
+        self.templates_upgraded += 1
+
+    def instance(self, workout_exercise, keep_sets):
+        # WorkoutExercise.toInstance() starts with no sets; history keeps what was logged
+        exercise = workout_exercise.get("exercise") or {}
+        return {
+            "id": _make_id("instance", self.rng),
+            "exercise": exercise,
+            "progressionType": exercise.get("progressionType"),
+            "amrapWeight": exercise.get("currentWeight"),
+            "pyramidBaseReps": exercise.get("baseReps"),
+            "notes": "",
+            "sets": list(workout_exercise.get("sets") or []) if keep_sets else [],
+            "isCompleted": bool(workout_exercise.get("isCompleted")) if keep_sets else False,
+        }
+
+    def infer_focus(self, template):
+        if template.get("focus") != "full":
+            return
+        upper = [bool((item.get("exercise") or {}).get("isUpperBody"))
+                 for item in template.get("exerciseInstances") or [] if isinstance(item, dict)]
+        if upper and all(upper):
+            template["focus"] = "upper"
+        elif upper and not any(upper):
+            template["focus"] = "lower"
+        else:
+            return
+        self.focuses_inferred += 1
+
+
+def migrate_export(export, seed=None):
+    """Upgrade a parsed export in place; returns (export, counts dict)"""
+    migration = _Migration(seed)
+    for exercise in export.get("exercises") or []:
+        migration.exercise(exercise)
+    for template in export.get("workoutTemplates") or []:
+        migration.template(template, keep_sets=False)
+        if isinstance(template, dict):
+            migration.infer_focus(template)
+    for session in export.get("workoutHistory") or []:
+        if isinstance(session, dict):
+            migration.template(session.get("template"), keep_sets=True)
+    counts = {
+        "body_parts": migration.body_parts,
+        "templates_upgraded": migration.templates_upgraded,
+        "focuses_inferred": migration.focuses_inferred,
+    }
+    return export, counts
+
+
+def _write_json(export, output):
+    # Write beside the target and rename, so migrating in place never leaves half a file
+    temporary = output + ".tmp"
+    opener = gzip.open if output.endswith(".gz") else open
+    with opener(temporary, "wt", encoding="utf-8") as handle:
+        json.dump(export, handle, separators=(",", ":"), ensure_ascii=False)
+    os.replace(temporary, output)
+
+
+def migrate_file(path, output=None):
+    """Validate and upgrade one export file; returns a MigrationReport
+
+    The upgraded export is written to output (which may be path itself) only
+    if it passes validation.
+    """
+    try:
+        with open_export(path) as handle:
+            export = json.load(handle)
+    except (OSError, ValueError) as error:
+        return MigrationReport(path, None, [f"$: {error}"], 0, 0, 0, 0)
+    if not isinstance(export, dict):
+        return MigrationReport(path, None, [f"$: expected an object, got {_type_name(export)}"], 0, 0, 0, 0)
+
+    export, counts = migrate_export(export, seed=path)
+    errors = validate_export(export)
+    written = None
+    if output is not None and not errors:
+        _write_json(export, output)
+        written = output
+    sessions = len(export.get("workoutHistory") or [])
+    return MigrationReport(path, written, errors, sessions, counts["body_parts"], counts["templates_upgraded"],
+                           counts["focuses_inferred"])
+
+
+def _migrate_job(job):
+    return migrate_file(*job)
+
+
+def migrate_directory(source, destination=None, workers=None):
+    """Validate and upgrade every export in source, one file per worker task
+
+    Upgraded files keep their names and go to destination (created if
+    needed); with no destination the files are only checked. Returns one
+    MigrationReport per file, in file name order.
+    """
+    paths = find_exports(source) if os.path.isdir(source) else [source]
+    if destination is not None:
+        os.makedirs(destination, exist_ok=True)
+    jobs = [
+        (path, None if destination is None else os.path.join(destination, os.path.basename(path)))
+        for path in paths
+    ]
+    if workers == 1 or len(jobs) < 2:
+        return [_migrate_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_migrate_job, jobs, chunksize=max(1, len(jobs) // 64)))
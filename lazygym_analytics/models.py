@@ -0,0 +1,79 @@
+"""
+Enums and conversions shared by the analytics engine
+Mirrors the constants in js/models.js
+"""
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import time
+
+import numpy as np
+
+PROGRESSION_TYPES = ("amrap", "pyramid", "free")
+WORKOUT_FOCUSES = ("upper", "lower", "full")
+ANALYTICS_METRICS = ("weight", "reps", "volume")
+TIMEFRAME_WEEKS = {"eightWeeks": 8, "twelveWeeks": 12}
+
+AMRAP, PYRAMID, FREE = range(3)
+UPPER, LOWER, FULL = range(3)
+
+# Code stored for a missing or unrecognised enum value
+UNKNOWN = -1
+
+# Sentinels for null timestamps and null reps in the columnar arrays
+NULL_TIME = np.iinfo(np.int64).min
+NULL_REPS = -1
+
+MS_PER_DAY = 24 * 60 * 60 * 1000
+MS_PER_WEEK = 7 * MS_PER_DAY
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_PROGRESSION_CODES = {name: code for code, name in enumerate(PROGRESSION_TYPES)}
+_FOCUS_CODES = {name: code for code, name in enumerate(WORKOUT_FOCUSES)}
+
+
+def progression_code(value):
+    return _PROGRESSION_CODES.get(value, UNKNOWN)
+
+
+def focus_code(value):
+    return _FOCUS_CODES.get(value, UNKNOWN)
+
+
+def timeframe_weeks(timeframe):
+    """Same fallback as Timeframe.getWeeks: anything unknown is 12 weeks"""
+    return TIMEFRAME_WEEKS.get(timeframe, 12)
+
+
+def parse_timestamp(value):
+    """Convert a JSON date (ISO string or epoch ms) to int epoch milliseconds"""
+    if value is None:
+        return NULL_TIME
+    if isinstance(value, (int, float)):
+        return int(value)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return (parsed - EPOCH) // timedelta(milliseconds=1)
+
+
+@lru_cache(maxsize=4096)
+def _format_day(day):
+    return (EPOCH + timedelta(days=day)).strftime("%Y-%m-%dT")
+
+
+def format_timestamp(ms):
+    """Format epoch milliseconds the way JSON.stringify writes a Date"""
+    if ms == NULL_TIME:
+        return None
+    day, ms_of_day = divmod(int(ms), MS_PER_DAY)
+    seconds, millis = divmod(ms_of_day, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{_format_day(day)}{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}Z"
+
+
+def current_time_ms():
+    return time.time_ns() // 1_000_000
+
@@ -0,0 +1,324 @@
+"""
+Compact, seekable export files
+
+exportData() writes indented JSON that repeats the full exercise object in
+every exercise instance of every session, and the whole file has to be
+parsed to see one month of it. A packed export holds the same data as
+
+    LGYMPACK                      8-byte magic
+    frame, frame, ...             compressed NDJSON, one session per line
+    header frame                  compressed JSON: top-level key order, every
+                                  field except workoutHistory, exercise table
+    footer                        JSON index of the frames
+    footer length, LGYMPACK       8-byte little-endian length, magic
+
+Exercise snapshots are interned: each distinct exercise object is stored
+once in the header and instances refer to it by index. Sessions are framed
+by calendar month of startTime (and at most max_sessions per frame), and the
+footer records each frame's offset, size, session count and start-time
+range, so a range read only decompresses the frames that overlap it.
+
+Frames are gzip by default; zstd needs the zstandard package. Unpacking
+gives back exactly the JSON values (and key order) of the original export.
+"""
+
+from datetime import datetime, timezone
+import gzip
+import json
+import os
+import struct
+
+from .loader import open_export
+from .models import NULL_TIME, parse_timestamp
+from .stream import iter_export_items
+
+MAGIC = b"LGYMPACK"
+FORMAT_VERSION = 1
+CODECS = ("gzip", "zstd")
+
+_TRAILER = struct.Struct("<Q8s")
+_COMPACT = {"separators": (",", ":"), "ensure_ascii": False}
+
+
+class PackedFormatError(ValueError):
+    """The file is not a readable packed export"""
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("the zstandard package is required for zstd frames; use codec='gzip' instead") from None
+    return zstandard
+
+
+def _compress(data, codec, level):
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return _zstandard().ZstdCompressor(level=level).compress(data)
+
+
+def _decompress(data, codec):
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        return _zstandard().ZstdDecompressor().decompress(data)
+    raise PackedFormatError(f"Unknown frame codec: {codec}")
+
+
+def _month(start):
+    if start == NULL_TIME:
+        return None
+    moment = datetime.fromtimestamp(start / 1000, tz=timezone.utc)
+    return moment.year, moment.month
+
+
+def _start_time(session):
+    try:
+        return parse_timestamp(session.get("startTime")) if isinstance(session, dict) else NULL_TIME
+    except (TypeError, ValueError):
+        return NULL_TIME
+
+
+def _clone(value):
+    if isinstance(value, dict):
+        return {key: _clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone(item) for item in value]
+    return value
+
+
+class PackWriter:
+    """Writes a packed export one session at a time"""
+
+    def __init__(self, handle, codec="gzip", level=None, max_sessions=256):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        if codec == "zstd":
+            _zstandard()
+        self.handle = handle
+        self.codec = codec
+        self.level = level if level is not None else (6 if codec == "gzip" else 10)
+        self.max_sessions = max_sessions
+        self.exercises = []
+        self._exercise_index = {}
+        self.frames = []
+        self.sessions = 0
+        self._lines = []
+        self._block = None
+        self._range = None
+        handle.write(MAGIC)
+
+    def _intern(self, exercise):
+        # Non-objects are wrapped in a list so that ints always mean references
+        if not isinstance(exercise, dict):
+            return [exercise]
+        key = json.dumps(exercise, **_COMPACT)
+        index = self._exercise_index.get(key)
+        if index is None:
+            index = self._exercise_index[key] = len(self.exercises)
+            self.exercises.append(exercise)
+        return index
+
+    def _encode(self, session):
+        template = session.get("template") if isinstance(session, dict) else None
+        if not isinstance(template, dict):
+            return session
+        template = dict(template)
+        for field in ("exerciseInstances", "exercises"):
+            items = template.get(field)
+            if isinstance(items, list):
+                template[field] = [
+                    dict(item, exercise=self._intern(item["exercise"]))
+                    if isinstance(item, dict) and "exercise" in item else item
+                    for item in items
+                ]
+        return dict(session, template=template)
+
+    def add_session(self, session):
+        start = _start_time(session)
+        block = _month(start)
+        if self._lines and (block != self._block or len(self._lines) >= self.max_sessions):
+            self._flush()
+        self._block = block
+        if start != NULL_TIME:
+            low, high = self._range or (start, start)
+            self._range = (min(low, start), max(high, start))
+        self._lines.append(json.dumps(self._encode(session), **_COMPACT))
+        self.sessions += 1
+
+    def _write_frame(self, data):
+        payload = _compress(data, self.codec, self.level)
+        offset = self.handle.tell()
+        self.handle.write(payload)
+        return offset, len(payload)
+
+    def _flush(self):
+        if not self._lines:
+            return
+        offset, length = self._write_frame("\n".join(self._lines).encode("utf-8"))
+        low, high = self._range or (None, None)
+        self.frames.append([offset, length, len(self._lines), low, high])
+        self._lines = []
+        self._range = None
+
+    def finish(self, keys, fields):
+        """Write the header and footer; keys is the top-level key order"""
+        self._flush()
+        header = {"keys": keys, "fields": fields, "exercises": self.exercises}
+        header_offset, header_length = self._write_frame(json.dumps(header, **_COMPACT).encode("utf-8"))
+        footer = json.dumps({
+            "format": "lazygym-packed",
+            "version": FORMAT_VERSION,
+            "codec": self.codec,
+            "sessions": self.sessions,
+            "header": [header_offset, header_length],
+            "frames": self.frames,
+        }, separators=(",", ":")).encode("utf-8")
+        self.handle.write(footer)
+        self.handle.write(_TRAILER.pack(len(footer), MAGIC))
+
+
+def pack_export(source, output, codec="gzip", level=None, max_sessions=256):
+    """Pack an export (a parsed dict, or a .json/.json.gz path streamed session by session)
+
+    Returns the number of sessions written.
+    """
+    writer_options = {"codec": codec, "level": level, "max_sessions": max_sessions}
+    temporary = output + ".tmp"
+    try:
+        sessions = _pack(source, temporary, writer_options)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    os.replace(temporary, output)
+    return sessions
+
+
+def _pack(source, path, writer_options):
+    with open(path, "wb") as handle:
+        writer = PackWriter(handle, **writer_options)
+        keys, fields = [], {}
+        if isinstance(source, dict):
+            for key, value in source.items():
+                keys.append(key)
+                if key == "workoutHistory" and isinstance(value, list):
+                    for session in value:
+                        writer.add_session(session)
+                else:
+                    fields[key] = value
+        else:
+            with open_export(source) as stream:
+                for key, value in iter_export_items(stream, history_marker=True):
+                    if key == "session":
+                        writer.add_session(value)
+                    else:
+                        keys.append(key)
+                        if key != "workoutHistory":
+                            fields[key] = value
+        writer.finish(keys, fields)
+    return writer.sessions
+
+
+class PackedExport:
+    """Reader for a packed export; only the footer is read up front"""
+
+    def __init__(self, path):
+        self.path = path
+        self.frames_read = 0
+        self._handle = open(path, "rb")
+        try:
+            self._handle.seek(0, os.SEEK_END)
+            size = self._handle.tell()
+            self._handle.seek(0)
+            if size < len(MAGIC) + _TRAILER.size or self._handle.read(len(MAGIC)) != MAGIC:
+                raise PackedFormatError(f"{path} is not a packed export")
+            self._handle.seek(size - _TRAILER.size)
+            footer_length, magic = _TRAILER.unpack(self._handle.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise PackedFormatError(f"{path} is truncated")
+            self._handle.seek(size - _TRAILER.size - footer_length)
+            footer = json.loads(self._handle.read(footer_length))
+        except Exception:
+            self._handle.close()
+            raise
+        if footer.get("format") != "lazygym-packed" or footer.get("version") != FORMAT_VERSION:
+            self._handle.close()
+            raise PackedFormatError(f"Unsupported packed export version in {path}")
+        self.codec = footer["codec"]
+        self.session_count = footer["sessions"]
+        self.frames = footer["frames"]
+        self._header_location = footer["header"]
+        self._header = None
+
+    def close(self):
+        self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read(self, offset, length):
+        self._handle.seek(offset)
+        return _decompress(self._handle.read(length), self.codec)
+
+    @property
+    def header(self):
+        if self._header is None:
+            self._header = json.loads(self._read(*self._header_location))
+        return self._header
+
+    def _decode(self, line):
+        session = json.loads(line)
+        template = session.get("template") if isinstance(session, dict) else None
+        if not isinstance(template, dict):
+            return session
+        exercises = self.header["exercises"]
+        for field in ("exerciseInstances", "exercises"):
+            for item in template.get(field) if isinstance(template.get(field), list) else ():
+                if isinstance(item, dict) and "exercise" in item:
+                    reference = item["exercise"]
+                    item["exercise"] = _clone(exercises[reference]) if isinstance(reference, int) else reference[0]
+        return session
+
+    def sessions(self, since=None, until=None):
+        """Yield sessions in file order, optionally only those with since <= startTime < until
+
+        since and until are epoch milliseconds or ISO strings. Sessions with
+        no startTime only appear in unbounded reads.
+        """
+        bounded = since is not None or until is not None
+        since = None if since is None else parse_timestamp(since)
+        until = None if until is None else parse_timestamp(until)
+        for offset, length, _, low, high in self.frames:
+            if bounded and (low is None or (since is not None and high < since)
+                            or (until is not None and low >= until)):
+                continue
+            self.frames_read += 1
+            for line in self._read(offset, length).decode("utf-8").split("\n"):
+                session = self._decode(line)
+                if bounded:
+                    start = _start_time(session)
+                    if start == NULL_TIME or (since is not None and start < since) \
+                            or (until is not None and start >= until):
+                        continue
+                yield session
+
+    def export(self, since=None, until=None):
+        """The export dict, with workoutHistory limited to a range if given"""
+        fields = self.header["fields"]
+        history = list(self.sessions(since, until))
+        return {key: _clone(fields[key]) if key in fields else history for key in self.header["keys"]}
+
+
+def unpack_export(path, output=None, since=None, until=None):
+    """Read a packed export back into a dict, writing it as indented JSON if output is given"""
+    with PackedExport(path) as packed:
+        export = packed.export(since, until)
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as handle:
+            json.dump(export, handle, indent=2, ensure_ascii=False)
+    return export
@@ -0,0 +1,217 @@
+"""
+Replay of the progression rules in js/progressionCalculator.js
+
+ProgressionCalculator.calculateAMRAPProgression raises an exercise's weight
+after each session based on the final set's reps: nothing below 5 reps,
++1 kg (upper) / +2.5 kg (lower) below 10 reps, +2 kg / +5 kg from 10 reps.
+This module applies those rules (or alternative thresholds) to whole
+exported histories as array operations and measures how far the weights the
+rules would have prescribed drift from the weights actually recorded.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .models import AMRAP, LOWER, UNKNOWN, UPPER
+
+ProgressionRules = namedtuple(
+    "ProgressionRules",
+    ["low_reps", "high_reps", "upper_small", "upper_large", "lower_small", "lower_large"],
+)
+
+# The thresholds and increments shipped in the app
+DEFAULT_RULES = ProgressionRules(5, 10, 1.0, 2.0, 2.5, 5.0)
+
+ReplayInputs = namedtuple(
+    "ReplayInputs",
+    ["athlete", "exercise", "start", "group_start", "recorded_weight", "final_reps", "upper"],
+)
+
+SimulationResult = namedtuple(
+    "SimulationResult",
+    ["rules", "mean_abs_divergence", "max_abs_divergence", "match_rate", "mean_predicted_gain",
+     "mean_recorded_gain"],
+)
+
+
+def is_upper_body(body_part, workout_focus, is_upper_body_flag):
+    """isUpperBodyExercise: exercise bodyPart, then workout focus, then legacy flag"""
+    body_part = np.asarray(body_part)
+    workout_focus = np.asarray(workout_focus)
+    return np.where(
+        body_part != UNKNOWN,
+        body_part == UPPER,
+        np.where(workout_focus == UPPER, True,
+                 np.where(workout_focus == LOWER, False, is_upper_body_flag)),
+    )
+
+
+def amrap_increment(final_reps, upper, rules=DEFAULT_RULES):
+    """Weight added after an AMRAP session for each final-set rep count"""
+    if np.ndim(final_reps) == 0 and np.ndim(upper) == 0:
+        # Scalar fast path for per-session callers
+        if final_reps < rules.low_reps:
+            return 0.0
+        if final_reps < rules.high_reps:
+            return rules.upper_small if upper else rules.lower_small
+        return rules.upper_large if upper else rules.lower_large
+    final_reps = np.asarray(final_reps)
+    small = np.where(upper, rules.upper_small, rules.lower_small)
+    large = np.where(upper, rules.upper_large, rules.lower_large)
+    return np.where(final_reps < rules.low_reps, 0.0,
+                    np.where(final_reps < rules.high_reps, small, large))
+
+
+def amrap_progression(current_weight, final_reps, upper, rules=DEFAULT_RULES):
+    """calculateAMRAPProgression for scalars or arrays"""
+    return current_weight + amrap_increment(final_reps, upper, rules)
+
+
+def pyramid_progression(actual_reps):
+    """calculatePyramidProgression: the next target reps are the logged reps"""
+    return [reps for reps in actual_reps if reps is not None]
+
+
+def prepare_replay(history):
+    """Collect the AMRAP instances of a History in replay order
+
+    Rows are sorted by athlete, exercise (matched by name, as
+    applyProgressionUpdates does) and session start. final_reps is the
+    actual reps of the last completed set, or -1 when no progression would
+    be applied for that session.
+    """
+    instances = history.instances
+    sets = history.sets
+    offsets = history.set_offsets()
+    count = len(instances["session"])
+
+    last_completed = np.full(count, -1, dtype=np.int64)
+    completed = np.flatnonzero(np.asarray(sets["completed"]))
+    np.maximum.at(last_completed, np.asarray(sets["instance"])[completed], completed)
+    has_final = last_completed >= 0
+    final_reps = np.full(count, -1, dtype=np.int64)
+    final_reps[has_final] = np.asarray(sets["actual_reps"])[last_completed[has_final]]
+
+    selected = (np.asarray(instances["progression"]) == AMRAP) & (offsets[1:] > offsets[:-1])
+    index = np.flatnonzero(selected)
+
+    session = np.asarray(instances["session"])[index]
+    athlete = np.asarray(history.sessions["athlete"])[session]
+    exercise = np.asarray(instances["exercise"])[index]
+    start = np.asarray(history.sessions["start"])[session]
+    order = np.lexsort((index, start, exercise, athlete))
+    index, session = index[order], session[order]
+    athlete, exercise, start = athlete[order], exercise[order], start[order]
+
+    group_start = np.ones(len(index), dtype=bool)
+    group_start[1:] = (athlete[1:] != athlete[:-1]) | (exercise[1:] != exercise[:-1])
+
+    upper = is_upper_body(
+        np.asarray(instances["body_part"])[index],
+        np.asarray(history.sessions["focus"])[session],
+        np.asarray(instances["upper"])[index],
+    )
+    return ReplayInputs(
+        athlete,
+        exercise,
+        start,
+        group_start,
+        np.asarray(sets["weight"], dtype=np.float64)[offsets[index]],
+        final_reps[index],
+        upper,
+    )
+
+
+def replay(inputs, rules_batch):
+    """Prescribed working weight per instance for each rule set
+
+    Returns a (len(rules_batch), instances) array. Each group starts at its
+    first recorded weight and accumulates the rule increments of all
+    earlier sessions of that athlete and exercise.
+    """
+    count = len(inputs.athlete)
+    rules_batch = list(rules_batch)
+    increments = np.empty((len(rules_batch), count))
+    applies = inputs.final_reps >= 0
+    for row, rules in enumerate(rules_batch):
+        increments[row] = np.where(applies, amrap_increment(inputs.final_reps, inputs.upper, rules), 0.0)
+
+    if not count:
+        return increments
+
+    # Exclusive cumulative sum restarted at every group boundary
+    running = np.cumsum(increments, axis=1) - increments
+    group_id = np.cumsum(inputs.group_start) - 1
+    group_base = running[:, inputs.group_start][:, group_id]
+    first_weight = inputs.recorded_weight[inputs.group_start][group_id]
+    return first_weight + running - group_base
+
+
+def divergence(inputs, rules, predicted, tolerance=1e-6):
+    """Summarise one replay against the recorded weights"""
+    followed = ~inputs.group_start
+    difference = np.abs(predicted - inputs.recorded_weight)[followed]
+
+    group_id = np.cumsum(inputs.group_start) - 1
+    last = np.ones(len(group_id), dtype=bool)
+    last[:-1] = group_id[1:] != group_id[:-1]
+    first_weight = inputs.recorded_weight[inputs.group_start]
+
+    return SimulationResult(
+        rules,
+        float(difference.mean()) if len(difference) else 0.0,
+        float(difference.max()) if len(difference) else 0.0,
+        float((difference <= tolerance).mean()) if len(difference) else 1.0,
+        float((predicted[last] - first_weight).mean()) if len(first_weight) else 0.0,
+        float((inputs.recorded_weight[last] - first_weight).mean()) if len(first_weight) else 0.0,
+    )
+
+
+def sample_rules(count, seed=None, low_reps=(3, 8), high_reps=(8, 15), increment_scale=(0.5, 2.0)):
+    """Random alternative rule sets around the shipped defaults"""
+    rng = np.random.default_rng(seed)
+    variants = []
+    for _ in range(count):
+        low = int(rng.integers(low_reps[0], low_reps[1] + 1))
+        high = int(rng.integers(max(low + 1, high_reps[0]), max(low + 1, high_reps[1]) + 1))
+        scale = rng.uniform(*increment_scale, size=4)
+        # Keep increments on 0.25 kg plate steps
+        upper_small, upper_large, lower_small, lower_large = (
+            np.round(np.array(DEFAULT_RULES[2:]) * scale * 4) / 4
+        ).tolist()
+        variants.append(ProgressionRules(low, high, upper_small, upper_large, lower_small, lower_large))
+    return variants
+
+
+_worker_inputs = None
+
+
+def _init_worker(inputs):
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+def _evaluate(rules_batch):
+    predicted = replay(_worker_inputs, rules_batch)
+    return [divergence(_worker_inputs, rules, row) for rules, row in zip(rules_batch, predicted)]
+
+
+def simulate(history, variants, workers=None, batch_size=16):
+    """Replay every rule variant over a History, in parallel batches
+
+    Returns one SimulationResult per variant, in the order given.
+    """
+    inputs = prepare_replay(history)
+    variants = list(variants)
+    batches = [variants[i:i + batch_size] for i in range(0, len(variants), batch_size)]
+
+    if workers == 1 or len(batches) < 2:
+        _init_worker(inputs)
+        results = [_evaluate(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(inputs,)) as pool:
+            results = list(pool.map(_evaluate, batches))
+    return [result for batch in results for result in batch]
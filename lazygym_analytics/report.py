@@ -0,0 +1,416 @@
+"""
+Report cards with progression charts, rendered without a browser
+
+UIManager.renderProgressionChart draws one Chart.js line at a time, so a
+weekly review of a gym means opening the app once per athlete. This module
+renders the series behind calculateExerciseProgression (weight, reps and
+volume over a timeframe) for every athlete of a set of exports, one PNG or
+SVG card each:
+
+    header      athlete, date range and workouts in the timeframe
+    grid        one row per exercise (most sessions first), one column per
+                metric, filled lines with the y axis starting at zero as in
+                the app
+
+A card is a list of drawing operations. Everything that only depends on the
+layout and the date range (background, gridlines, week labels, metric
+titles) is drawn once per row count into a template, which is copied for
+each card; only the lines and value labels are drawn per athlete. Lines are
+rasterized with NumPy: each pixel of a plot gets its distance to the few
+polyline segments around its column, and antialiased coverage follows from
+that distance. Shards of export files render in a process pool, each worker
+loading only its own shard.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from html import escape
+import io
+import os
+
+import numpy as np
+
+from .cohort import _group_starts
+from .downsample import ChartSeries, lttb_indices
+from .loader import load_exports
+from .models import ANALYTICS_METRICS, MS_PER_WEEK, current_time_ms, timeframe_weeks
+from .stats import exercise_series
+
+ReportCard = namedtuple("ReportCard", ["athlete", "workouts", "exercises"])
+CardLayout = namedtuple("CardLayout", ["width", "height", "rows", "plots"])
+
+REPORT_FORMATS = ("png", "svg")
+METRIC_TITLES = {"weight": "Weight", "reps": "Reps", "volume": "Volume"}
+
+# Card geometry in pixels
+MARGIN = 24
+HEADER_HEIGHT = 64
+ROW_TITLE_HEIGHT = 24
+AXIS_WIDTH = 44
+AXIS_HEIGHT = 20
+PLOT_WIDTH = 260
+PLOT_HEIGHT = 110
+GAP = 16
+EMPTY_HEIGHT = 40
+GRID_LINES = 4
+LINE_WIDTH = 2.0
+MARKER_RADIUS = 2.5
+# Series with more points are drawn without markers, as a plain line
+MAX_MARKERS = 48
+
+# Colors of the app's light theme and chart
+BACKGROUND = "#ffffff"
+TEXT = "#1c1c1e"
+SECONDARY_TEXT = "#8e8e93"
+GRID = "#e5e5ea"
+AXIS = "#c7c7cc"
+LINE = "#007aff"
+FILL_OPACITY = 0.1
+FONT_FAMILY = "Inter, -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif"
+
+
+def _pil():
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        raise ImportError("Pillow is required for PNG report cards; use fmt='svg' instead") from None
+    return Image, ImageDraw, ImageFont
+
+
+# Data
+
+
+def report_cards(history, timeframe="twelveWeeks", now=None, max_exercises=4):
+    """ReportCard per athlete with up to max_exercises rows of {metric: ChartSeries}"""
+    now = current_time_ms() if now is None else now
+    since = now - timeframe_weeks(timeframe) * MS_PER_WEEK
+    start = history.sessions["start"]
+    recent = (start >= since) & (start <= now)
+    workouts = np.bincount(history.sessions["athlete"][recent], minlength=history.athlete_count)
+
+    # (athlete, exercise) -> {metric: ChartSeries}
+    groups = {}
+    for metric in ANALYTICS_METRICS:
+        series = exercise_series(history, metric, since=since)
+        keep = series.start <= now
+        athlete, exercise = series.athlete[keep], series.exercise[keep]
+        dates, values = series.start[keep], series.value[keep]
+        if not len(values):
+            continue
+        bounds = np.append(np.flatnonzero(_group_starts(athlete, exercise)), len(values))
+        for begin, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            key = (int(athlete[begin]), int(exercise[begin]))
+            groups.setdefault(key, {})[metric] = ChartSeries(dates[begin:end], values[begin:end])
+
+    rows = [[] for _ in range(history.athlete_count)]
+    for (athlete, exercise), metrics in groups.items():
+        rows[athlete].append((history.exercise_names[exercise], metrics))
+    cards = []
+    for athlete, exercises in enumerate(rows):
+        exercises.sort(key=lambda row: (-max(len(series.value) for series in row[1].values()), row[0]))
+        cards.append(ReportCard(history.athletes[athlete], int(workouts[athlete]), exercises[:max_exercises]))
+    return cards
+
+
+# Layout
+
+
+@lru_cache(maxsize=None)
+def card_layout(rows, columns=len(ANALYTICS_METRICS)):
+    """Card size and the (x, y) origin of every plot, row by row"""
+    cell_width = AXIS_WIDTH + PLOT_WIDTH + GAP
+    cell_height = ROW_TITLE_HEIGHT + PLOT_HEIGHT + AXIS_HEIGHT + GAP
+    width = 2 * MARGIN + columns * cell_width - GAP
+    height = 2 * MARGIN + HEADER_HEIGHT + (rows * cell_height - GAP if rows else EMPTY_HEIGHT)
+    plots = tuple(
+        tuple((MARGIN + column * cell_width + AXIS_WIDTH, MARGIN + HEADER_HEIGHT + row * cell_height + ROW_TITLE_HEIGHT)
+              for column in range(columns))
+        for row in range(rows)
+    )
+    return CardLayout(width, height, rows, plots)
+
+
+# Gridline steps (x 10^k); the finer ones keep the headroom above the maximum small
+NICE_STEPS = (1, 1.5, 2, 2.5, 3, 4, 5, 6, 8, 10)
+HEADROOM = 0.05
+
+
+def _nice_top(value):
+    """Smallest round axis maximum (gridline step from NICE_STEPS x 10^k) at least HEADROOM above value
+
+    A maximum equal to the value would draw the series on the top edge,
+    with its markers clipped.
+    """
+    if value <= 0:
+        return float(GRID_LINES)
+    raw = value * (1 + HEADROOM) / GRID_LINES
+    magnitude = 10.0 ** np.floor(np.log10(raw))
+    step = next(step for step in NICE_STEPS if step * magnitude >= raw * (1 - 1e-9))
+    return step * magnitude * GRID_LINES
+
+
+def _format_value(value):
+    if value >= 10000:
+        return f"{value / 1000:.0f}k"
+    if value >= 1000:
+        return f"{value / 1000:.1f}".rstrip("0").rstrip(".") + "k"
+    return f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+def _format_date(ms, year=False):
+    moment = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    return f"{moment:%b} {moment.day}" + (f", {moment.year}" if year else "")
+
+
+def _grid_y(line):
+    return round((PLOT_HEIGHT - 1) * (1 - line / GRID_LINES))
+
+
+# Drawing operations: ("rect", x, y, width, height, color),
+# ("text", x, top, text, size, color, align, bold) and ("series", x, y, px, py)
+
+
+def _template_ops(layout, since, now):
+    """Operations that are the same for every card with this layout and date range"""
+    ops = [("rect", 0, 0, layout.width, layout.height, BACKGROUND),
+           ("text", MARGIN, MARGIN + 30, f"{_format_date(since, year=True)} to {_format_date(now, year=True)}",
+            13, SECONDARY_TEXT, "left", False)]
+    if not layout.rows:
+        ops.append(("text", MARGIN, MARGIN + HEADER_HEIGHT + 8, "No workouts in this timeframe", 14, SECONDARY_TEXT,
+                    "left", False))
+    weeks = max(1, round((now - since) / MS_PER_WEEK))
+    for row in layout.plots:
+        for (x, y), metric in zip(row, ANALYTICS_METRICS):
+            for line in range(GRID_LINES + 1):
+                ops.append(("rect", x, y + _grid_y(line), PLOT_WIDTH, 1, AXIS if line == 0 else GRID))
+            for week in range(weeks + 1):
+                column = round((PLOT_WIDTH - 1) * min(week * MS_PER_WEEK / (now - since), 1))
+                ops.append(("rect", x + column, y + PLOT_HEIGHT, 1, 4, AXIS))
+                if week % 4 == 0:
+                    align = "left" if week == 0 else ("right" if week == weeks else "center")
+                    ops.append(("text", x + column, y + PLOT_HEIGHT + 5, _format_date(since + week * MS_PER_WEEK),
+                                10, SECONDARY_TEXT, align, False))
+            ops.append(("text", x + PLOT_WIDTH, y - 16, METRIC_TITLES[metric], 11, SECONDARY_TEXT, "right", False))
+    return ops
+
+
+def _card_ops(layout, card, since, now):
+    ops = [("text", MARGIN, MARGIN + 4, card.athlete, 20, TEXT, "left", True),
+           ("text", layout.width - MARGIN, MARGIN + 8, f"{card.workouts} workouts", 14, TEXT, "right", False)]
+    for row, (name, metrics) in zip(layout.plots, card.exercises):
+        ops.append(("text", row[0][0] - AXIS_WIDTH, row[0][1] - 20, name, 14, TEXT, "left", True))
+        for (x, y), metric in zip(row, ANALYTICS_METRICS):
+            series = metrics.get(metric)
+            if series is None:
+                ops.append(("text", x + PLOT_WIDTH // 2, y + PLOT_HEIGHT // 2 - 7, "No data", 11, SECONDARY_TEXT,
+                            "center", False))
+                continue
+            top = _nice_top(float(series.value.max()))
+            for line in (0, GRID_LINES // 2, GRID_LINES):
+                ops.append(("text", x - 6, y + _grid_y(line) - 6, _format_value(top * line / GRID_LINES), 10,
+                            SECONDARY_TEXT, "right", False))
+            date = series.date.astype(np.float64)
+            value = series.value.astype(np.float64)
+            keep = lttb_indices(date, value, PLOT_WIDTH // 2)
+            px = (date[keep] - since) / (now - since) * (PLOT_WIDTH - 1)
+            py = (PLOT_HEIGHT - 1) * (1 - value[keep] / top)
+            ops.append(("series", x, y, px.astype(np.float32), py.astype(np.float32)))
+    return ops
+
+
+# Raster backend
+
+
+def _rgb(color):
+    return np.array([int(color[index:index + 2], 16) for index in (1, 3, 5)], dtype=np.float32)
+
+
+def _segment_distance(columns, rows, px, py):
+    """Distance from every pixel to the polyline, using the segments around each column"""
+    if len(px) == 1:
+        return np.hypot(columns - px[0], rows - py[0])
+    segment = np.clip(np.searchsorted(px, columns) - 1, 0, len(px) - 2)
+    distance = None
+    for shift in (-1, 0, 1):
+        index = np.clip(segment + shift, 0, len(px) - 2)
+        ax, ay = px[index], py[index]
+        dx, dy = px[index + 1] - ax, py[index + 1] - ay
+        t = ((columns - ax) * dx + (rows - ay) * dy) / np.maximum(dx * dx + dy * dy, 1e-6)
+        t = np.clip(t, 0, 1)
+        candidate = np.hypot(columns - (ax + t * dx), rows - (ay + t * dy))
+        distance = candidate if distance is None else np.minimum(distance, candidate)
+    return distance
+
+
+def _marker_distance(columns, rows, px, py):
+    nearest = np.clip(np.searchsorted(px, columns), 1, max(len(px) - 1, 1))
+    before, after = np.maximum(nearest - 1, 0), np.minimum(nearest, len(px) - 1)
+    return np.minimum(np.hypot(columns - px[before], rows - py[before]),
+                      np.hypot(columns - px[after], rows - py[after]))
+
+
+def _blend(region, color, coverage):
+    coverage = coverage[..., None]
+    region *= 1 - coverage
+    region += color * coverage
+
+
+def _rasterize_series(canvas, x, y, px, py):
+    """Draw the fill, line and markers of one series into the canvas in place"""
+    reach = LINE_WIDTH + MARKER_RADIUS + 1
+    left = max(int(np.floor(px.min() - reach)), 0)
+    right = min(int(np.ceil(px.max() + reach)) + 1, PLOT_WIDTH)
+    columns = np.arange(left, right, dtype=np.float32)
+    rows = np.arange(PLOT_HEIGHT, dtype=np.float32)[:, None]
+    region = canvas[y:y + PLOT_HEIGHT, x + left:x + right].astype(np.float32)
+    color = _rgb(LINE)
+
+    if len(px) > 1:
+        # Everything below the line, between the first and last point
+        inside = (columns >= px[0]) & (columns <= px[-1])
+        below = np.clip(rows - np.interp(columns, px, py) + 0.5, 0, 1) * inside
+        _blend(region, color, below * FILL_OPACITY)
+    _blend(region, color, np.clip(LINE_WIDTH / 2 + 0.5 - _segment_distance(columns, rows, px, py), 0, 1))
+    if len(px) <= MAX_MARKERS:
+        _blend(region, color, np.clip(MARKER_RADIUS + 0.5 - _marker_distance(columns, rows, px, py), 0, 1))
+    canvas[y:y + PLOT_HEIGHT, x + left:x + right] = np.round(region).astype(np.uint8)
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    return _pil()[2].load_default(size)
+
+
+def _draw_png(canvas, ops):
+    """Apply operations to an RGB uint8 array; text is drawn last, with PIL"""
+    texts = []
+    for op in ops:
+        if op[0] == "rect":
+            _, x, y, width, height, color = op
+            canvas[y:y + height, x:x + width] = _rgb(color).astype(np.uint8)
+        elif op[0] == "series":
+            _rasterize_series(canvas, *op[1:])
+        else:
+            texts.append(op)
+    if not texts:
+        return canvas
+    Image, ImageDraw, _ = _pil()
+    image = Image.fromarray(canvas, "RGB")
+    draw = ImageDraw.Draw(image)
+    for _, x, top, text, size, color, align, _ in texts:
+        font = _font(size)
+        if align != "left":
+            x -= draw.textlength(text, font=font) / (1 if align == "right" else 2)
+        draw.text((x, top), text, font=font, fill=color)
+    return np.asarray(image)
+
+
+# Vector backend
+
+
+def _svg(ops):
+    parts = []
+    for op in ops:
+        if op[0] == "rect":
+            _, x, y, width, height, color = op
+            parts.append(f'<rect x="{x}" y="{y}" width="{width}" height="{height}" fill="{color}"/>')
+        elif op[0] == "text":
+            _, x, top, text, size, color, align, bold = op
+            anchor = {"left": "start", "right": "end", "center": "middle"}[align]
+            weight = ' font-weight="600"' if bold else ""
+            parts.append(f'<text x="{x:g}" y="{top + size * 0.8:g}" font-size="{size}" fill="{color}" '
+                         f'text-anchor="{anchor}"{weight}>{escape(text)}</text>')
+        else:
+            _, x, y, px, py = op
+            points = " ".join(f"{x + a:.1f},{y + b:.1f}" for a, b in zip(px.tolist(), py.tolist()))
+            base = y + PLOT_HEIGHT - 1
+            if len(px) > 1:
+                parts.append(f'<path d="M{x + px[0]:.1f},{base} L{points} L{x + px[-1]:.1f},{base} Z" '
+                             f'fill="{LINE}" fill-opacity="{FILL_OPACITY}"/>')
+            parts.append(f'<polyline points="{points}" fill="none" stroke="{LINE}" stroke-width="{LINE_WIDTH}" '
+                         'stroke-linejoin="round" stroke-linecap="round"/>')
+            if len(px) <= MAX_MARKERS:
+                parts.extend(f'<circle cx="{x + a:.1f}" cy="{y + b:.1f}" r="{MARKER_RADIUS}" fill="{LINE}"/>'
+                             for a, b in zip(px.tolist(), py.tolist()))
+    return "\n".join(parts)
+
+
+class CardRenderer:
+    """Renders ReportCards for one date range, reusing a template per row count"""
+
+    def __init__(self, since, now, fmt="png"):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format: {fmt}")
+        if fmt == "png":
+            _pil()
+        self.since = since
+        self.now = now
+        self.fmt = fmt
+        self._templates = {}
+
+    def template(self, layout):
+        template = self._templates.get(layout)
+        if template is None:
+            ops = _template_ops(layout, self.since, self.now)
+            if self.fmt == "png":
+                template = _draw_png(np.zeros((layout.height, layout.width, 3), dtype=np.uint8), ops)
+                template.flags.writeable = False
+            else:
+                template = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width}" '
+                            f'height="{layout.height}" viewBox="0 0 {layout.width} {layout.height}" '
+                            f'font-family="{escape(FONT_FAMILY)}">\n{_svg(ops)}\n')
+            self._templates[layout] = template
+        return template
+
+    def render(self, card):
+        """The card as PNG or SVG bytes"""
+        layout = card_layout(len(card.exercises))
+        ops = _card_ops(layout, card, self.since, self.now)
+        if self.fmt == "svg":
+            return (self.template(layout) + _svg(ops) + "\n</svg>\n").encode("utf-8")
+        Image = _pil()[0]
+        pixels = _draw_png(self.template(layout).copy(), ops)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels, "RGB").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+def render_exports(paths, output_dir, fmt="png", timeframe="twelveWeeks", now=None, max_exercises=4):
+    """Render a card per athlete of a shard of export files; returns the written paths"""
+    paths = list(paths)
+    if not paths:
+        return []
+    now = current_time_ms() if now is None else now
+    history = load_exports(paths, workers=1)
+    renderer = CardRenderer(now - timeframe_weeks(timeframe) * MS_PER_WEEK, now, fmt)
+    written = []
+    for card in report_cards(history, timeframe, now, max_exercises):
+        path = os.path.join(output_dir, f"{card.athlete}.{fmt}")
+        with open(path, "wb") as handle:
+            handle.write(renderer.render(card))
+        written.append(path)
+    return written
+
+
+def _render_job(job):
+    paths, output_dir, options = job
+    return render_exports(paths, output_dir, **options)
+
+
+def render_reports(paths, output_dir, workers=None, shard_size=32, **options):
+    """Render report cards for every export in a process pool; returns the written paths
+
+    All shards use the same `now`, so every card covers the same dates.
+    """
+    paths = list(paths)
+    os.makedirs(output_dir, exist_ok=True)
+    if options.get("now") is None:
+        options["now"] = current_time_ms()
+    shards = [paths[index:index + shard_size] for index in range(0, len(paths), shard_size)]
+    if workers == 1 or len(shards) < 2:
+        return [path for shard in shards for path in render_exports(shard, output_dir, **options)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_render_job, [(shard, output_dir, options) for shard in shards])
+        return [path for written in results for path in written]
@@ -0,0 +1,307 @@
+"""
+Precomputed volume cube for dashboard roll-ups and slices
+
+calculateMetricValue computes volume (weight x actualReps over the logged
+sets) for one exercise of one session, so "weekly upper vs lower volume over
+a year" would walk the whole history. VolumeCube sums it once into cells
+keyed by
+
+    athlete       dictionary code of the athlete name
+    week          ISO week, as the number of Monday-based weeks since the epoch
+    body_part     upper / lower, resolved as isUpperBodyExercise does
+    progression   the exercise's progressionType
+    exercise      dictionary code of the exercise name
+
+with volume, logged reps and logged sets per cell. A query filters the cells
+and groups them by any subset of the dimensions with one bincount, so it costs
+O(cells) however long the history is. New sessions are summed into a pending
+block of cells that queries read alongside the main one; the two are
+coalesced once the pending block grows past a quarter of the cube. Session
+ids already counted are skipped, so re-ingesting an overlapping export only
+adds what is new.
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+import json
+
+import numpy as np
+
+from .cohort import _group_starts
+from .columns import HistoryBuilder
+from .models import (
+    EPOCH,
+    LOWER,
+    MS_PER_DAY,
+    NULL_REPS,
+    NULL_TIME,
+    PROGRESSION_TYPES,
+    UNKNOWN,
+    UPPER,
+    WORKOUT_FOCUSES,
+    parse_timestamp,
+)
+from .progression import is_upper_body
+
+DIMENSIONS = ("athlete", "week", "body_part", "progression", "exercise")
+MEASURES = ("volume", "reps", "sets")
+
+Rollup = namedtuple("Rollup", ["by", "keys", "volume", "reps", "sets"])
+
+_DTYPES = {"athlete": np.int32, "week": np.int32, "body_part": np.int8, "progression": np.int8,
+           "exercise": np.int32, "volume": np.float64, "reps": np.int64, "sets": np.int64}
+
+
+def iso_week(ms, utc_offset_minutes=0):
+    """Monday-based weeks since the epoch (1970-01-01 was a Thursday)"""
+    day = (np.asarray(ms, dtype=np.int64) + utc_offset_minutes * 60_000) // MS_PER_DAY
+    return ((day + 3) // 7).astype(np.int32)
+
+
+def week_label(week):
+    """ISO 8601 week name, e.g. 2025-W07"""
+    year, number, _ = (EPOCH + timedelta(days=7 * int(week) - 3)).isocalendar()
+    return f"{year}-W{number:02d}"
+
+
+def parse_week(label):
+    """Inverse of week_label"""
+    year, number = label.split("-W")
+    monday = date.fromisocalendar(int(year), int(number), 1)
+    return (monday - EPOCH.date()).days // 7 + 1
+
+
+def _empty():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in _DTYPES.items()}
+
+
+def _coalesce(cells):
+    """Sum the measures of cells with equal keys; the result is sorted by DIMENSIONS"""
+    if not len(cells["volume"]):
+        return cells
+    order = np.lexsort(tuple(cells[name] for name in reversed(DIMENSIONS)))
+    keys = [cells[name][order] for name in DIMENSIONS]
+    starts = np.flatnonzero(_group_starts(*keys))
+    coalesced = {name: key[starts] for name, key in zip(DIMENSIONS, keys)}
+    for name in MEASURES:
+        coalesced[name] = np.add.reduceat(cells[name][order], starts).astype(_DTYPES[name])
+    return coalesced
+
+
+def _concat(parts):
+    parts = [part for part in parts if len(part["volume"])]
+    if not parts:
+        return _empty()
+    return {name: np.concatenate([part[name] for part in parts]) for name in _DTYPES}
+
+
+class VolumeCube:
+    """Volume, reps and sets by athlete, ISO week, body part, progression type and exercise"""
+
+    def __init__(self, utc_offset_minutes=0):
+        self.utc_offset_minutes = utc_offset_minutes
+        self.athletes = []
+        self.exercise_names = []
+        self._athlete_codes = {}
+        self._exercise_codes = {}
+        self._session_ids = set()
+        self._cells = _empty()
+        self._pending = []
+        self._pending_rows = 0
+
+    @classmethod
+    def from_history(cls, history, **options):
+        cube = cls(**options)
+        cube.add_history(history)
+        return cube
+
+    def __len__(self):
+        """Number of stored cells"""
+        return len(self._cells["volume"]) + self._pending_rows
+
+    def __repr__(self):
+        return (f"VolumeCube({len(self.athletes)} athletes, {len(self.exercise_names)} exercises, "
+                f"{len(self._session_ids)} sessions, {len(self)} cells)")
+
+    def _code(self, codes, names, name):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    # Updates
+
+    def add_history(self, history):
+        """Add the sessions of a History not already in the cube; returns how many were added"""
+        ids = history.session_ids
+        fresh = np.fromiter((ids[index] is None or ids[index] not in self._session_ids
+                             for index in range(history.session_count)), dtype=bool, count=history.session_count)
+        fresh &= history.sessions["start"] != NULL_TIME
+        self._session_ids.update(ids[index] for index in np.flatnonzero(fresh) if ids[index] is not None)
+
+        instances, sets = history.instances, history.sets
+        session = instances["session"]
+        kept = fresh[session]
+        if not kept.any():
+            return int(fresh.sum())
+
+        # calculateMetricValue("volume") and the logged reps and sets behind it, per instance
+        logged = sets["actual_reps"] != NULL_REPS
+        reps = np.where(logged, sets["actual_reps"], 0)
+        count = len(session)
+        volume = np.bincount(sets["instance"], weights=np.where(logged, sets["weight"] * reps, 0.0), minlength=count)
+        reps = np.bincount(sets["instance"], weights=reps, minlength=count)
+        logged_sets = np.bincount(sets["instance"], weights=logged, minlength=count)
+
+        athlete_remap = np.array([self._code(self._athlete_codes, self.athletes, name) for name in history.athletes],
+                                 dtype=np.int32)
+        exercise_remap = np.array([self._code(self._exercise_codes, self.exercise_names, name)
+                                   for name in history.exercise_names], dtype=np.int32)
+        upper = is_upper_body(instances["body_part"], history.sessions["focus"][session], instances["upper"])
+
+        index = np.flatnonzero(kept)
+        session = session[index]
+        cells = {
+            "athlete": athlete_remap[history.sessions["athlete"][session]],
+            "week": iso_week(history.sessions["start"][session], self.utc_offset_minutes),
+            "body_part": np.where(upper[index], UPPER, LOWER).astype(np.int8),
+            "progression": instances["exercise_progression"][index],
+            "exercise": exercise_remap[instances["exercise"][index]],
+            "volume": volume[index],
+            "reps": reps[index].astype(np.int64),
+            "sets": logged_sets[index].astype(np.int64),
+        }
+        cells = _coalesce(cells)
+        self._pending.append(cells)
+        self._pending_rows += len(cells["volume"])
+        if self._pending_rows * 4 > len(self._cells["volume"]):
+            self.compact()
+        return int(fresh.sum())
+
+    def add_export(self, export, athlete_name):
+        """Add the new sessions of a parsed export dict"""
+        builder = HistoryBuilder()
+        builder.add_export(export, athlete_name)
+        return self.add_history(builder.build())
+
+    def compact(self):
+        """Merge the pending cells into the main block"""
+        if self._pending:
+            self._cells = _coalesce(_concat([self._cells] + self._pending))
+            self._pending = []
+            self._pending_rows = 0
+
+    # Queries
+
+    def _all_cells(self):
+        if not self._pending:
+            return self._cells
+        return _concat([self._cells] + self._pending)
+
+    def _codes(self, dimension, values):
+        """Codes of labels (or raw codes) for a where= filter"""
+        values = [values] if isinstance(values, (str, int, np.integer)) else list(values)
+        lookup = {
+            "athlete": self._athlete_codes,
+            "exercise": self._exercise_codes,
+            "body_part": {name: code for code, name in enumerate(WORKOUT_FOCUSES)},
+            "progression": {name: code for code, name in enumerate(PROGRESSION_TYPES)},
+        }.get(dimension, {})
+        if dimension == "week":
+            return np.array([parse_week(value) if isinstance(value, str) else value for value in values])
+        return np.array([lookup.get(value, UNKNOWN - 1) if isinstance(value, str) else value for value in values])
+
+    def _mask(self, cells, since, until, where):
+        mask = np.ones(len(cells["volume"]), dtype=bool)
+        for dimension, values in where.items():
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dimension}")
+            mask &= np.isin(cells[dimension], self._codes(dimension, values))
+        if since is not None:
+            mask &= cells["week"] >= iso_week(parse_timestamp(since), self.utc_offset_minutes)
+        if until is not None:
+            mask &= cells["week"] <= iso_week(parse_timestamp(until) - 1, self.utc_offset_minutes)
+        return mask
+
+    def rollup(self, by=(), since=None, until=None, **where):
+        """Totals grouped by the `by` dimensions, over the cells matching the filters
+
+        since and until (epoch ms or ISO strings) select the ISO weeks that
+        overlap [since, until). Other keyword filters name a dimension and a
+        label or list of labels: athlete and exercise names, "upper"/"lower",
+        progression type names, or ISO week names like 2025-W07. keys is
+        one tuple of labels per group, in key order.
+        """
+        by = tuple(by)
+        for dimension in by:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dimension}")
+        cells = self._all_cells()
+        mask = self._mask(cells, since, until, where)
+        columns = [cells[dimension][mask].astype(np.int64) for dimension in by]
+
+        if columns and len(columns[0]):
+            # Mixed-radix group number over the dimensions' observed ranges
+            lows = [column.min() for column in columns]
+            group = np.zeros(len(columns[0]), dtype=np.int64)
+            for column, low in zip(columns, lows):
+                group = group * (int(column.max() - low) + 1) + (column - low)
+            unique, group = np.unique(group, return_inverse=True)
+            rows = np.zeros(len(unique), dtype=np.int64)
+            rows[group] = np.arange(len(group))
+            key_codes = [column[rows] for column in columns]
+        else:
+            group = np.zeros(int(mask.sum()), dtype=np.int64)
+            unique = np.zeros(0 if by else 1)
+            key_codes = []
+        size = len(unique)
+
+        totals = [np.bincount(group, weights=cells[name][mask], minlength=size) for name in MEASURES]
+        keys = [tuple(self._label(dimension, code) for dimension, code in zip(by, row))
+                for row in zip(*key_codes)] if by else [()]
+        return Rollup(by, keys, totals[0], totals[1].astype(np.int64), totals[2].astype(np.int64))
+
+    def slice(self, since=None, until=None, **where):
+        """A new cube holding only the cells that match the filters"""
+        cells = self._all_cells()
+        mask = self._mask(cells, since, until, where)
+        cube = VolumeCube(self.utc_offset_minutes)
+        cube.athletes, cube.exercise_names = list(self.athletes), list(self.exercise_names)
+        cube._athlete_codes, cube._exercise_codes = dict(self._athlete_codes), dict(self._exercise_codes)
+        cube._cells = _coalesce({name: values[mask] for name, values in cells.items()})
+        return cube
+
+    def _label(self, dimension, code):
+        if dimension == "athlete":
+            return self.athletes[code]
+        if dimension == "exercise":
+            return self.exercise_names[code]
+        if dimension == "week":
+            return week_label(code)
+        if dimension == "body_part":
+            return WORKOUT_FOCUSES[code]
+        return PROGRESSION_TYPES[code] if code != UNKNOWN else None
+
+    # Persistence
+
+    def save(self, path):
+        """Write the cube to an .npz file (the pending cells are merged first)"""
+        self.compact()
+        meta = {"utc_offset_minutes": self.utc_offset_minutes, "athletes": self.athletes,
+                "exercise_names": self.exercise_names, "session_ids": sorted(self._session_ids)}
+        with open(path, "wb") as handle:
+            np.savez_compressed(handle, meta=np.array(json.dumps(meta)), **self._cells)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            cube = cls(meta["utc_offset_minutes"])
+            cube._cells = {name: data[name].astype(dtype, copy=False) for name, dtype in _DTYPES.items()}
+        for name in meta["athletes"]:
+            cube._code(cube._athlete_codes, cube.athletes, name)
+        for name in meta["exercise_names"]:
+            cube._code(cube._exercise_codes, cube.exercise_names, name)
+        cube._session_ids = set(meta["session_ids"])
+        return cube
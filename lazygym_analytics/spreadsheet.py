@@ -0,0 +1,193 @@
+"""
+Exercise x session pivot export, as built by lazygym/ExcelExporter.swift
+
+One row per exercise (sorted by name), one column per session (oldest
+first) and a cell summarising the completed sets:
+
+    AMRAP / Free   "<last set weight>kg, reps=<last set reps>"
+    Pyramid        "<first set weight>kg, reps=<reps>,<reps>,..."
+
+The (exercise, session) -> instance index for every athlete is built in a
+single pass over the instance columns, and rows are streamed to a CSV writer
+or a write-only openpyxl worksheet, so only one athlete's index and one row
+of text are held at a time.
+"""
+
+from collections import namedtuple
+import csv
+import os
+import re
+
+import numpy as np
+
+from .models import MS_PER_DAY, NULL_REPS, NULL_TIME, PYRAMID
+
+PivotIndex = namedtuple("PivotIndex", ["athlete", "sessions", "exercises", "instances", "cells"])
+
+# Characters Excel rejects in sheet titles (and that are unsafe in file names)
+_UNSAFE_TITLE = re.compile(r"[\[\]:*?/\\]")
+
+
+def pivot_indexes(history):
+    """Yield a PivotIndex for every athlete with at least one session
+
+    sessions holds the athlete's session rows by start time, exercises the
+    exercise codes by name and instances the instance rows referenced by
+    cells, an (exercises, sessions) matrix of positions into instances with
+    -1 where the exercise was not performed. As with
+    currentExercises.first(where:), the first instance of an exercise in a
+    session wins.
+    """
+    session_athlete = np.asarray(history.sessions["athlete"])
+    instance_session = np.asarray(history.instances["session"])
+    instance_exercise = np.asarray(history.instances["exercise"], dtype=np.int64)
+
+    # Column of every session within its athlete's sheet
+    session_order = np.lexsort((np.asarray(history.sessions["start"]), session_athlete))
+    session_bounds = np.searchsorted(session_athlete[session_order],
+                                     np.arange(history.athlete_count + 1))
+    column = np.empty(history.session_count, dtype=np.int64)
+    column[session_order] = np.arange(history.session_count) \
+        - session_bounds[session_athlete[session_order]]
+
+    # First instance of each (session, exercise) key, grouped by athlete
+    key = instance_session.astype(np.int64) * max(1, len(history.exercise_names)) + instance_exercise
+    _, first = np.unique(key, return_index=True)
+    first_athlete = session_athlete[instance_session[first]]
+    first = first[np.argsort(first_athlete, kind="stable")]
+    instance_bounds = np.searchsorted(np.sort(first_athlete), np.arange(history.athlete_count + 1))
+
+    names = np.array(history.exercise_names, dtype=object)
+    lookup = np.empty(len(history.exercise_names), dtype=np.int64)
+    for athlete in range(history.athlete_count):
+        sessions = session_order[session_bounds[athlete]:session_bounds[athlete + 1]]
+        if not len(sessions):
+            continue
+        instances = first[instance_bounds[athlete]:instance_bounds[athlete + 1]]
+        exercises = np.unique(instance_exercise[instances])
+        exercises = exercises[np.argsort(names[exercises], kind="stable")]
+        lookup[exercises] = np.arange(len(exercises))
+
+        cells = np.full((len(exercises), len(sessions)), -1, dtype=np.int64)
+        cells[lookup[instance_exercise[instances]], column[instance_session[instances]]] = \
+            np.arange(len(instances))
+        yield PivotIndex(athlete, sessions, exercises, instances, cells)
+
+
+def _completed_bounds(history):
+    """Indices of completed sets, and each instance's slice into them"""
+    completed = np.flatnonzero(np.asarray(history.sets["completed"]))
+    completed_instance = np.asarray(history.sets["instance"])[completed]
+    instances = np.arange(len(history.instances["session"]))
+    return (
+        completed,
+        np.searchsorted(completed_instance, instances, side="left"),
+        np.searchsorted(completed_instance, instances, side="right"),
+    )
+
+
+def _cell_texts(history, index, completed_sets):
+    """Performance text for each instance of one athlete's pivot, plus a trailing blank"""
+    completed, lower, upper = completed_sets
+    weight = history.sets["weight"]
+    actual_reps = history.sets["actual_reps"]
+    progression = np.asarray(history.instances["exercise_progression"])
+
+    # Like the Swift exporter, a row is formatted by the progression type of
+    # the first session its exercise appears in
+    filled = index.cells >= 0
+    first_cell = index.cells[np.arange(len(index.exercises)), filled.argmax(axis=1)]
+    row_progression = progression[index.instances[first_cell]]
+    row = np.empty(len(index.instances), dtype=np.int64)
+    row[index.cells[filled]] = np.nonzero(filled)[0]
+
+    texts = np.empty(len(index.instances) + 1, dtype=object)
+    texts[-1] = ""
+    for position, instance in enumerate(index.instances.tolist()):
+        chosen = completed[lower[instance]:upper[instance]]
+        if not len(chosen):
+            texts[position] = ""
+        elif row_progression[row[position]] == PYRAMID:
+            reps = [str(value) for value in actual_reps[chosen].tolist() if value != NULL_REPS]
+            texts[position] = f"{weight[chosen[0]]:.1f}kg, reps={','.join(reps)}"
+        else:
+            last_reps = int(actual_reps[chosen[-1]])
+            texts[position] = "" if last_reps == NULL_REPS \
+                else f"{weight[chosen[-1]]:.1f}kg, reps={last_reps}"
+    return texts
+
+
+def _session_dates(history, sessions, utc_offset_minutes):
+    start = np.asarray(history.sessions["start"])[sessions]
+    days = ((start + utc_offset_minutes * 60_000) // MS_PER_DAY).astype("datetime64[D]")
+    return np.where(start == NULL_TIME, "", days.astype(str)).tolist()
+
+
+def pivot_rows(history, index, utc_offset_minutes=0, completed_sets=None):
+    """Yield the header and then one row of strings per exercise
+
+    Dates are yyyy-MM-dd in the given UTC offset, since exports do not
+    record the device time zone.
+    """
+    completed_sets = completed_sets or _completed_bounds(history)
+    yield ["Exercise"] + _session_dates(history, index.sessions, utc_offset_minutes)
+
+    texts = _cell_texts(history, index, completed_sets)
+    for exercise, cells in zip(index.exercises.tolist(), index.cells):
+        yield [history.exercise_names[exercise]] + texts[cells].tolist()
+
+
+def write_pivot_csv(history, index, handle, utc_offset_minutes=0, completed_sets=None):
+    """Stream one athlete's pivot to a text handle as CSV"""
+    writer = csv.writer(handle)
+    for row in pivot_rows(history, index, utc_offset_minutes, completed_sets):
+        writer.writerow(row)
+
+
+def _unique_title(name, used, limit):
+    title = _UNSAFE_TITLE.sub("_", name or "athlete")[:limit] or "athlete"
+    candidate, suffix = title, 2
+    while candidate.lower() in used:
+        candidate = f"{title[:limit - len(str(suffix)) - 1]}-{suffix}"
+        suffix += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def export_pivot(history, output, utc_offset_minutes=0):
+    """Export every athlete's pivot and return the number of athletes written
+
+    An .xlsx output becomes one workbook with a worksheet per athlete (needs
+    openpyxl); any other output is a directory with one CSV file per athlete.
+    """
+    completed_sets = _completed_bounds(history)
+    used = set()
+
+    if output.lower().endswith(".xlsx"):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ImportError("openpyxl is required for .xlsx output; "
+                              "pass a directory to export CSV files instead") from None
+
+        workbook = Workbook(write_only=True)
+        written = 0
+        for index in pivot_indexes(history):
+            sheet = workbook.create_sheet(_unique_title(history.athletes[index.athlete], used, 31))
+            for row in pivot_rows(history, index, utc_offset_minutes, completed_sets):
+                # Write-only sheets skip None cells entirely, which is much cheaper than ""
+                sheet.append([value or None for value in row])
+            written += 1
+        if not written:
+            workbook.create_sheet("Exercise")
+        workbook.save(output)
+        return written
+
+    os.makedirs(output, exist_ok=True)
+    written = 0
+    for index in pivot_indexes(history):
+        filename = _unique_title(history.athletes[index.athlete], used, 200) + ".csv"
+        with open(os.path.join(output, filename), "w", newline="", encoding="utf-8") as handle:
+            write_pivot_csv(history, index, handle, utc_offset_minutes, completed_sets)
+        written += 1
+    return written
@@ -0,0 +1,183 @@
+"""
+Vectorized ports of the DataManager analytics in js/dataManager.js
+
+Every function works on a whole History at once and returns one result per
+athlete (or per athlete and exercise), using NumPy group-bys instead of the
+per-session loops the app runs on each render.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .models import (
+    AMRAP,
+    FREE,
+    MS_PER_DAY,
+    MS_PER_WEEK,
+    NULL_REPS,
+    PYRAMID,
+    current_time_ms,
+    timeframe_weeks,
+)
+
+WorkoutStats = namedtuple(
+    "WorkoutStats",
+    ["total_workouts", "average_workouts_per_week", "heaviest_lift", "longest_streak"],
+)
+WeeklyFrequency = namedtuple("WeeklyFrequency", ["week_starts", "counts"])
+ProgressionSeries = namedtuple("ProgressionSeries", ["athlete", "exercise", "session", "start", "value"])
+
+
+def workout_stats(history, now=None, utc_offset_minutes=0):
+    """calculateWorkoutStats for every athlete; each field is an array by athlete"""
+    now = current_time_ms() if now is None else now
+    athletes = history.athlete_count
+    session_athlete = history.sessions["athlete"]
+
+    total_workouts = np.bincount(session_athlete, minlength=athletes)
+
+    twelve_weeks_ago = now - 12 * MS_PER_WEEK
+    recent = history.sessions["start"] >= twelve_weeks_ago
+    weeks = max(1, -(-(now - twelve_weeks_ago) // MS_PER_WEEK))
+    average_workouts_per_week = np.bincount(session_athlete[recent], minlength=athletes) / weeks
+
+    heaviest_lift = np.zeros(athletes)
+    if len(history.sets["weight"]):
+        set_athlete = session_athlete[history.set_session()]
+        np.maximum.at(heaviest_lift, set_athlete, history.sets["weight"])
+
+    return WorkoutStats(
+        total_workouts,
+        average_workouts_per_week,
+        heaviest_lift,
+        longest_streak(history, utc_offset_minutes),
+    )
+
+
+def longest_streak(history, utc_offset_minutes=0):
+    """calculateLongestStreak for every athlete
+
+    Sessions on the same or consecutive calendar days extend a streak, and
+    each session counts once, exactly like the JS. Days are taken in the
+    given UTC offset since exports do not record the device time zone.
+    """
+    athletes = history.athlete_count
+    streaks = np.zeros(athletes, dtype=np.int64)
+    if not history.session_count:
+        return streaks
+
+    athlete = history.sessions["athlete"]
+    start = history.sessions["start"]
+    order = np.lexsort((start, athlete))
+    athlete = athlete[order]
+    day = (start[order] + utc_offset_minutes * 60_000) // MS_PER_DAY
+
+    new_run = np.ones(len(order), dtype=bool)
+    new_run[1:] = (athlete[1:] != athlete[:-1]) | (np.diff(day) > 1)
+    run_id = np.cumsum(new_run) - 1
+    run_length = np.bincount(run_id)
+    np.maximum.at(streaks, athlete[new_run], run_length)
+    return streaks
+
+
+def workout_frequency(history, timeframe, now=None):
+    """calculateWorkoutFrequency for every athlete
+
+    Returns the week start timestamps and an (athletes, weeks) count matrix.
+    Like the JS, each week covers its first day through six days later.
+    """
+    now = current_time_ms() if now is None else now
+    weeks = timeframe_weeks(timeframe)
+    start_date = now - weeks * MS_PER_WEEK
+    week_starts = start_date + np.arange(weeks, dtype=np.int64) * MS_PER_WEEK
+
+    offset = history.sessions["start"] - start_date
+    week = offset // MS_PER_WEEK
+    in_week = (week >= 0) & (week < weeks) & (offset - week * MS_PER_WEEK <= 6 * MS_PER_DAY)
+
+    flat = history.sessions["athlete"][in_week].astype(np.int64) * weeks + week[in_week]
+    counts = np.bincount(flat, minlength=history.athlete_count * weeks)
+    return WeeklyFrequency(week_starts, counts.reshape(history.athlete_count, weeks))
+
+
+def instance_metric_values(history, metric):
+    """calculateMetricValue for every exercise instance"""
+    instances = history.instances
+    sets = history.sets
+    count = len(instances["session"])
+    offsets = history.set_offsets()
+    has_sets = offsets[1:] > offsets[:-1]
+    actual_reps = sets["actual_reps"]
+    logged = actual_reps != NULL_REPS
+
+    if metric == "weight":
+        # Working weight is the first set's weight
+        values = np.zeros(count)
+        values[has_sets] = sets["weight"][offsets[:-1][has_sets]]
+        return values
+
+    if metric == "reps":
+        # Final set reps for AMRAP/Free, total logged reps for Pyramid
+        final_reps = np.zeros(count)
+        final_reps[has_sets] = np.maximum(actual_reps[offsets[1:][has_sets] - 1], 0)
+        total_reps = np.bincount(sets["instance"], weights=np.where(logged, actual_reps, 0),
+                                 minlength=count)
+        progression = instances["exercise_progression"]
+        return np.select(
+            [(progression == AMRAP) | (progression == FREE), progression == PYRAMID],
+            [final_reps, total_reps],
+            0.0,
+        )
+
+    if metric == "volume":
+        weight = np.asarray(sets["weight"], dtype=np.float64)
+        volume = np.where(logged, weight * actual_reps, 0.0)
+        return np.bincount(sets["instance"], weights=volume, minlength=count)
+
+    raise ValueError(f"Unknown analytics metric: {metric}")
+
+
+def exercise_series(history, metric, since=None):
+    """Per-(athlete, exercise) metric series over all sessions
+
+    Uses the first instance of an exercise in each session and drops
+    non-positive values, as calculateExerciseProgression does. Rows are
+    sorted by athlete, exercise and session start time.
+    """
+    instances = history.instances
+    session = instances["session"]
+    start = history.sessions["start"][session]
+
+    selected = np.ones(len(session), dtype=bool) if since is None else start >= since
+    index = np.flatnonzero(selected)
+
+    # Instances are stored in session order, so the first occurrence of each
+    # (session, exercise) key is the one Array.find would return
+    key = session[index].astype(np.int64) * max(1, len(history.exercise_names)) \
+        + instances["exercise"][index]
+    _, first = np.unique(key, return_index=True)
+    index = index[first]
+
+    values = instance_metric_values(history, metric)[index]
+    index, values = index[values > 0], values[values > 0]
+
+    athlete = history.sessions["athlete"][session[index]]
+    exercise = instances["exercise"][index]
+    order = np.lexsort((session[index], start[index], exercise, athlete))
+    return ProgressionSeries(
+        athlete[order],
+        exercise[order],
+        session[index][order],
+        start[index][order],
+        values[order],
+    )
+
+
+def exercise_progression(history, exercise_name, metric, timeframe, now=None, athlete=0):
+    """calculateExerciseProgression for one athlete and exercise"""
+    now = current_time_ms() if now is None else now
+    since = now - timeframe_weeks(timeframe) * MS_PER_WEEK
+    series = exercise_series(history, metric, since=since)
+    keep = (series.athlete == athlete) & (series.exercise == history.exercise_code(exercise_name))
+    return ProgressionSeries(*(column[keep] for column in series))
@@ -0,0 +1,160 @@
+"""
+Compact columnar on-disk format for workout history
+
+A store is a directory with one .npy file per column plus meta.json:
+
+    meta.json                 format version, row counts, exercise dictionary, athletes
+    sessions/start.npy        int64 epoch ms
+    sessions/session_id.npy   fixed-width UTF-8 bytes
+    instances/exercise.npy    int32 code into meta.json "exercise_names"
+    sets/weight.npy           float32 kg
+    sets/actual_reps.npy      int16 (int32 if any value does not fit), -1 for not logged
+    ...
+
+Columns open lazily with np.load(mmap_mode="r"), so a query only maps and
+pages in the columns it actually reads.
+"""
+
+from collections.abc import Mapping, Sequence
+import json
+import os
+
+import numpy as np
+
+from .columns import TABLE_SCHEMA, History, HistoryBuilder
+from .stream import stream_export
+
+FORMAT_VERSION = 1
+
+# Narrower on-disk dtypes; anything not listed, and integer columns with
+# values outside the narrow type's range, keep their in-memory dtype
+DISK_DTYPES = {
+    ("sets", "weight"): np.float32,
+    ("sets", "planned_reps"): np.int16,
+    ("sets", "actual_reps"): np.int16,
+}
+
+
+class StoreFormatError(ValueError):
+    """The directory is not a readable history store"""
+
+
+class _MappedTable(Mapping):
+    """Column name -> memory-mapped array, loaded on first access"""
+
+    def __init__(self, directory, names, rows):
+        self._directory = directory
+        self._names = list(names)
+        self._rows = rows
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            if name not in self._names:
+                raise KeyError(name)
+            array = np.load(os.path.join(self._directory, f"{name}.npy"), mmap_mode="r")
+            if len(array) != self._rows:
+                raise StoreFormatError(f"Column {name} has {len(array)} rows, expected {self._rows}")
+            self._arrays[name] = array
+        return array
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+class _MappedStrings(Sequence):
+    """Read-only view of a fixed-width bytes column as str values"""
+
+    def __init__(self, array):
+        self._array = array
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [value.decode("utf-8") for value in self._array[index]]
+        return self._array[index].decode("utf-8")
+
+    def __len__(self):
+        return len(self._array)
+
+
+def _disk_dtype(table, name, values):
+    dtype = np.dtype(DISK_DTYPES.get((table, name), TABLE_SCHEMA[table][name]))
+    if dtype.kind == "i" and len(values):
+        limits = np.iinfo(dtype)
+        if values.min() < limits.min or values.max() > limits.max:
+            return np.dtype(TABLE_SCHEMA[table][name])
+    return dtype
+
+
+def write_store(history, directory):
+    """Write a History as a columnar store directory"""
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, "meta.json")
+    # A meta.json left by an earlier write would make a half-written store look complete
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    counts = {}
+    dtypes = {}
+
+    for table, columns in history.tables.items():
+        table_dir = os.path.join(directory, table)
+        os.makedirs(table_dir, exist_ok=True)
+        dtypes[table] = {}
+        for name, values in columns.items():
+            values = np.asarray(values)
+            dtype = dtypes[table][name] = _disk_dtype(table, name, values)
+            np.save(os.path.join(table_dir, f"{name}.npy"), values.astype(dtype, copy=False))
+            counts[table] = len(values)
+
+    session_ids = np.array([(value or "").encode("utf-8") for value in history.session_ids],
+                           dtype=bytes)
+    if not len(session_ids):
+        session_ids = np.empty(0, dtype="S1")
+    np.save(os.path.join(directory, "sessions", "session_id.npy"), session_ids)
+
+    meta = {
+        "format": "lazygym-columnar",
+        "version": FORMAT_VERSION,
+        "rows": counts,
+        "columns": {table: {name: dtype.str for name, dtype in columns.items()} for table, columns in dtypes.items()},
+        "exercise_names": history.exercise_names,
+        "athletes": history.athletes,
+    }
+    # Metadata goes last so a half-written store never looks complete
+    temporary = meta_path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, indent=2)
+    os.replace(temporary, meta_path)
+
+
+def open_store(directory):
+    """Open a store as a History backed by memory-mapped columns"""
+    try:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as handle:
+            meta = json.load(handle)
+    except FileNotFoundError:
+        raise StoreFormatError(f"No meta.json in {directory}") from None
+
+    if meta.get("format") != "lazygym-columnar" or meta.get("version") != FORMAT_VERSION:
+        raise StoreFormatError(f"Unsupported store format in {directory}")
+
+    tables = {
+        table: _MappedTable(os.path.join(directory, table), TABLE_SCHEMA[table], meta["rows"][table])
+        for table in TABLE_SCHEMA
+    }
+    session_ids = np.load(os.path.join(directory, "sessions", "session_id.npy"), mmap_mode="r")
+    return History(tables, meta["exercise_names"], meta["athletes"], _MappedStrings(session_ids))
+
+
+def convert_exports(paths, directory):
+    """Stream export files (one athlete each) into a new store directory"""
+    builder = HistoryBuilder()
+    for path in paths:
+        stream_export(path, builder=builder)
+    history = builder.build()
+    write_store(history, directory)
+    return history
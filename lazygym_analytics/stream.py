@@ -0,0 +1,191 @@
+"""
+Streaming reader for LazyGym export files
+
+DataManager.exportData() writes one large JSON object whose workoutHistory
+array grows with every session. Instead of json.load on the whole file, the
+reader walks the top-level object through a sliding text buffer and decodes
+one workoutHistory entry at a time, so memory stays bounded by the largest
+single session no matter how long the history is.
+"""
+
+from collections import namedtuple
+import json
+
+from .columns import HistoryBuilder
+from .loader import athlete_name, open_export
+from .models import NULL_REPS, focus_code, parse_timestamp, progression_code
+
+SessionRecord = namedtuple("SessionRecord", ["index", "id", "start", "end", "focus", "completed"])
+InstanceRecord = namedtuple(
+    "InstanceRecord",
+    ["index", "session", "exercise_name", "progression", "exercise_progression", "body_part", "upper"],
+)
+SetRecord = namedtuple(
+    "SetRecord",
+    ["index", "instance", "weight", "planned_reps", "actual_reps", "completed", "completed_at"],
+)
+
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+
+
+class ExportFormatError(ValueError):
+    """The stream is not a LazyGym export object"""
+
+
+class _JsonCursor:
+    """Incremental view over a text stream for decoding one value at a time"""
+
+    def __init__(self, handle, chunk_size):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self, minimum=None):
+        chunk = self.handle.read(max(self.chunk_size, minimum or 0))
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop everything already consumed before appending
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ExportFormatError(f"Expected {char!r} but found {found!r}")
+        self.position += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                # Value is cut off by the buffer edge; read more, growing with the backlog
+                self._fill(len(self.buffer) - self.position)
+                continue
+            # A number ending at the buffer edge may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.position = end
+            return value
+
+
+def iter_export_items(handle, chunk_size=1 << 16, history_marker=False):
+    """Yield (key, value) for top-level fields, then ("session", dict) per history entry
+
+    Fields are produced in file order. Sessions are yielded one by one and
+    never accumulated; every other top-level value is decoded whole. With
+    history_marker, ("workoutHistory", None) is yielded where the history
+    starts, so its position is known even when it is empty.
+    """
+    cursor = _JsonCursor(handle, chunk_size)
+    cursor.expect("{")
+    if cursor.peek() == "}":
+        return
+
+    while True:
+        key = cursor.decode()
+        cursor.expect(":")
+
+        if key == "workoutHistory":
+            if history_marker:
+                yield key, None
+            cursor.expect("[")
+            if cursor.peek() == "]":
+                cursor.position += 1
+            else:
+                while True:
+                    yield "session", cursor.decode()
+                    separator = cursor.peek()
+                    cursor.position += 1
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise ExportFormatError(f"Expected ',' or ']' but found {separator!r}")
+        else:
+            yield key, cursor.decode()
+
+        separator = cursor.peek()
+        cursor.position += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ExportFormatError(f"Expected ',' or '}}' but found {separator!r}")
+
+
+def iter_sessions(path, chunk_size=1 << 16):
+    """Yield each workoutHistory entry of an export file as a dict"""
+    with open_export(path) as handle:
+        for key, value in iter_export_items(handle, chunk_size):
+            if key == "session":
+                yield value
+
+
+def iter_records(path, chunk_size=1 << 16):
+    """Yield typed SessionRecord, InstanceRecord and SetRecord rows in file order"""
+    instance_index = set_index = 0
+    for session_index, session in enumerate(iter_sessions(path, chunk_size)):
+        template = session.get("template") or {}
+        yield SessionRecord(
+            session_index,
+            session.get("id"),
+            parse_timestamp(session.get("startTime")),
+            parse_timestamp(session.get("endTime")),
+            focus_code(template.get("focus")),
+            bool(session.get("isCompleted")),
+        )
+
+        for instance in template.get("exerciseInstances") or []:
+            exercise = instance.get("exercise") or {}
+            yield InstanceRecord(
+                instance_index,
+                session_index,
+                exercise.get("name"),
+                progression_code(instance.get("progressionType") or exercise.get("progressionType")),
+                progression_code(exercise.get("progressionType")),
+                focus_code(exercise.get("bodyPart")),
+                bool(exercise.get("isUpperBody")),
+            )
+
+            for workout_set in instance.get("sets") or []:
+                actual_reps = workout_set.get("actualReps")
+                yield SetRecord(
+                    set_index,
+                    instance_index,
+                    float(workout_set.get("weight") or 0.0),
+                    int(workout_set.get("plannedReps") or 0),
+                    NULL_REPS if actual_reps is None else int(actual_reps),
+                    bool(workout_set.get("isCompleted")),
+                    parse_timestamp(workout_set.get("completedAt")),
+                )
+                set_index += 1
+            instance_index += 1
+
+
+def stream_export(path, builder=None, athlete=None, chunk_size=1 << 16):
+    """Stream an export file straight into a HistoryBuilder
+
+    Returns a built History when no builder is passed, otherwise the athlete
+    index added to the given builder so several files can share one store.
+    """
+    target = builder or HistoryBuilder()
+    athlete_index = target.add_athlete(athlete or athlete_name(path))
+    for session in iter_sessions(path, chunk_size):
+        target.add_session(session, athlete_index)
+    return target.build() if builder is None else athlete_index
@@ -0,0 +1,348 @@
+"""
+Local ingest server for export uploads from many devices
+
+Each device POSTs the JSON written by DataManager.exportData() to
+/sync/<athlete>. Sessions are deduplicated by id, exercises and workout
+templates are kept only when new or changed, and everything accepted from one
+upload is appended to the athlete's log under a new sync version:
+
+    POST /sync/<athlete>            export JSON (optionally gzip encoded)
+    GET  /sync/<athlete>?since=N    export JSON of everything newer than N
+
+The GET response has the same shape as an export file plus "syncVersion", so
+it can be imported by the app or loaded by load_export(). since=0 returns the
+complete merged history.
+
+A log is one NDJSON file per athlete, sync.ndjson, with a record per line:
+
+    {"version":3,"kind":"session","id":"...","value":{...}}
+
+The in-memory index keeps the byte range of every value, so answering a
+changes query copies raw bytes out of the log instead of re-encoding JSON.
+All file reads and writes, loading an athlete's log, upload parsing and
+digesting run in worker threads, so the event loop keeps accepting
+connections while the disk or a large upload is busy.
+"""
+
+import asyncio
+from bisect import bisect_right
+import gzip
+import hashlib
+import json
+import os
+import re
+from urllib.parse import parse_qs, urlsplit
+import zlib
+
+from .models import current_time_ms, format_timestamp
+
+LOG_NAME = "sync.ndjson"
+MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+
+# Export field -> record kind, in export order
+EXPORT_KINDS = {
+    "exercises": "exercise",
+    "workoutTemplates": "template",
+    "workoutHistory": "session",
+}
+
+# Athletes name directories under the data directory, so "." and ".." are not names
+_ATHLETE = re.compile(r"^(?!\.{1,2}$)[A-Za-z0-9_.@-]{1,128}$")
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class SyncError(ValueError):
+    """An upload or query the server refuses, with its HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _record_prefix(version, kind, record_id):
+    return (f'{{"version":{version},"kind":"{kind}","id":'
+            f'{json.dumps(record_id, ensure_ascii=False)},"value":').encode("utf-8")
+
+
+def _digest(value):
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+def _record_id(value):
+    """Records without an id are identified by their content"""
+    record_id = value.get("id") if isinstance(value, dict) else None
+    return str(record_id) if record_id is not None else _digest(value).hex()
+
+
+class SyncLog:
+    """Append-only versioned log of one athlete's uploads"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, LOG_NAME)
+        self.version = 0
+        self.size = 0
+        # (version, kind, id, value offset, value length) per record, in log order
+        self.entries = []
+        self.versions = []
+        # (kind, id) -> (content digest, entry index) of the latest revision;
+        # sessions are never revised, so they carry no digest
+        self.latest = {}
+        self.lock = asyncio.Lock()
+        self._recover()
+
+    def _recover(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, "rb") as handle:
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break  # torn final write; truncated below
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                kind, record_id = record["kind"], record["id"]
+                prefix = len(_record_prefix(record["version"], kind, record_id))
+                digest = None if kind == "session" else _digest(record["value"])
+                self._index(record["version"], kind, record_id, digest,
+                            offset + prefix, len(line) - prefix - 2)
+                offset += len(line)
+        if offset != os.path.getsize(self.path):
+            os.truncate(self.path, offset)
+        self.size = offset
+
+    def _index(self, version, kind, record_id, digest, offset, length):
+        self.latest[kind, record_id] = (digest, len(self.entries))
+        self.entries.append((version, kind, record_id, offset, length))
+        self.versions.append(version)
+        self.version = max(self.version, version)
+
+    def _delta(self, export):
+        """Records of an export that are not already in the log"""
+        if not isinstance(export, dict):
+            raise SyncError(400, "Upload is not an export object")
+        delta = []
+        seen = set()
+        for field, kind in EXPORT_KINDS.items():
+            values = export.get(field) or []
+            if not isinstance(values, list):
+                raise SyncError(400, f"{field} is not a list")
+            for value in values:
+                record_id = _record_id(value)
+                if (kind, record_id) in seen:
+                    continue
+                seen.add((kind, record_id))
+                known = self.latest.get((kind, record_id))
+                if kind == "session":
+                    # Sessions are immutable once logged, so the id is enough
+                    if known is None:
+                        delta.append((kind, record_id, None, value))
+                    continue
+                digest = _digest(value)
+                if known is None or known[0] != digest:
+                    delta.append((kind, record_id, digest, value))
+        return delta
+
+    def _append(self, version, delta):
+        """Encode and durably append one version; returns the index rows to add"""
+        lines, pending, offset = [], [], self.size
+        for kind, record_id, digest, value in delta:
+            prefix = _record_prefix(version, kind, record_id)
+            body = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            lines.append(prefix + body + b"}\n")
+            pending.append((kind, record_id, digest, offset + len(prefix), len(body)))
+            offset += len(lines[-1])
+
+        with open(self.path, "ab") as handle:
+            handle.write(b"".join(lines))
+            handle.flush()
+            os.fsync(handle.fileno())
+        return pending, offset
+
+    async def ingest(self, export):
+        """Append the new records of an upload and return a summary dict"""
+        async with self.lock:
+            # Digesting every exercise and template of a large export is CPU-bound;
+            # the lock keeps self.latest unchanged while the thread reads it
+            delta = await asyncio.to_thread(self._delta, export)
+            counts = {kind: 0 for kind in EXPORT_KINDS.values()}
+            for kind, *_ in delta:
+                counts[kind] += 1
+            if not delta:
+                return {"syncVersion": self.version, "added": counts}
+
+            version = self.version + 1
+            pending, self.size = await asyncio.to_thread(self._append, version, delta)
+            # Only index once the bytes are durable, so readers never see a partial version
+            for kind, record_id, digest, offset, length in pending:
+                self._index(version, kind, record_id, digest, offset, length)
+            return {"syncVersion": version, "added": counts}
+
+    def _read_values(self, selected):
+        values = {kind: [] for kind in EXPORT_KINDS.values()}
+        if not selected:
+            return values
+        with open(self.path, "rb") as handle:
+            descriptor = handle.fileno()
+            for kind, offset, length in selected:
+                values[kind].append(os.pread(descriptor, length, offset))
+        return values
+
+    async def changes(self, since=0):
+        """Export JSON bytes of every record newer than version since"""
+        version, entry_count = self.version, len(self.entries)
+        selected = []
+        for index in range(bisect_right(self.versions, since, 0, entry_count), entry_count):
+            _, kind, record_id, offset, length = self.entries[index]
+            # Exercises and templates may have several revisions; send the latest
+            if self.latest[kind, record_id][1] <= index:
+                selected.append((kind, offset, length))
+
+        values = await asyncio.to_thread(self._read_values, selected)
+        parts = [b"{"]
+        for field, kind in EXPORT_KINDS.items():
+            parts += [json.dumps(field).encode(), b":[", b",".join(values[kind]), b"],"]
+        parts.append(json.dumps({
+            "exportDate": format_timestamp(current_time_ms()),
+            "version": "1.0",
+            "syncVersion": version,
+        }, separators=(",", ":"))[1:].encode())
+        return b"".join(parts)
+
+
+class SyncServer:
+    """Routes HTTP requests to one SyncLog per athlete under a data directory"""
+
+    def __init__(self, directory, max_upload_bytes=MAX_UPLOAD_BYTES):
+        self.directory = directory
+        self.max_upload_bytes = max_upload_bytes
+        # athlete -> task loading that athlete's SyncLog
+        self.logs = {}
+
+    async def log(self, athlete):
+        """The athlete's SyncLog, loaded in a worker thread on first use"""
+        if not _ATHLETE.match(athlete):
+            raise SyncError(404, f"Unknown athlete {athlete!r}")
+        loading = self.logs.get(athlete)
+        if loading is None:
+            # Concurrent first requests share one load instead of each reading the log
+            loading = self.logs[athlete] = asyncio.ensure_future(
+                asyncio.to_thread(SyncLog, os.path.join(self.directory, athlete)))
+        try:
+            # A cancelled request must not cancel the load other requests are waiting on
+            return await asyncio.shield(loading)
+        except Exception:
+            if self.logs.get(athlete) is loading and loading.done():
+                del self.logs[athlete]  # retried by the next request
+            raise
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise SyncError(400, "Malformed request line") from None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise SyncError(400, "Content-Length must be a non-negative integer")
+        if length > self.max_upload_bytes:
+            raise SyncError(413, f"Upload larger than {self.max_upload_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method, target, headers, body
+
+    async def _respond(self, method, target, headers, body):
+        url = urlsplit(target)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "sync":
+            raise SyncError(404, f"No route for {url.path}")
+        log = await self.log(parts[1])
+
+        if method == "GET":
+            try:
+                since = int(parse_qs(url.query).get("since", ["0"])[0])
+            except ValueError:
+                raise SyncError(400, "since must be an integer version") from None
+            return await log.changes(since)
+
+        if method == "POST":
+            export = await asyncio.to_thread(_decode_upload, body, headers.get("content-encoding"))
+            return json.dumps(await log.ingest(export)).encode()
+
+        raise SyncError(405, f"{method} is not supported")
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                # Anything that fails before the headers are parsed ends the connection
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload = 200, await self._respond(method, target, headers, body)
+                except SyncError as error:
+                    status, payload = error.status, json.dumps({"error": str(error)}).encode()
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as error:
+                    status, payload = 500, json.dumps({"error": repr(error)}).encode()
+                    keep_alive = False
+
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _decode_upload(body, encoding):
+    if encoding == "gzip":
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError, zlib.error) as error:
+            raise SyncError(400, f"Upload is not valid gzip: {error}") from None
+    elif encoding not in (None, "", "identity"):
+        raise SyncError(400, f"Unsupported Content-Encoding {encoding}")
+    try:
+        return json.loads(body)
+    except ValueError as error:
+        raise SyncError(400, f"Upload is not valid JSON: {error}") from None
+
+
+async def serve(directory, host="127.0.0.1", port=8765):
+    """Run the ingest server until cancelled"""
+    sync_server = SyncServer(directory)
+    server = await asyncio.start_server(sync_server.handle, host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,236 @@
+"""
+Synthetic export files for load and scale testing
+
+Each athlete trains the app's default exercises (DataManager.addDefaultExercises)
+in alternating upper and lower body workouts for a number of years. Sets are
+planned exactly like ProgressionCalculator.generateSetsForExercise:
+
+    AMRAP     3 x 5 reps + 1 set to failure, then calculateAMRAPProgression
+    Pyramid   currentReps, or 100/70/50/50% of baseReps, then the logged reps
+    Free      3 x 5 + failure with no automatic progression
+
+Performance comes from a hidden per-exercise strength that improves with
+training, so rep counts stall and recover like real logs. Each athlete is an
+independent seeded generator whose file is written one session at a time, and
+athletes are spread over a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import json
+import os
+import random
+
+from .models import MS_PER_DAY, current_time_ms, format_timestamp
+from .progression import DEFAULT_RULES, amrap_progression
+
+# (name, progressionType, bodyPart, currentWeight, baseReps) from addDefaultExercises
+DEFAULT_EXERCISES = (
+    ("Squat", "amrap", "lower", 60.0, 10),
+    ("Deadlift", "amrap", "lower", 80.0, 10),
+    ("Pull up", "pyramid", "upper", 0.0, 8),
+    ("Push-up", "amrap", "upper", 20.0, 10),
+    ("Kettlebell swing", "pyramid", "lower", 24.0, 15),
+    ("Overhead Press", "amrap", "upper", 20.0, 10),
+    ("Barbell Curl", "free", "upper", 20.0, 10),
+)
+
+# Template name, focus and the exercises it trains
+TEMPLATES = (
+    ("Upper Body", "upper", ("Pull up", "Push-up", "Overhead Press", "Barbell Curl")),
+    ("Lower Body", "lower", ("Squat", "Deadlift", "Kettlebell swing")),
+)
+
+class _Athlete:
+    """Seeded state of one simulated athlete"""
+
+    def __init__(self, seed, start_ms):
+        self.random = random.Random(seed)
+        self.start_ms = start_ms
+        self.sessions_per_week = self.random.uniform(2.0, 5.0)
+        self.exercises = {}
+        self.strength = {}
+        self.start_weights = {row[0]: row[3] for row in DEFAULT_EXERCISES}
+        for name, progression_type, body_part, weight, base_reps in DEFAULT_EXERCISES:
+            self.exercises[name] = {
+                "id": self.make_id("exercise", start_ms),
+                "name": name,
+                "progressionType": progression_type,
+                "isUpperBody": body_part == "upper",
+                "bodyPart": body_part,
+                "currentWeight": weight,
+                "baseReps": base_reps,
+                "currentReps": None,
+                "lastWorkoutDate": None,
+            }
+            # Reps the athlete could do at the starting weight when fresh
+            self.strength[name] = self.random.uniform(0.8, 1.3) * (base_reps + 2)
+        self.templates = [
+            {
+                "id": self.make_id("template", start_ms),
+                "name": name,
+                "exercises": [],
+                "exerciseInstances": [self.instance(self.exercises[exercise], []) for exercise in exercises],
+                "focus": focus,
+                "createdDate": format_timestamp(start_ms),
+            }
+            for name, focus, exercises in TEMPLATES
+        ]
+
+    def make_id(self, kind, ms):
+        # Same shape as the app's generateId(); hex digits are a subset of its base 36
+        return f"{kind}_{ms}_{self.random.getrandbits(36):09x}"
+
+    def instance(self, exercise, sets):
+        return {
+            "id": self.make_id("instance", self.start_ms),
+            "exercise": dict(exercise),
+            "progressionType": exercise["progressionType"],
+            "amrapWeight": None,
+            "pyramidBaseReps": None,
+            "notes": "",
+            "sets": sets,
+            "isCompleted": bool(sets),
+        }
+
+    def capacity(self, name, weight):
+        """Reps possible at a weight, from the strength at the starting weight"""
+        exercise_start = self.start_weights[name]
+        if weight <= 0 or exercise_start <= 0:
+            return self.strength[name]
+        # Epley: one-rep max = weight * (1 + reps / 30)
+        one_rep_max = max(exercise_start, 1.0) * (1 + self.strength[name] / 30)
+        return max(0.0, 30 * (one_rep_max / weight - 1))
+
+    def planned_reps(self, exercise):
+        if exercise["progressionType"] == "pyramid":
+            if exercise["currentReps"]:
+                return list(exercise["currentReps"])
+            base_reps = exercise["baseReps"]
+            return [base_reps, int(base_reps * 0.7), int(base_reps * 0.5), int(base_reps * 0.5)]
+        return [5, 5, 5, 0]
+
+    def perform(self, exercise, at_ms):
+        """Log one exercise and apply the app's progression to its state"""
+        name = exercise["name"]
+        weight = exercise["currentWeight"]
+        possible = self.capacity(name, weight) * self.random.uniform(0.85, 1.1)
+        sets = []
+        for number, planned in enumerate(self.planned_reps(exercise)):
+            skipped = self.random.random() < 0.02
+            if planned == 0:
+                reps = int(max(0, possible - 1.5 * number))
+            else:
+                reps = int(max(0, min(planned + self.random.randint(-1, 2), possible - number)))
+            completed_at = at_ms + (number + 1) * self.random.randint(90, 240) * 1000
+            sets.append({
+                "id": self.make_id("set", completed_at),
+                "plannedReps": planned,
+                "actualReps": None if skipped else reps,
+                "weight": weight,
+                "isCompleted": not skipped,
+                "completedAt": None if skipped else format_timestamp(completed_at),
+            })
+        instance = self.instance(exercise, sets)
+
+        completed = [workout_set for workout_set in sets if workout_set["isCompleted"]]
+        progression_type = exercise["progressionType"]
+        if completed and completed[-1]["actualReps"] is not None:
+            final_reps = completed[-1]["actualReps"]
+            if progression_type == "amrap":
+                exercise["currentWeight"] = float(amrap_progression(
+                    weight, final_reps, exercise["bodyPart"] == "upper", DEFAULT_RULES))
+            elif progression_type == "pyramid":
+                exercise["currentReps"] = [s["actualReps"] for s in completed if s["actualReps"] is not None]
+            elif final_reps >= 10 and self.random.random() < 0.5:
+                # Free progression: the athlete bumps the weight by hand now and then
+                exercise["currentWeight"] = weight + 2.5
+        exercise["lastWorkoutDate"] = format_timestamp(at_ms)
+
+        # Training effect, with diminishing returns
+        self.strength[name] += self.random.uniform(0.0, 0.25) / (1 + self.strength[name] / 40)
+        return instance
+
+    def sessions(self, end_ms):
+        """Yield workoutHistory entries in chronological order up to end_ms"""
+        day = self.start_ms // MS_PER_DAY
+        template_index = 0
+        while True:
+            day += max(1, round(self.random.expovariate(self.sessions_per_week / 7)))
+            start = day * MS_PER_DAY + self.random.randint(6 * 3600, 20 * 3600) * 1000
+            if start >= end_ms:
+                return
+            template = self.templates[template_index % len(self.templates)]
+            template_index += 1
+
+            instances = []
+            at = start
+            for planned in template["exerciseInstances"]:
+                instances.append(self.perform(self.exercises[planned["exercise"]["name"]], at))
+                at += self.random.randint(8, 15) * 60 * 1000
+            yield {
+                "id": self.make_id("session", start),
+                "template": dict(template, exerciseInstances=instances),
+                "startTime": format_timestamp(start),
+                "endTime": format_timestamp(at),
+                "isCompleted": True,
+                "currentExerciseIndex": len(instances) - 1,
+                "currentSetIndex": 0,
+            }
+
+
+def generate_export(seed, years, now=None):
+    """A complete synthetic export dict for one athlete"""
+    now = current_time_ms() if now is None else now
+    athlete = _Athlete(seed, now - int(years * 365.25 * MS_PER_DAY))
+    history = list(athlete.sessions(now))
+    return {
+        "exercises": list(athlete.exercises.values()),
+        "workoutTemplates": athlete.templates,
+        "workoutHistory": history,
+        "exportDate": format_timestamp(now),
+        "version": "1.0",
+    }
+
+
+def write_export(path, seed, years, now=None):
+    """Stream one athlete's synthetic export to path (.json or .json.gz); returns the path
+
+    The final exercise states are only known after the last session, so
+    unlike exportData() the file lists workoutHistory before exercises. Key
+    order does not matter to JSON.parse or to iter_export_items.
+    """
+    now = current_time_ms() if now is None else now
+    athlete = _Athlete(seed, now - int(years * 365.25 * MS_PER_DAY))
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as handle:
+        handle.write('{"workoutHistory":[')
+        for number, session in enumerate(athlete.sessions(now)):
+            if number:
+                handle.write(",\n")
+            handle.write(json.dumps(session, separators=(",", ":")))
+        handle.write('],"exercises":')
+        handle.write(json.dumps(list(athlete.exercises.values()), separators=(",", ":")))
+        handle.write(',"workoutTemplates":')
+        handle.write(json.dumps(athlete.templates, separators=(",", ":")))
+        handle.write(f',"exportDate":"{format_timestamp(now)}","version":"1.0"}}')
+    return path
+
+
+def _write_job(job):
+    return write_export(*job)
+
+
+def generate_corpus(directory, athletes, years, seed=0, workers=None, compress=False, now=None):
+    """Write one synthetic export per athlete into directory, in parallel"""
+    os.makedirs(directory, exist_ok=True)
+    now = current_time_ms() if now is None else now
+    suffix = ".json.gz" if compress else ".json"
+    jobs = [
+        (os.path.join(directory, f"athlete-{index:05d}{suffix}"), seed * 1_000_003 + index, years, now)
+        for index in range(athletes)
+    ]
+    if workers == 1 or athletes < 2:
+        return [_write_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_write_job, jobs))
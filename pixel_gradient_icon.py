@@ -1,40 +1,25 @@
 #!/usr/bin/env python3
 """
-Create a gradient icon by setting pixels directly
+Create a coral to ocean radial gradient icon
 """
 
 from PIL import Image
-import math
+
+from icon_engine import render_icon
 
 def create_pixel_gradient_icon():
     # Create a 1024x1024 canvas
     size = 1024
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    
     center = size // 2
     
     print(f"🎨 Creating pixel gradient from center {center}")
     
-    # Create gradient by setting pixels directly
-    for y in range(size):
-        for x in range(size):
-            # Calculate distance from center
-            distance = math.sqrt((x - center)**2 + (y - center)**2)
-            
-            # Normalize distance to 0-1
-            max_distance = center
-            ratio = min(distance / max_distance, 1.0)
-            
-            # Create gradient colors
-            base_r, base_g, base_b = 255, 94, 77      # Warm coral
-            target_r, target_g, target_b = 0, 119, 190  # Deep ocean blue
-            
-            r = int(base_r * (1 - ratio) + target_r * ratio)
-            g = int(base_g * (1 - ratio) + target_g * ratio)
-            b = int(base_b * (1 - ratio) + target_b * ratio)
-            
-            # Set pixel with full opacity
-            img.putpixel((x, y), (r, g, b, 255))
+    layers = [
+        # Warm coral to deep ocean blue gradient
+        {"type": "radial_gradient", "inner": (255, 94, 77), "outer": (0, 119, 190)},
+    ]
+    
+    img = render_icon(layers, size)
     
     return img
 
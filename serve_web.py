@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Static file server for the LazyGym PWA
+
+A drop-in replacement for `python3 -m http.server` when testing the app from
+a phone. One asyncio event loop serves every connection, so a single core
+handles many clients, and HTTP/1.1 connections are kept alive between
+requests. For each file it sends:
+
+    Cache-Control   immutable for fingerprinted names (app.<hash>.js from
+                    build_web.py); everything else is revalidated
+    ETag            strong, from the file's content hash (memoized by size
+                    and mtime), answered with 304 Not Modified
+    Content-Encoding
+                    the .br or .gz sibling written by build_web.py when the
+                    client accepts it and it is not older than the file
+
+File bodies are sent with loop.sendfile(), which uses os.sendfile() so the
+kernel copies straight from the page cache to the socket.
+
+Usage: python3 serve_web.py [directory] [--port 8000] [--bind 0.0.0.0]
+"""
+
+import argparse
+import asyncio
+from email.utils import formatdate
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import unquote, urlsplit
+
+SERVER_NAME = "LazyGym"
+MAX_HEADER_BYTES = 16 << 10
+KEEP_ALIVE_SECONDS = 15
+
+# Names like app.8060237dd7.js never change content, so clients may keep them for a year
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{8,}\.[^./]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+CONTENT_TYPES = {
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+    ".json": "application/json",
+    ".webmanifest": "application/manifest+json",
+    ".svg": "image/svg+xml",
+    ".woff2": "font/woff2",
+}
+
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+}
+
+
+def _content_type(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in CONTENT_TYPES:
+        return CONTENT_TYPES[suffix]
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _accepted_encodings(header):
+    """Content codings with a non-zero q-value in an Accept-Encoding header"""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, parameters = item.strip().partition(";")
+        quality = 1.0
+        match = re.search(r"q\s*=\s*([0-9.]+)", parameters)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                continue
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag_matches(header, etag):
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class StaticSite:
+    """Resolves request paths to files under root and remembers their ETags"""
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        # realpath -> (size, mtime_ns, etag)
+        self._etags = {}
+
+    def resolve(self, target):
+        """Real path of the file for a request target, or None"""
+        path = unquote(urlsplit(target).path)
+        if "\0" in path:
+            return None
+        path = os.path.realpath(os.path.join(self.root, path.lstrip("/")))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        return path if os.path.isfile(path) else None
+
+    def etag(self, path, stat):
+        cached = self._etags.get(path)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        digest = hashlib.blake2b(digest_size=12)
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        self._etags[path] = (stat.st_size, stat.st_mtime_ns, etag)
+        return etag
+
+    def variant(self, path, stat, accept_encoding):
+        """(path, stat, Content-Encoding) of the best precompressed sibling, if any"""
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                compressed = os.stat(path + suffix)
+            except OSError:
+                continue
+            # A sibling older than the file is left over from a previous build
+            if compressed.st_mtime_ns >= stat.st_mtime_ns:
+                return path + suffix, compressed, encoding
+        return path, stat, None
+
+
+class Request:
+    __slots__ = ("method", "target", "version", "headers")
+
+    def __init__(self, method, target, version, headers):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return "keep-alive" in connection
+        return "close" not in connection
+
+
+def _parse_request(data):
+    lines = data.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, separator, value = line.partition(":")
+        if not separator:
+            return None
+        headers[name.strip().lower()] = value.strip()
+    return Request(parts[0], parts[1], parts[2], headers)
+
+
+class StaticServer:
+    """asyncio HTTP/1.1 server for a StaticSite"""
+
+    def __init__(self, root, quiet=False):
+        self.site = StaticSite(root)
+        self.quiet = quiet
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_SECONDS)
+                except asyncio.LimitOverrunError:
+                    await self._send_error(writer, 431)
+                    return
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                request = _parse_request(data)
+                if request is None:
+                    await self._send_error(writer, 400)
+                    return
+                # GET and HEAD have no meaningful body, but one sent anyway must be skipped
+                length = request.headers.get("content-length", "0")
+                if not length.isdigit():
+                    await self._send_error(writer, 400)
+                    return
+                if int(length):
+                    await reader.readexactly(int(length))
+                keep_alive = request.keep_alive
+                status = await self._respond(request, writer, keep_alive)
+                if not self.quiet:
+                    peer = writer.get_extra_info("peername")
+                    print(f"{peer[0] if peer else '-'} {request.method} {request.target} {status}")
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request, writer, keep_alive):
+        if request.method not in ("GET", "HEAD"):
+            await self._send_error(writer, 405, keep_alive, {"Allow": "GET, HEAD"})
+            return 405
+        path = self.site.resolve(request.target)
+        if path is None:
+            await self._send_error(writer, 404, keep_alive)
+            return 404
+
+        stat = os.stat(path)
+        body_path, body_stat, encoding = self.site.variant(path, stat, request.headers.get("accept-encoding", ""))
+        # Each encoding is its own representation, with its own strong ETag
+        etag = self.site.etag(body_path, body_stat)
+        headers = {
+            "Content-Type": _content_type(path),
+            "Cache-Control": IMMUTABLE if FINGERPRINTED.search(path) else REVALIDATE,
+            "ETag": etag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Vary": "Accept-Encoding",
+        }
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            self._write_head(writer, 304, headers, keep_alive)
+            await writer.drain()
+            return 304
+
+        headers["Content-Length"] = str(body_stat.st_size)
+        self._write_head(writer, 200, headers, keep_alive)
+        await writer.drain()
+        if request.method == "GET" and body_stat.st_size:
+            with open(body_path, "rb") as handle:
+                await asyncio.get_running_loop().sendfile(writer.transport, handle, 0, body_stat.st_size)
+        return 200
+
+    def _write_head(self, writer, status, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}",
+                 f"Date: {formatdate(usegmt=True)}",
+                 f"Server: {SERVER_NAME}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if keep_alive:
+            lines.append(f"Keep-Alive: timeout={KEEP_ALIVE_SECONDS}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_error(self, writer, status, keep_alive=False, headers=None):
+        body = f"{status} {REASONS[status]}\n".encode()
+        headers = dict(headers or {}, **{"Content-Type": "text/plain; charset=utf-8",
+                                         "Content-Length": str(len(body))})
+        self._write_head(writer, status, headers, keep_alive)
+        writer.write(body)
+        await writer.drain()
+
+
+async def serve(root=".", host="0.0.0.0", port=8000, quiet=False):
+    server = StaticServer(root, quiet=quiet)
+    listener = await asyncio.start_server(server.handle, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+    print(f"🚀 Serving {server.site.root} on http://{host}:{port}/")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the web app with caching headers and precompressed files")
+    parser.add_argument("directory", nargs="?", default=".", help="directory to serve, e.g. dist")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--bind", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--quiet", action="store_true", help="do not log requests")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.directory, args.bind, args.port, args.quiet))
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
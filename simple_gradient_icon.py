@@ -1,51 +1,27 @@
 #!/usr/bin/env python3
 """
-Create a simple, working gradient icon without numpy
+Create a simple, working gradient icon
 """
 
-from PIL import Image, ImageDraw
-import math
+from PIL import Image
+
+from icon_engine import render_icon
 
 def create_simple_gradient_icon():
     # Create a 1024x1024 canvas
     size = 1024
-    img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
     center = size // 2
     
     print(f"🎨 Creating simple gradient from center {center}")
     
-    # Create gradient by drawing filled circles
-    for i in range(center):
-        ratio = i / center
-        
+    layers = [
         # Beautiful sunset to ocean gradient
-        base_r, base_g, base_b = 255, 94, 77      # Warm coral
-        target_r, target_g, target_b = 0, 119, 190  # Deep ocean blue
-        
-        r = int(base_r * (1 - ratio) + target_r * ratio)
-        g = int(base_g * (1 - ratio) + target_g * ratio)
-        b = int(base_b * (1 - ratio) + target_b * ratio)
-        
-        # Make sure alpha is 255 (fully opaque)
-        alpha = 255
-        
-        # Draw the circle with full opacity
-        draw.ellipse([center - i, center - i, center + i, center + i], 
-                    fill=(r, g, b, alpha))
+        {"type": "radial_gradient", "inner": (255, 94, 77), "outer": (0, 119, 190)},
+        # Add a subtle center highlight
+        {"type": "glow", "radius": 60, "alpha": 40},
+    ]
     
-    # Add a subtle center highlight
-    highlight_radius = 60
-    for i in range(highlight_radius):
-        ratio = i / highlight_radius
-        alpha = int(40 * (1 - ratio))  # Subtle highlight
-        r = int(255 * (1 - ratio))
-        g = int(255 * (1 - ratio))
-        b = int(255 * (1 - ratio))
-        
-        draw.ellipse([center - i, center - i, center + i, center + i], 
-                    fill=(r, g, b, alpha))
+    img = render_icon(layers, size)
     
     return img
 
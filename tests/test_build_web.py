@@ -0,0 +1,35 @@
+import io
+import zipfile
+
+import pytest
+
+from build_web import FONT_SOURCES, archive_member, minify_js
+
+
+@pytest.mark.parametrize("keyword", ["return", "typeof", "case", "void"])
+def test_regex_after_keyword_is_copied_verbatim(keyword):
+    source = f'function f(x) {{ {keyword} /a  "b/.test(x) }}'
+    assert f'{keyword} /a  "b/.test(x)' in minify_js(source)
+
+
+def test_regex_after_keyword_and_comment_is_copied_verbatim():
+    assert "return /a  b/g" in minify_js("function f() { return /* note */ /a  b/g }")
+
+
+def test_division_is_still_minified():
+    assert minify_js("a = b  /  c  /  d") == "a=b / c / d\n"
+
+
+def test_font_sources_are_pinned_releases():
+    for url, member in FONT_SOURCES.values():
+        assert "/releases/download/v" in url and member.endswith(".ttf")
+
+
+def test_archive_member_matches_file_name_at_any_depth():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("Inter-4.0/extras/InterDisplay.ttf", b"display")
+        archive.writestr("Inter-4.0/InterVariable.ttf", b"variable")
+    assert archive_member(buffer.getvalue(), "InterVariable.ttf") == b"variable"
+    with pytest.raises(KeyError):
+        archive_member(buffer.getvalue(), "Missing.ttf")
@@ -0,0 +1,59 @@
+import pickle
+
+import numpy as np
+
+from lazygym_analytics.cohort import CohortSketch, cohort_sketch, sketch_exports
+from lazygym_analytics.columns import HistoryBuilder, concat_histories
+from lazygym_analytics.synthetic import generate_corpus
+
+NOW = 1_760_000_000_000
+
+
+def test_serial_cohort_sketch_uses_options(tmp_path):
+    paths = generate_corpus(str(tmp_path), 3, 0.5, seed=1, workers=1, now=NOW)
+    options = {"weeks": 26, "plateau_sessions": 4}
+
+    # One shard per file, merged in this process
+    sketch = cohort_sketch(paths, workers=1, shard_size=1, **options)
+
+    assert isinstance(sketch, CohortSketch)
+    assert sketch.weeks == 26
+    assert sketch.plateau_sessions == 4
+    expected = sketch_exports(paths, **options).report()
+    report = sketch.report()
+    assert report.athletes == expected.athletes == 3
+    assert report.sessions == expected.sessions
+    assert report.plateaued == expected.plateaued
+
+
+def _custom_exercise_history(names, athlete="alex"):
+    builder = HistoryBuilder()
+    builder.add_export({"workoutHistory": [{
+        "id": f"{athlete}-{index}",
+        "startTime": NOW + index * 86_400_000,
+        "template": {"exerciseInstances": [{
+            "exercise": {"name": name, "progressionType": "amrap", "bodyPart": "upper"},
+            "sets": [{"weight": 20 + index % 7, "plannedReps": 8, "actualReps": 8}],
+        }]},
+    } for index, name in enumerate(names)]}, athlete)
+    return builder.build()
+
+
+def test_weight_curves_grow_with_data_not_vocabulary():
+    names = [f"Custom exercise {index}" for index in range(300)]
+    sketch = CohortSketch().add_history(_custom_exercise_history(names))
+
+    # A dense 104-week x 1000-bin histogram per name would be about 250 MB
+    assert len(pickle.dumps(sketch)) < 200_000
+    assert sorted(sketch.report().weight_samples) == sorted(names)
+
+
+def test_merged_weight_curves_match_a_single_sketch():
+    first = _custom_exercise_history(["Squat", "Row", "Squat"], athlete="alex")
+    second = _custom_exercise_history(["Row", "Press"], athlete="sam")
+    merged = CohortSketch().add_history(first).merge(CohortSketch().add_history(second))
+    combined = CohortSketch().add_history(concat_histories([first, second]))
+
+    for name in ("Squat", "Row", "Press"):
+        assert np.array_equal(merged.weight_curve(name).counts, combined.weight_curve(name).counts)
+    assert merged.weight_curve("Row").counts.sum() == 2
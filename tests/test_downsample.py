@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from lazygym_analytics.downsample import downsample, lttb_indices, minmax_indices
+
+
+@pytest.mark.parametrize("indices", [lttb_indices, minmax_indices])
+@pytest.mark.parametrize("budget", range(0, 8))
+def test_indices_never_exceed_budget(indices, budget):
+    x = np.arange(50, dtype=np.float64)
+    y = np.sin(x)
+    kept = indices(x, y, budget)
+    assert len(kept) <= budget
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_minmax_keeps_bucket_extremes():
+    x = np.arange(8, dtype=np.float64)
+    y = np.array([3, 9, 1, 4, 5, 0, 7, 2], dtype=np.float64)
+    kept_x, kept_y = downsample(x, y, 4, method="minmax")
+    assert kept_x.tolist() == [1, 2, 5, 6]
+    assert kept_y.tolist() == [9, 1, 0, 7]
@@ -0,0 +1,18 @@
+import pytest
+
+from lazygym_analytics.report import GRID_LINES, HEADROOM, _nice_top
+
+
+@pytest.mark.parametrize("value", [0.5, 7.5, 20, 99, 100, 1000, 12345])
+def test_axis_top_leaves_headroom_above_round_maxima(value):
+    top = _nice_top(value)
+    assert top >= value * (1 + HEADROOM) - 1e-9
+
+
+def test_axis_top_stays_close():
+    assert _nice_top(20) == 24
+    assert _nice_top(100) == 120
+
+
+def test_empty_axis_has_default_scale():
+    assert _nice_top(0) == GRID_LINES
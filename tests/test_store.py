@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+
+from lazygym_analytics import store
+from lazygym_analytics.columns import HistoryBuilder
+from lazygym_analytics.store import StoreFormatError, open_store, write_store
+
+
+def _history(actual_reps):
+    builder = HistoryBuilder()
+    builder.add_export({"workoutHistory": [{
+        "id": "s1",
+        "startTime": "2025-01-06T10:00:00.000Z",
+        "template": {"exerciseInstances": [{
+            "exercise": {"name": "Push-up", "progressionType": "free", "bodyPart": "upper"},
+            "sets": [{"weight": 0, "plannedReps": reps, "actualReps": reps} for reps in actual_reps],
+        }]},
+    }]}, "alex")
+    return builder.build()
+
+
+def test_reps_outside_int16_are_stored_exactly(tmp_path):
+    write_store(_history([12, 40_000]), str(tmp_path))
+    history = open_store(str(tmp_path))
+    assert history.sets["actual_reps"].tolist() == [12, 40_000]
+    assert history.sets["planned_reps"].tolist() == [12, 40_000]
+    with open(tmp_path / "meta.json", encoding="utf-8") as handle:
+        assert json.load(handle)["columns"]["sets"]["actual_reps"] == np.dtype(np.int32).str
+
+
+def test_small_reps_stay_int16(tmp_path):
+    write_store(_history([5, 8]), str(tmp_path))
+    assert open_store(str(tmp_path)).sets["actual_reps"].dtype == np.int16
+
+
+def test_interrupted_rewrite_does_not_look_complete(tmp_path, monkeypatch):
+    write_store(_history([5]), str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store.np, "save", fail)
+    with pytest.raises(OSError):
+        write_store(_history([5, 6]), str(tmp_path))
+    monkeypatch.undo()
+
+    with pytest.raises(StoreFormatError):
+        open_store(str(tmp_path))
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from lazygym_analytics import sync
+from lazygym_analytics.sync import LOG_NAME, SyncServer
+
+
+def _exchange(directory, request):
+    """Send one raw request to a SyncServer and return (status, JSON body)"""
+
+    async def run():
+        server = await asyncio.start_server(SyncServer(directory).handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+
+    return asyncio.run(run())
+
+
+def _post(path, body, headers=""):
+    return (f"POST {path} HTTP/1.1\r\nConnection: close\r\n{headers}"
+            f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+def test_dot_athletes_cannot_escape_the_data_directory(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    for athlete in ("..", "."):
+        status, _ = _exchange(str(data), _post(f"/sync/{athlete}", b"{}"))
+        assert status == 404
+    assert not os.path.exists(tmp_path / LOG_NAME)
+    assert not os.path.exists(data / LOG_NAME)
+
+
+def test_upload_is_accepted(tmp_path):
+    status, _ = _exchange(str(tmp_path), _post("/sync/alex", b'{"workoutHistory": []}'))
+    assert status == 200
+
+
+def test_non_numeric_content_length_is_a_bad_request(tmp_path):
+    request = b"POST /sync/alex HTTP/1.1\r\nContent-Length: ten\r\n\r\n{}"
+    status, body = _exchange(str(tmp_path), request)
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+
+def test_invalid_gzip_upload_is_a_bad_request(tmp_path):
+    for payload in (b"not gzip at all", b"\x1f\x8b\x08\x00\x00\x00\x00\x00"):
+        status, body = _exchange(str(tmp_path), _post("/sync/alex", payload, "Content-Encoding: gzip\r\n"))
+        assert status == 400
+        assert "gzip" in body["error"]
+
+
+def test_log_is_loaded_once_off_the_event_loop(tmp_path, monkeypatch):
+    loads = []
+    recover = sync.SyncLog._recover
+
+    def recording_recover(log):
+        loads.append(threading.current_thread() is threading.main_thread())
+        recover(log)
+
+    monkeypatch.setattr(sync.SyncLog, "_recover", recording_recover)
+
+    async def run():
+        server = SyncServer(str(tmp_path))
+        return await asyncio.gather(*(server.log("alex") for _ in range(5)))
+
+    logs = asyncio.run(run())
+    assert loads == [False]
+    assert all(log is logs[0] for log in logs)
+
+
+def test_failed_log_load_is_retried(tmp_path):
+    # A file where the athlete's directory should be makes the load fail
+    (tmp_path / "alex").write_text("")
+    server = SyncServer(str(tmp_path))
+
+    async def run():
+        with pytest.raises(OSError):
+            await server.log("alex")
+        assert "alex" not in server.logs
+        os.remove(tmp_path / "alex")
+        return await server.log("alex")
+
+    assert asyncio.run(run()).version == 0